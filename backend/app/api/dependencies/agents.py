@@ -1,12 +1,17 @@
 """Agents dependencies."""
 
+from fastapi import Request
+
 from app.core.agents import AgentsService
 
 
-def get_agent_service() -> AgentsService:
-    """Get agents service.
+def get_agent_service(request: Request) -> AgentsService:
+    """Get agents service shared by all requests.
+
+    Args:
+        request (Request): Current request.
 
     Returns:
         AgentsService: Agents service.
     """
-    return AgentsService()
+    return request.app.state.agents_service  # type: ignore[no-any-return]
@@ -3,15 +3,20 @@
 
 from typing import Annotated
 
-from fastapi import Depends
+from fastapi import Depends, Request
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
 
+from app.api.dependencies.users import get_users_service
 from app.api.exceptions.auth import Unauthorized
 from app.api.exceptions.users import AdminRightsRequired
 from app.core.auth import AuthService
-from app.core.users import get_authorized_user, get_verified_admin
-from app.models.user import User
+from app.core.users import (
+    UsersService,
+    get_authorized_user,
+    get_verified_admin,
+)
+from app.models.user import AuthorizedUser
 
 # Authorization form in Swagger UI doesn't work properly under Deta proxy
 # So, we need to specify prefix manually
@@ -22,22 +27,24 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl=token_url)
 
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
-) -> User:
+    users_service: Annotated[UsersService, Depends(get_users_service)],
+) -> AuthorizedUser:
     """Get current user from JWT token.
 
     See `app.core.users.get_current_user` for details.
 
     Args:
         token (str): JWT token from oauth2 scheme.
+        users_service (UsersService): Users service.
 
     Raises:
-        Unauthorized: If token is invalid or user is not found.
+        Unauthorized: If token is invalid or revoked.
 
     Returns:
-        User: User instance.
+        AuthorizedUser: User instance.
     """
     try:
-        user = await get_authorized_user(token)
+        user = await get_authorized_user(token, users_service)
     except JWTError:
         raise Unauthorized()
 
@@ -48,20 +55,20 @@ async def get_current_user(
 
 
 async def get_admin(
-    user: Annotated[User, Depends(get_current_user)],
-) -> User:
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
+) -> AuthorizedUser:
     """Get user verified as admin.
 
     See `app.core.users.get_admin` for details.
 
     Args:
-        user (User): Current user.
+        user (AuthorizedUser): Current user.
 
     Raises:
         AdminRightsRequired: If user is not admin.
 
     Returns:
-        User: Admin user.
+        AuthorizedUser: Admin user.
     """
     admin = await get_verified_admin(user)
     if admin is None:
@@ -70,10 +77,13 @@ async def get_admin(
     return admin
 
 
-def get_auth_service() -> AuthService:
-    """Get auth service.
+def get_auth_service(request: Request) -> AuthService:
+    """Get auth service shared by all requests.
+
+    Args:
+        request (Request): Current request.
 
     Returns:
         AuthService: Auth service instance.
     """
-    return AuthService()
+    return request.app.state.auth_service  # type: ignore[no-any-return]
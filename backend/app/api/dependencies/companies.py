@@ -1,12 +1,17 @@
 """Companies dependencies."""
 
+from fastapi import Request
+
 from app.core.companies import CompaniesService
 
 
-def get_companies_service() -> CompaniesService:
-    """Get companies service.
+def get_companies_service(request: Request) -> CompaniesService:
+    """Get companies service shared by all requests.
+
+    Args:
+        request (Request): Current request.
 
     Returns:
         CompaniesService: Companies service.
     """
-    return CompaniesService()
+    return request.app.state.companies_service  # type: ignore[no-any-return]
@@ -1,12 +1,17 @@
 """Offer templates dependencies."""
 
+from fastapi import Request
+
 from app.core.offer_tpls import OfferTemplatesService
 
 
-def get_offer_tpls_service() -> OfferTemplatesService:
-    """Get offer templates service.
+def get_offer_tpls_service(request: Request) -> OfferTemplatesService:
+    """Get offer templates service shared by all requests.
+
+    Args:
+        request (Request): Current request.
 
     Returns:
         OfferTemplatesService: Offer templates service.
     """
-    return OfferTemplatesService()
+    return request.app.state.offer_tpls_service  # type: ignore[no-any-return]
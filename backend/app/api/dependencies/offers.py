@@ -1,12 +1,17 @@
 """Offers dependencies."""
 
+from fastapi import Request
+
 from app.core.offers import OffersService
 
 
-def get_offers_service() -> OffersService:
-    """Get offers service.
+def get_offers_service(request: Request) -> OffersService:
+    """Get offers service shared by all requests.
+
+    Args:
+        request (Request): Current request.
 
     Returns:
         OffersService: Offers service.
     """
-    return OffersService()
+    return request.app.state.offers_service  # type: ignore[no-any-return]
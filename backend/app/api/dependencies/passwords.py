@@ -0,0 +1,17 @@
+"""Password hasher dependencies."""
+
+from fastapi import Request
+
+from app.core.passwords import PasswordHasher
+
+
+def get_password_hasher(request: Request) -> PasswordHasher:
+    """Get password hasher started with application.
+
+    Args:
+        request (Request): Current request.
+
+    Returns:
+        PasswordHasher: Password hasher.
+    """
+    return request.app.state.password_hasher  # type: ignore[no-any-return]
@@ -0,0 +1,17 @@
+"""Render engine dependencies."""
+
+from fastapi import Request
+
+from app.core.render import RenderEngine
+
+
+def get_render_engine(request: Request) -> RenderEngine:
+    """Get render engine started with application.
+
+    Args:
+        request (Request): Current request.
+
+    Returns:
+        RenderEngine: Render engine.
+    """
+    return request.app.state.render_engine  # type: ignore[no-any-return]
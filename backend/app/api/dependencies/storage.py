@@ -0,0 +1,17 @@
+"""Storage dependencies."""
+
+from fastapi import Request
+
+from app.core.deta import Storage
+
+
+def get_storage(request: Request) -> Storage:
+    """Get Deta storage shared by all requests.
+
+    Args:
+        request (Request): Current request.
+
+    Returns:
+        Storage: Deta storage.
+    """
+    return request.app.state.storage  # type: ignore[no-any-return]
@@ -1,12 +1,17 @@
 """Users dependencies."""
 
+from fastapi import Request
+
 from app.core.users import UsersService
 
 
-def get_users_service() -> UsersService:
-    """Get users service.
+def get_users_service(request: Request) -> UsersService:
+    """Get users service shared by all requests.
+
+    Args:
+        request (Request): Current request.
 
     Returns:
         UsersService: Users service.
     """
-    return UsersService()
+    return request.app.state.users_service  # type: ignore[no-any-return]
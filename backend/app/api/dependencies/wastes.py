@@ -1,13 +1,17 @@
 """Wastes dependencies."""
 
+from fastapi import Request
 
 from app.core.wastes import WastesService
 
 
-def get_wastes_service() -> WastesService:
-    """Get wastes service.
+def get_wastes_service(request: Request) -> WastesService:
+    """Get wastes service shared by all requests.
+
+    Args:
+        request (Request): Current request.
 
     Returns:
         WastesService: Wastes service.
     """
-    return WastesService()
+    return request.app.state.wastes_service  # type: ignore[no-any-return]
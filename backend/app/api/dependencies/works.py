@@ -1,13 +1,17 @@
 """Works dependencies."""
 
+from fastapi import Request
 
 from app.core.works import WorksService
 
 
-def get_works_service() -> WorksService:
-    """Get works service.
+def get_works_service(request: Request) -> WorksService:
+    """Get works service shared by all requests.
+
+    Args:
+        request (Request): Current request.
 
     Returns:
         WorksService: Works service.
     """
-    return WorksService()
+    return request.app.state.works_service  # type: ignore[no-any-return]
@@ -19,3 +19,28 @@ class FailConvertToPDF(HTTPException):
         self.detail = 'Failed to convert to PDF'
         if details:
             self.detail += ': {details}'.format(details=details)
+
+
+class FileTooLarge(HTTPException):
+    """Raised when the uploaded file exceeds size limit."""
+
+    def __init__(self) -> None:
+        """Initialize the exception."""
+        self.status_code = HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+        self.detail = 'File is too large'
+
+
+class RangeNotSatisfiable(HTTPException):
+    """Raised when the requested range is outside of file."""
+
+    def __init__(self, file_size: int) -> None:
+        """Initialize the exception.
+
+        Args:
+            file_size (int): File size in bytes.
+        """
+        self.status_code = HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+        self.detail = 'Requested range is not satisfiable'
+        self.headers = {
+            'Content-Range': 'bytes */{size}'.format(size=file_size),
+        }
@@ -44,7 +44,14 @@ class IncorrectOfferTemplateFile(HTTPException):
 class IncorrectOfferTemplateContext(HTTPException):
     """Raised when the offer template context is not valid."""
 
-    def __init__(self) -> None:
-        """Initialize the exception."""
+    def __init__(self, details: str = '') -> None:
+        """Initialize the exception.
+
+        Args:
+            details (str): Exception details.
+        """
         self.status_code = HTTPStatus.BAD_REQUEST
+
         self.detail = 'Incorrect offer template context.'
+        if details:
+            self.detail += ' {details}'.format(details=details)
@@ -0,0 +1,152 @@
+"""File download responses.
+
+Downloads are revalidated by ETag and can be resumed or read partially
+by single byte range, see `app.core.downloads`.
+"""
+
+from http import HTTPStatus
+from typing import Optional
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+from app.api.exceptions.docx import RangeNotSatisfiable
+from app.core.downloads import (
+    RangeNotSatisfiableError,
+    StoredFile,
+    format_content_disposition,
+    iterate_range,
+    match_etag,
+    parse_range,
+)
+
+# Client must revalidate file on every use, because file can be updated
+CACHE_CONTROL = 'no-cache'
+
+
+def get_not_modified_response(
+    request: Request,
+    etag: Optional[str],
+) -> Optional[Response]:
+    """Answer conditional request for file, which client has already.
+
+    Args:
+        request (Request): Download request.
+        etag (Optional[str]): Entity tag of file or None if it is unknown.
+
+    Returns:
+        Optional[Response]: Not Modified response if client has file \
+            with the tag, None otherwise.
+    """
+    if_none_match = request.headers.get('If-None-Match')
+    if etag is None or if_none_match is None:
+        return None
+
+    if not match_etag(if_none_match, etag):
+        return None
+
+    return Response(
+        status_code=HTTPStatus.NOT_MODIFIED,
+        headers={'ETag': etag, 'Cache-Control': CACHE_CONTROL},
+    )
+
+
+def get_byte_range(
+    request: Request,
+    file_size: int,
+    etag: Optional[str],
+) -> Optional[tuple[int, int]]:
+    """Get requested byte range of file.
+
+    Range is ignored if If-Range tag does not match file strongly,
+    so client, which resumes download of changed file, gets whole file.
+
+    Args:
+        request (Request): Download request.
+        file_size (int): File size in bytes.
+        etag (Optional[str]): Entity tag of file or None if it is unknown.
+
+    Raises:
+        RangeNotSatisfiable: Raised when the range is outside of file.
+
+    Returns:
+        Optional[tuple[int, int]]: First and last byte positions \
+            or None if whole file is requested.
+    """
+    range_header = request.headers.get('Range')
+    if range_header is None:
+        return None
+
+    if_range = request.headers.get('If-Range')
+    if if_range is not None and (etag is None or etag.startswith('W/')):
+        return None
+
+    if if_range is not None and if_range.strip() != etag:
+        return None
+
+    try:
+        return parse_range(range_header, file_size)
+    except RangeNotSatisfiableError:
+        raise RangeNotSatisfiable(file_size)
+
+
+def make_file_response(
+    request: Request,
+    stored_file: StoredFile,
+    file_name: str,
+    media_type: str,
+    etag: Optional[str],
+) -> StreamingResponse:
+    """Stream file or its requested byte range as attachment.
+
+    Files stored before sizes were stored are streamed whole
+    without Content-Length.
+
+    Args:
+        request (Request): Download request.
+        stored_file (StoredFile): File data and size.
+        file_name (str): Attachment file name.
+        media_type (str): File media type.
+        etag (Optional[str]): Entity tag of file or None if it is unknown.
+
+    Returns:
+        StreamingResponse: File or Partial Content response.
+    """
+    headers = {
+        'Content-Disposition': format_content_disposition(file_name),
+        'Cache-Control': CACHE_CONTROL,
+    }
+    if etag is not None:
+        headers['ETag'] = etag
+
+    chunks = stored_file.reader.as_iterator()
+    if stored_file.size is None:
+        return StreamingResponse(
+            chunks,
+            media_type=media_type,
+            headers=headers,
+        )
+
+    headers['Accept-Ranges'] = 'bytes'
+    byte_range = get_byte_range(request, stored_file.size, etag)
+    if byte_range is None:
+        headers['Content-Length'] = str(stored_file.size)
+        return StreamingResponse(
+            chunks,
+            media_type=media_type,
+            headers=headers,
+        )
+
+    first, last = byte_range
+    headers['Content-Length'] = str(last - first + 1)
+    headers['Content-Range'] = 'bytes {first}-{last}/{size}'.format(
+        first=first,
+        last=last,
+        size=stored_file.size,
+    )
+    return StreamingResponse(
+        iterate_range(chunks, first, last),
+        status_code=HTTPStatus.PARTIAL_CONTENT,
+        media_type=media_type,
+        headers=headers,
+    )
@@ -14,7 +14,7 @@ from app.core.agents import (
     AgentsService,
     BadAgentDataError,
 )
-from app.models.user import User
+from app.models.user import AuthorizedUser
 
 router = APIRouter(prefix='/agents', tags=['agents'])
 
@@ -22,14 +22,14 @@ router = APIRouter(prefix='/agents', tags=['agents'])
 @router.get('/{inn}')
 async def get_agents(
     inn: str,
-    user: Annotated[User, Depends(get_current_user)],
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
     service: Annotated[AgentsService, Depends(get_agent_service)],
 ) -> AgentResponse:
     """Get agent by INN.
 
     Args:
         inn (str): Agent INN.
-        user (User): Authorized user model.
+        user (AuthorizedUser): Authorized user model.
         service (AgentsService): Agents service.
 
     Raises:
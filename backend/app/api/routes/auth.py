@@ -8,7 +8,11 @@ from fastapi.security import OAuth2PasswordRequestForm
 from app.api.dependencies.auth import get_auth_service
 from app.api.exceptions.auth import Unauthorized
 from app.api.schemes.auth import Token
-from app.core.auth import AuthService, create_user_access_token
+from app.core.auth import (
+    AuthService,
+    BadCredentialsError,
+    create_user_access_token,
+)
 
 router = APIRouter(prefix='/auth', tags=['auth'])
 
@@ -30,10 +34,14 @@ async def login(
     Returns:
         Token: JWT access token.
     """
-    user = await service.authorize_user(form_data.username, form_data.password)
-    if not user:
+    try:
+        user = await service.authorize_user(
+            form_data.username,
+            form_data.password,
+        )
+    except BadCredentialsError:
         raise Unauthorized()
 
-    access_token = create_user_access_token(uid=user.uid)
+    access_token = create_user_access_token(user)
     # `bearer` is a type of access token
     return Token(access_token=access_token, token_type='bearer')  # noqa: S106
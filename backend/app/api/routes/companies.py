@@ -18,14 +18,14 @@ from app.api.schemes.companies import (
 )
 from app.core.companies import CompaniesService, CompanyNotFoundError
 from app.core.pagination import PaginationParams
-from app.models.user import User
+from app.models.user import AuthorizedUser
 
 router = APIRouter(prefix='/companies', tags=['companies'])
 
 
 @router.get('/')
 async def get_companies(
-    user: Annotated[User, Depends(get_current_user)],
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
     service: Annotated[CompaniesService, Depends(get_companies_service)],
     pagination: Annotated[PaginationParams, Depends(PaginationParams)],
 ) -> CompanyListResponse:
@@ -33,7 +33,7 @@ async def get_companies(
 
     Args:
         pagination (PaginationParams): Pagination params.
-        user (User): Current authorized user.
+        user (AuthorizedUser): Current authorized user.
         service (CompaniesService): Companies service.
 
     Returns:
@@ -49,14 +49,14 @@ async def get_companies(
 @router.get('/{company_id}')
 async def get_company(
     company_id: str,
-    user: Annotated[User, Depends(get_current_user)],
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
     service: Annotated[CompaniesService, Depends(get_companies_service)],
 ) -> CompanyResponse:
     """Get company by id.
 
     Args:
         company_id (str): Company id.
-        user (User): Current authorized user.
+        user (AuthorizedUser): Current authorized user.
         service (CompaniesService): Companies service.
 
     Raises:
@@ -76,14 +76,14 @@ async def get_company(
 @router.post('/')
 async def create_company(
     company_data: CompanyCreate,
-    admin: Annotated[User, Depends(get_admin)],
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
     service: Annotated[CompaniesService, Depends(get_companies_service)],
 ) -> CompanyResponse:
     """Create a new company.
 
     Args:
         company_data (CompanyCreate): Company name.
-        admin (User): Current user must be an admin.
+        admin (AuthorizedUser): Current user must be an admin.
         service (CompaniesService): Companies service.
 
     Returns:
@@ -97,7 +97,7 @@ async def create_company(
 async def update_company(
     company_id: str,
     company_data: CompanyUpdate,
-    admin: Annotated[User, Depends(get_admin)],
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
     service: Annotated[CompaniesService, Depends(get_companies_service)],
 ) -> CompanyResponse:
     """Update company.
@@ -105,7 +105,7 @@ async def update_company(
     Args:
         company_id (str): Company id.
         company_data (CompanyUpdate): Company name.
-        admin (User): Current user must be an admin.
+        admin (AuthorizedUser): Current user must be an admin.
         service (CompaniesService): Companies service.
 
     Raises:
@@ -125,14 +125,14 @@ async def update_company(
 @router.delete('/{company_id}')
 async def delete_company(
     company_id: str,
-    admin: Annotated[User, Depends(get_admin)],
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
     service: Annotated[CompaniesService, Depends(get_companies_service)],
 ) -> CompanyResponse:
     """Delete company.
 
     Args:
         company_id (str): Company id.
-        admin (User): Current user must be an admin.
+        admin (AuthorizedUser): Current user must be an admin.
         service (CompaniesService): Companies service.
 
     Raises:
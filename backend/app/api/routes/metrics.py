@@ -0,0 +1,45 @@
+"""Metrics API.
+
+Provides runtime metrics of application components.
+"""
+
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+
+from app.api.dependencies.auth import get_admin
+from app.api.dependencies.passwords import get_password_hasher
+from app.api.dependencies.render import get_render_engine
+from app.api.dependencies.storage import get_storage
+from app.api.schemes.metrics import MetricsResponse
+from app.core.deta import Storage
+from app.core.passwords import PasswordHasher
+from app.core.render import RenderEngine
+from app.models.user import AuthorizedUser
+
+router = APIRouter(prefix='/metrics', tags=['metrics'])
+
+
+@router.get('/')
+async def get_metrics(
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
+    render_engine: Annotated[RenderEngine, Depends(get_render_engine)],
+    storage: Annotated[Storage, Depends(get_storage)],
+    password_hasher: Annotated[PasswordHasher, Depends(get_password_hasher)],
+) -> MetricsResponse:
+    """Get application metrics.
+
+    Args:
+        admin (AuthorizedUser): Admin user.
+        render_engine (RenderEngine): Render engine.
+        storage (Storage): Deta storage.
+        password_hasher (PasswordHasher): Password hasher.
+
+    Returns:
+        MetricsResponse: Application metrics.
+    """
+    return MetricsResponse(
+        render=render_engine.get_stats(),
+        entity_cache=storage.get_cache_stats(),
+        password_hasher=password_hasher.get_stats(),
+    )
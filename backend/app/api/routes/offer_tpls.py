@@ -1,48 +1,62 @@
 """Offers templates API."""
 
-from typing import Annotated
+from typing import Annotated, Any, AsyncIterator, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Form, Request, Response, UploadFile
 from fastapi.responses import StreamingResponse
 
 from app.api.dependencies.auth import get_admin, get_current_user
 from app.api.dependencies.offer_tpls import get_offer_tpls_service
 from app.api.dependencies.offers import get_offers_service
+from app.api.exceptions.docx import FileTooLarge
 from app.api.exceptions.offer_tpls import (
     BadOfferTemplateFile,
+    IncorrectOfferTemplateContext,
     OfferTemplateNotFound,
 )
+from app.api.responses import get_not_modified_response, make_file_response
 from app.api.schemes.offer_tpls import (
     BuildedOfferResponse,
     OfferBuild,
     OfferTemplateCreate,
     OfferTemplateListResponse,
     OfferTemplateResponse,
+    OfferTemplateSchemaResponse,
     OfferTemplateUpdate,
 )
+from app.api.schemes.offers import BuildedOffersResponse, OffersBuild
 from app.core.docx import DocFormat, decode_base64, get_media_type
+from app.core.downloads import format_etag
 from app.core.offer_tpls import (
     BadOfferTemplateFileError,
+    IncorrectOfferTemplateContextError,
     OfferTemplateNotFoundError,
     OfferTemplatesService,
+    check_offer_context,
+)
+from app.core.offers import (
+    BuiltOffer,
+    IncorrectOfferContextError,
+    OffersService,
 )
-from app.core.offers import OffersService
 from app.core.pagination import PaginationParams
-from app.models.user import User
+from app.core.streams import FileTooLargeError, iterate_archive
+from app.models.offer_tpl import OfferTemplate
+from app.models.user import AuthorizedUser
 
 router = APIRouter(prefix='/offer_tpls', tags=['offers templates'])
 
 
 @router.get('/')
 async def get_offer_tpls(
-    user: Annotated[User, Depends(get_current_user)],
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
     service: Annotated[OfferTemplatesService, Depends(get_offer_tpls_service)],
     pagination: Annotated[PaginationParams, Depends(PaginationParams)],
 ) -> OfferTemplateListResponse:
     """Get offer templates list.
 
     Args:
-        user (User): Current user
+        user (AuthorizedUser): Current user
         service (OfferTemplatesService): Offer templates service
         pagination (PaginationParams): Pagination params.
 
@@ -59,14 +73,14 @@ async def get_offer_tpls(
 @router.get('/{offer_tpl_id}')
 async def get_offer_tpl(
     offer_tpl_id: str,
-    user: Annotated[User, Depends(get_current_user)],
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
     service: Annotated[OfferTemplatesService, Depends(get_offer_tpls_service)],
 ) -> OfferTemplateResponse:
     """Get offer template by id.
 
     Args:
         offer_tpl_id (str): Offer template id.
-        user (User): Current user.
+        user (AuthorizedUser): Current user.
         service (OfferTemplatesService): Offer templates service.
 
     Raises:
@@ -83,6 +97,33 @@ async def get_offer_tpl(
     return OfferTemplateResponse(offer_tpl=offer_tpl)
 
 
+@router.get('/{offer_tpl_id}/schema')
+async def get_offer_tpl_schema(
+    offer_tpl_id: str,
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
+    service: Annotated[OfferTemplatesService, Depends(get_offer_tpls_service)],
+) -> OfferTemplateSchemaResponse:
+    """Get context variables of offer template.
+
+    Args:
+        offer_tpl_id (str): Offer template id.
+        user (AuthorizedUser): Current user.
+        service (OfferTemplatesService): Offer templates service.
+
+    Raises:
+        OfferTemplateNotFound: Raised when the offer template is not found.
+
+    Returns:
+        OfferTemplateSchemaResponse: Offer template context variables.
+    """
+    try:
+        offer_tpl = await service.get_offer_tpl(offer_tpl_id)
+    except OfferTemplateNotFoundError:
+        raise OfferTemplateNotFound()
+
+    return OfferTemplateSchemaResponse(variables=offer_tpl.variables)
+
+
 # flake8: noqa: E501
 DOCX_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
 
@@ -90,58 +131,77 @@ DOCX_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml
 @router.get('/{offer_tpl_id}/download')
 async def download_offer_tpl(
     offer_tpl_id: str,
+    request: Request,
     service: Annotated[OfferTemplatesService, Depends(get_offer_tpls_service)],
     file_format: DocFormat = DocFormat.docx,
-) -> StreamingResponse:
+) -> Response:
     """Download offer template file.
 
+    Unchanged file is revalidated by ETag without reading it,
+    single byte range of file can be requested.
+
     Args:
         offer_tpl_id (str): Offer template id.
-        output_format (DocFormat, optional): Output format. Defaults to DocFormat.docx.
+        request (Request): Download request.
         service (OfferTemplatesService): Offer templates service.
+        file_format (DocFormat): Output format. Defaults to DocFormat.docx.
 
     Raises:
         OfferTemplateNotFound: Raised when the offer template is not found.
         FailConvertToPDF: Raised when the offer template conversion failed.
 
     Returns:
-        StreamingResponse: Offer template file.
+        Response: Offer template file, its range or Not Modified response.
     """
     try:
-        offer_tpl_stream = await service.get_offer_tpl_file(
+        offer_tpl = await service.get_offer_tpl(offer_tpl_id)
+    except OfferTemplateNotFoundError:
+        raise OfferTemplateNotFound()
+
+    etag = format_etag(offer_tpl.file_hash, file_format)
+    not_modified = get_not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    try:
+        offer_tpl_file = await service.get_offer_tpl_file(
             offer_tpl_id,
             file_format,
         )
     except OfferTemplateNotFoundError:
         raise OfferTemplateNotFound()
 
-    return StreamingResponse(
-        offer_tpl_stream.as_iterator(),
+    return make_file_response(
+        request,
+        offer_tpl_file,
+        file_name='{name}.{extension}'.format(
+            name=offer_tpl.name,
+            extension=file_format.value,
+        ),
         media_type=get_media_type(file_format),
-        headers={
-            'Content-Disposition': 'attachment',
-        },
+        etag=etag,
     )
 
 
 @router.post('/')
 async def create_offer_tpl(
     offer_tpl_data: OfferTemplateCreate,
-    admin: Annotated[User, Depends(get_admin)],
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
     service: Annotated[OfferTemplatesService, Depends(get_offer_tpls_service)],
 ) -> OfferTemplateResponse:
     """Create offer template.
 
     Args:
         offer_tpl_data (OfferTemplateCreate): Offer template data.
-        admin (User): Admin user.
+        admin (AuthorizedUser): Admin user.
         service (OfferTemplatesService): Offer templates service.
 
     Raises:
         BadOfferTemplateFile: Raised when the offer template file is bad.
+        FileTooLarge: Raised when the offer template file is too large.
 
     Returns:
-        OfferTemplate: Created offer template.
+        OfferTemplateResponse: Created offer template.
     """
     offer_tpl_file_data = decode_base64(offer_tpl_data.offer_tpl_file)
     if not offer_tpl_file_data:
@@ -154,6 +214,44 @@ async def create_offer_tpl(
         )
     except BadOfferTemplateFileError:
         raise BadOfferTemplateFile()
+    except FileTooLargeError:
+        raise FileTooLarge()
+
+    return OfferTemplateResponse(offer_tpl=offer_tpl)
+
+
+@router.post('/upload')
+async def upload_offer_tpl(
+    name: Annotated[str, Form()],
+    offer_tpl_file: UploadFile,
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
+    service: Annotated[OfferTemplatesService, Depends(get_offer_tpls_service)],
+) -> OfferTemplateResponse:
+    """Create offer template from multipart form.
+
+    Unlike `create_offer_tpl`, file is sent as is, without base64 encoding.
+    Template is validated as a whole, so file is read to memory and its
+    size is limited by `MAX_OFFER_TPL_SIZE`.
+
+    Args:
+        name (str): Offer template name.
+        offer_tpl_file (UploadFile): Offer template file.
+        admin (AuthorizedUser): Admin user.
+        service (OfferTemplatesService): Offer templates service.
+
+    Raises:
+        BadOfferTemplateFile: Raised when the offer template file is bad.
+        FileTooLarge: Raised when the offer template file is too large.
+
+    Returns:
+        OfferTemplateResponse: Created offer template.
+    """
+    try:
+        offer_tpl = await service.create_offer_tpl(name, offer_tpl_file.file)
+    except BadOfferTemplateFileError:
+        raise BadOfferTemplateFile()
+    except FileTooLargeError:
+        raise FileTooLarge()
 
     return OfferTemplateResponse(offer_tpl=offer_tpl)
 
@@ -162,7 +260,7 @@ async def create_offer_tpl(
 async def update_offer_tpl(
     offer_tpl_id: str,
     offer_tpl_data: OfferTemplateUpdate,
-    admin: Annotated[User, Depends(get_admin)],
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
     service: Annotated[OfferTemplatesService, Depends(get_offer_tpls_service)],
 ) -> OfferTemplateResponse:
     """Update offer template.
@@ -170,14 +268,16 @@ async def update_offer_tpl(
     Args:
         offer_tpl_id (str): Offer template id.
         offer_tpl_data (OfferTemplateUpdate): Offer template data.
-        admin (User): Admin user.
+        admin (AuthorizedUser): Admin user.
         service (OfferTemplatesService): Offer templates service.
 
     Raises:
         OfferTemplateNotFound: Raised when the offer template is not found.
+        BadOfferTemplateFile: Raised when the offer template file is bad.
+        FileTooLarge: Raised when the offer template file is too large.
 
     Returns:
-        OfferTemplate: Updated offer template.
+        OfferTemplateResponse: Updated offer template.
     """
     if offer_tpl_data.offer_tpl_file:
         offer_tpl_file_data = decode_base64(offer_tpl_data.offer_tpl_file)
@@ -192,6 +292,55 @@ async def update_offer_tpl(
         )
     except OfferTemplateNotFoundError:
         raise OfferTemplateNotFound()
+    except BadOfferTemplateFileError:
+        raise BadOfferTemplateFile()
+    except FileTooLargeError:
+        raise FileTooLarge()
+
+    return OfferTemplateResponse(offer_tpl=offer_tpl)
+
+
+@router.put('/{offer_tpl_id}/upload')
+async def upload_offer_tpl_update(
+    offer_tpl_id: str,
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
+    service: Annotated[OfferTemplatesService, Depends(get_offer_tpls_service)],
+    name: Annotated[Optional[str], Form()] = None,
+    offer_tpl_file: Optional[UploadFile] = None,
+) -> OfferTemplateResponse:
+    """Update offer template from multipart form.
+
+    Unlike `update_offer_tpl`, file is sent as is, without base64 encoding.
+    Template is validated as a whole, so file is read to memory and its
+    size is limited by `MAX_OFFER_TPL_SIZE`.
+
+    Args:
+        offer_tpl_id (str): Offer template id.
+        admin (AuthorizedUser): Admin user.
+        service (OfferTemplatesService): Offer templates service.
+        name (Optional[str]): Offer template name.
+        offer_tpl_file (Optional[UploadFile]): Offer template file.
+
+    Raises:
+        OfferTemplateNotFound: Raised when the offer template is not found.
+        BadOfferTemplateFile: Raised when the offer template file is bad.
+        FileTooLarge: Raised when the offer template file is too large.
+
+    Returns:
+        OfferTemplateResponse: Updated offer template.
+    """
+    try:
+        offer_tpl = await service.update_offer_tpl(
+            offer_tpl_id,
+            name,
+            offer_tpl_file.file if offer_tpl_file else None,
+        )
+    except OfferTemplateNotFoundError:
+        raise OfferTemplateNotFound()
+    except BadOfferTemplateFileError:
+        raise BadOfferTemplateFile()
+    except FileTooLargeError:
+        raise FileTooLarge()
 
     return OfferTemplateResponse(offer_tpl=offer_tpl)
 
@@ -199,14 +348,14 @@ async def update_offer_tpl(
 @router.delete('/{offer_tpl_id}')
 async def delete_offer_tpl(
     offer_tpl_id: str,
-    admin: Annotated[User, Depends(get_admin)],
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
     service: Annotated[OfferTemplatesService, Depends(get_offer_tpls_service)],
 ) -> OfferTemplateResponse:
     """Delete offer template.
 
     Args:
         offer_tpl_id (str): Offer template id.
-        admin (User): Admin user.
+        admin (AuthorizedUser): Admin user.
         service (OfferTemplatesService): Offer templates service.
 
     Raises:
@@ -223,11 +372,75 @@ async def delete_offer_tpl(
     return OfferTemplateResponse(offer_tpl=offer_tpl)
 
 
+async def read_offer_tpl_for_build(
+    service: OfferTemplatesService,
+    offer_tpl_id: str,
+    contexts: list[dict[str, Any]],
+) -> tuple[OfferTemplate, bytes]:
+    """Read offer template and check build contexts against it.
+
+    Contexts are checked against variables of template record before
+    its file is read, so incorrect contexts are rejected without file
+    download.
+
+    Args:
+        service (OfferTemplatesService): Offer templates service.
+        offer_tpl_id (str): Offer template id.
+        contexts (list[dict[str, Any]]): Offers context data.
+
+    Raises:
+        OfferTemplateNotFound: Raised when the offer template is not found.
+        IncorrectOfferTemplateContext: Raised when the context misses \
+            template variables.
+
+    Returns:
+        tuple[OfferTemplate, bytes]: Offer template and its file data.
+    """
+    try:
+        offer_tpl = await service.get_offer_tpl(offer_tpl_id)
+    except OfferTemplateNotFoundError:
+        raise OfferTemplateNotFound()
+
+    try:
+        for context in contexts:
+            check_offer_context(offer_tpl, context)
+    except IncorrectOfferTemplateContextError as exc:
+        raise IncorrectOfferTemplateContext(str(exc))
+
+    try:
+        offer_tpl_file = await service.read_offer_tpl_file(offer_tpl_id)
+    except OfferTemplateNotFoundError:
+        raise OfferTemplateNotFound()
+
+    return offer_tpl, offer_tpl_file
+
+
+async def iterate_offer_files(
+    built_offers: AsyncIterator[BuiltOffer],
+) -> AsyncIterator[tuple[str, bytes]]:
+    """Name built offer files in order of build contexts.
+
+    Args:
+        built_offers (AsyncIterator[BuiltOffer]): Built offers.
+
+    Yields:
+        tuple[str, bytes]: File name and data of built offer.
+    """
+    offer_number = 0
+    async for built_offer in built_offers:
+        offer_number += 1
+        file_name = '{number:03d}_{offer_id}.docx'.format(
+            number=offer_number,
+            offer_id=built_offer.offer.offer_id,
+        )
+        yield file_name, built_offer.offer_file
+
+
 @router.post('/{offer_tpl_id}/build')
 async def build_offer_tpl(
     offer_tpl_id: str,
     offer_data: OfferBuild,
-    user: Annotated[User, Depends(get_current_user)],
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
     service: Annotated[OfferTemplatesService, Depends(get_offer_tpls_service)],
     offers_service: Annotated[OffersService, Depends(get_offers_service)],
 ) -> BuildedOfferResponse:
@@ -236,25 +449,124 @@ async def build_offer_tpl(
     Args:
         offer_tpl_id (str): Offer template id.
         offer_data (OfferBuild): Offer data.
-        offers_drive (Annotated[_Drive, Depends): Offers drive.
-        offer_tpls_drive (Annotated[_Drive, Depends): Offer templates drive.
-        user (Annotated[User, Depends): Current user.
+        user (AuthorizedUser): Current user.
+        service (OfferTemplatesService): Offer templates service.
+        offers_service (OffersService): Offers service.
+
+    Raises:
+        IncorrectOfferTemplateContext: Raised when the context does not \
+            fit template.
 
     Returns:
-        StreamingResponse: Filled offer template file.
+        BuildedOfferResponse: Builded offer.
     """
+    offer_tpl, offer_tpl_file = await read_offer_tpl_for_build(
+        service,
+        offer_tpl_id,
+        [offer_data.context],
+    )
     try:
-        offer_tpl = await service.get_offer_tpl(offer_tpl_id)
-        offer_tpl_stream = await service.get_offer_tpl_file(offer_tpl_id, DocFormat.docx)
-    except OfferTemplateNotFoundError:
-        raise OfferTemplateNotFound()
+        built_offers = [
+            built_offer
+            async for built_offer in offers_service.build_offers(
+                name=offer_tpl.name,
+                created_by=user.name,
+                contexts=[offer_data.context],
+                offer_tpl_file=offer_tpl_file,
+            )
+        ]
+    except IncorrectOfferContextError:
+        raise IncorrectOfferTemplateContext()
+
+    return BuildedOfferResponse(offer=built_offers[0].offer)
+
+
+@router.post('/{offer_tpl_id}/build_batch')
+async def build_offer_tpl_batch(
+    offer_tpl_id: str,
+    offers_data: OffersBuild,
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
+    service: Annotated[OfferTemplatesService, Depends(get_offer_tpls_service)],
+    offers_service: Annotated[OffersService, Depends(get_offers_service)],
+) -> BuildedOffersResponse:
+    """Fill offer template with several contexts.
 
-    offer_tpl_file = offer_tpl_stream.read()
-    offer = await offers_service.build_offer(
+    Template is read once and offers are rendered in parallel.
+
+    Args:
+        offer_tpl_id (str): Offer template id.
+        offers_data (OffersBuild): Offers data.
+        user (AuthorizedUser): Current user.
+        service (OfferTemplatesService): Offer templates service.
+        offers_service (OffersService): Offers service.
+
+    Raises:
+        IncorrectOfferTemplateContext: Raised when some context does not \
+            fit template.
+
+    Returns:
+        BuildedOffersResponse: Builded offers in order of contexts.
+    """
+    offer_tpl, offer_tpl_file = await read_offer_tpl_for_build(
+        service,
+        offer_tpl_id,
+        offers_data.contexts,
+    )
+    try:
+        offers = [
+            built_offer.offer
+            async for built_offer in offers_service.build_offers(
+                name=offer_tpl.name,
+                created_by=user.name,
+                contexts=offers_data.contexts,
+                offer_tpl_file=offer_tpl_file,
+            )
+        ]
+    except IncorrectOfferContextError:
+        raise IncorrectOfferTemplateContext()
+
+    return BuildedOffersResponse(offers=offers)
+
+
+@router.post('/{offer_tpl_id}/build_batch/archive')
+async def build_offer_tpl_archive(
+    offer_tpl_id: str,
+    offers_data: OffersBuild,
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
+    service: Annotated[OfferTemplatesService, Depends(get_offer_tpls_service)],
+    offers_service: Annotated[OffersService, Depends(get_offers_service)],
+) -> StreamingResponse:
+    """Fill offer template with several contexts and stream ZIP of files.
+
+    Offers are saved as by batch build. Files are added to archive as soon
+    as their batch is built, so response is started before all offers
+    are built. Errors of later batches abort the response.
+
+    Args:
+        offer_tpl_id (str): Offer template id.
+        offers_data (OffersBuild): Offers data.
+        user (AuthorizedUser): Current user.
+        service (OfferTemplatesService): Offer templates service.
+        offers_service (OffersService): Offers service.
+
+    Returns:
+        StreamingResponse: ZIP archive of builded offer files.
+    """
+    offer_tpl, offer_tpl_file = await read_offer_tpl_for_build(
+        service,
+        offer_tpl_id,
+        offers_data.contexts,
+    )
+    built_offers = offers_service.build_offers(
         name=offer_tpl.name,
         created_by=user.name,
-        context=offer_data.context,
+        contexts=offers_data.contexts,
         offer_tpl_file=offer_tpl_file,
     )
-
-    return BuildedOfferResponse(offer=offer)
+    return StreamingResponse(
+        iterate_archive(iterate_offer_files(built_offers)),
+        media_type='application/zip',
+        headers={
+            'Content-Disposition': 'attachment; filename="offers.zip"',
+        },
+    )
@@ -1,14 +1,15 @@
 """Offers API."""
 
 
-from typing import Annotated
+from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, Form, Request, Response, UploadFile
 
 from app.api.dependencies.auth import get_admin, get_current_user
 from app.api.dependencies.offers import get_offers_service
+from app.api.exceptions.docx import FileTooLarge
 from app.api.exceptions.offers import BadOfferFile, OfferNotFound
+from app.api.responses import get_not_modified_response, make_file_response
 from app.api.schemes.offers import (
     OfferCreate,
     OfferListResponse,
@@ -16,23 +17,25 @@ from app.api.schemes.offers import (
     OfferUpdate,
 )
 from app.core.docx import DocFormat, decode_base64, get_media_type
+from app.core.downloads import format_etag
 from app.core.offers import OfferNotFoundError, OffersService
 from app.core.pagination import PaginationParams
-from app.models.user import User
+from app.core.streams import FileTooLargeError
+from app.models.user import AuthorizedUser
 
 router = APIRouter(prefix='/offers', tags=['offers'])
 
 
 @router.get('/')
 async def get_offers(
-    user: Annotated[User, Depends(get_current_user)],
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
     service: Annotated[OffersService, Depends(get_offers_service)],
     pagination: Annotated[PaginationParams, Depends(PaginationParams)],
 ) -> OfferListResponse:
     """Get offers list.
 
     Args:
-        user (User): Current user
+        user (AuthorizedUser): Current user
         service (OffersService): Offers service
         pagination (PaginationParams): Pagination params.
 
@@ -49,14 +52,14 @@ async def get_offers(
 @router.get('/{offer_id}')
 async def get_offer(
     offer_id: str,
-    user: Annotated[User, Depends(get_current_user)],
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
     service: Annotated[OffersService, Depends(get_offers_service)],
 ) -> OfferResponse:
     """Get offer by id.
 
     Args:
         offer_id (str): Offer id.
-        user (User): Current user.
+        user (AuthorizedUser): Current user.
         service (OffersService): Offers service.
 
     Raises:
@@ -76,13 +79,18 @@ async def get_offer(
 @router.get('/{offer_id}/download')
 async def download_offer(
     offer_id: str,
+    request: Request,
     service: Annotated[OffersService, Depends(get_offers_service)],
     file_format: DocFormat = DocFormat.docx,
-) -> StreamingResponse:
+) -> Response:
     """Download offer file.
 
+    Unchanged file is revalidated by ETag without reading it,
+    single byte range of file can be requested.
+
     Args:
         offer_id (str): Offer id.
+        request (Request): Download request.
         file_format (DocFormat): Output format. Defaults to DocFormat.docx.
         service (OffersService): Offers service.
 
@@ -91,37 +99,51 @@ async def download_offer(
         FailConvertToPDF: Raised when the offer file is bad.
 
     Returns:
-        StreamingResponse: Offer file.
+        Response: Offer file, its range or Not Modified response.
     """
     try:
-        offer_stream = await service.get_offer_file(offer_id, file_format)
+        offer = await service.get_offer(offer_id)
+    except OfferNotFoundError:
+        raise OfferNotFound()
+
+    etag = format_etag(offer.file_hash, file_format)
+    not_modified = get_not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    try:
+        offer_file = await service.get_offer_file(offer_id, file_format)
     except OfferNotFoundError:
         raise OfferNotFound()
 
-    return StreamingResponse(
-        offer_stream.as_iterator(),
+    return make_file_response(
+        request,
+        offer_file,
+        file_name='{name}.{extension}'.format(
+            name=offer.name,
+            extension=file_format.value,
+        ),
         media_type=get_media_type(file_format),
-        headers={
-            'Content-Disposition': 'attachment',
-        },
+        etag=etag,
     )
 
 
 @router.post('/')
 async def create_offer(
     offer_data: OfferCreate,
-    admin: Annotated[User, Depends(get_admin)],
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
     service: Annotated[OffersService, Depends(get_offers_service)],
 ) -> OfferResponse:
     """Create offer.
 
     Args:
         offer_data (OfferCreate): Offer data.
-        admin (User): Admin user.
+        admin (AuthorizedUser): Admin user.
         service (OffersService): Offers service.
 
     Raises:
         BadOfferFile: Raised when the offer file is bad.
+        FileTooLarge: Raised when the offer file is too large.
 
     Returns:
         OfferResponse: Created offer.
@@ -130,11 +152,51 @@ async def create_offer(
     if not offer_file:
         raise BadOfferFile()
 
-    offer = await service.create_offer(
-        name=offer_data.name,
-        created_by=admin.name,
-        offer_file=offer_file,
-    )
+    try:
+        offer = await service.create_offer(
+            name=offer_data.name,
+            created_by=admin.name,
+            offer_file=offer_file,
+        )
+    except FileTooLargeError:
+        raise FileTooLarge()
+
+    return OfferResponse(offer=offer)
+
+
+@router.post('/upload')
+async def upload_offer(
+    name: Annotated[str, Form()],
+    offer_file: UploadFile,
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
+    service: Annotated[OffersService, Depends(get_offers_service)],
+) -> OfferResponse:
+    """Create offer from multipart form.
+
+    Unlike `create_offer`, file is sent as is, without base64 encoding,
+    and is streamed to storage by chunks.
+
+    Args:
+        name (str): Offer name.
+        offer_file (UploadFile): Offer file.
+        admin (AuthorizedUser): Admin user.
+        service (OffersService): Offers service.
+
+    Raises:
+        FileTooLarge: Raised when the offer file is too large.
+
+    Returns:
+        OfferResponse: Created offer.
+    """
+    try:
+        offer = await service.create_offer(
+            name=name,
+            created_by=admin.name,
+            offer_file=offer_file.file,
+        )
+    except FileTooLargeError:
+        raise FileTooLarge()
+
     return OfferResponse(offer=offer)
 
 
@@ -142,7 +204,7 @@ async def create_offer(
 async def update_offer(
     offer_id: str,
     offer_data: OfferUpdate,
-    admin: Annotated[User, Depends(get_admin)],
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
     service: Annotated[OffersService, Depends(get_offers_service)],
 ) -> OfferResponse:
     """Update offer.
@@ -150,7 +212,7 @@ async def update_offer(
     Args:
         offer_id (str): Offer id.
         offer_data (OfferUpdate): Offer data.
-        admin (User): Admin user.
+        admin (AuthorizedUser): Admin user.
         service (OffersService): Offers service.
 
     Raises:
@@ -170,17 +232,58 @@ async def update_offer(
     return OfferResponse(offer=offer)
 
 
+@router.put('/{offer_id}/upload')
+async def upload_offer_update(
+    offer_id: str,
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
+    service: Annotated[OffersService, Depends(get_offers_service)],
+    name: Annotated[Optional[str], Form()] = None,
+    offer_file: Optional[UploadFile] = None,
+) -> OfferResponse:
+    """Update offer from multipart form.
+
+    File is sent as is, without base64 encoding,
+    and is streamed to storage by chunks.
+
+    Args:
+        offer_id (str): Offer id.
+        admin (AuthorizedUser): Admin user.
+        service (OffersService): Offers service.
+        name (Optional[str]): Offer name.
+        offer_file (Optional[UploadFile]): Offer file.
+
+    Raises:
+        OfferNotFound: Raised when the offer is not found.
+        FileTooLarge: Raised when the offer file is too large.
+
+    Returns:
+        OfferResponse: Updated offer.
+    """
+    try:
+        offer = await service.update_offer(
+            offer_id,
+            name=name,
+            offer_file=offer_file.file if offer_file else None,
+        )
+    except OfferNotFoundError:
+        raise OfferNotFound()
+    except FileTooLargeError:
+        raise FileTooLarge()
+
+    return OfferResponse(offer=offer)
+
+
 @router.delete('/{offer_id}')
 async def delete_offer(
     offer_id: str,
-    admin: Annotated[User, Depends(get_admin)],
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
     service: Annotated[OffersService, Depends(get_offers_service)],
 ) -> OfferResponse:
     """Delete offer.
 
     Args:
         offer_id (str): Offer id.
-        admin (User): Admin user.
+        admin (AuthorizedUser): Admin user.
         service (OffersService): Offers service.
 
     Raises:
@@ -25,19 +25,21 @@ from app.core.users import (
     UserNotFoundError,
     UsersService,
 )
-from app.models.user import User
+from app.models.user import AuthorizedUser
 
 router = APIRouter(prefix='/users', tags=['users'])
 
 
 @router.get('/me')
 async def get_my_user(
-    user: Annotated[User, Depends(get_current_user)],
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
+    service: Annotated[UsersService, Depends(get_users_service)],
 ) -> UserResponse:
     """Get current user.
 
     Args:
-        user (User): Authorized user model.
+        user (AuthorizedUser): Authorized user model.
+        service (UsersService): Users service.
 
     Raises:
         UserNotFound: If user not found in database.
@@ -45,20 +47,26 @@ async def get_my_user(
     Returns:
         UserResponse: _description_
     """
-    return UserResponse(user=UserOut(**user.dict()))
+    # Token claims may be outdated, so actual user data is returned
+    try:
+        db_user = await service.get_user(user.uid)
+    except UserNotFoundError:
+        raise UserNotFound()
+
+    return UserResponse(user=UserOut(**db_user.dict()))
 
 
 @router.put('/me')
 async def update_my_user(
     user_data: MyUserUpdate,
-    user: Annotated[User, Depends(get_current_user)],
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
     service: Annotated[UsersService, Depends(get_users_service)],
 ) -> UserResponse:
     """Update current user.
 
     Args:
         user_data (MyUserUpdate): User data. All fields are optional.
-        user (User): Authorized user model.
+        user (AuthorizedUser): Authorized user model.
         service (UsersService): Users service.
 
     Raises:
@@ -84,13 +92,13 @@ async def update_my_user(
 
 @router.patch('/me/password')
 async def update_my_user_password(
-    user: Annotated[User, Depends(get_current_user)],
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
     service: Annotated[UsersService, Depends(get_users_service)],
 ) -> UserPasswordResponse:
     """Generate new password for current user.
 
     Args:
-        user (User): Authorized user model.
+        user (AuthorizedUser): Authorized user model.
         service (UsersService): Users service.
 
     Raises:
@@ -112,14 +120,14 @@ async def update_my_user_password(
 
 @router.get('/')
 async def get_users(
-    admin: Annotated[User, Depends(get_admin)],
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
     service: Annotated[UsersService, Depends(get_users_service)],
     pagination: Annotated[PaginationParams, Depends(PaginationParams)],
 ) -> UserListResponse:
     """Get all users.
 
     Args:
-        admin (User): Current user must be an admin.
+        admin (AuthorizedUser): Current user must be an admin.
         service (UsersService): Users service.
         pagination (PaginationParams): Pagination params.
 
@@ -137,14 +145,14 @@ async def get_users(
 @router.get('/{uid}')
 async def get_user(
     uid: str,
-    admin: Annotated[User, Depends(get_admin)],
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
     service: Annotated[UsersService, Depends(get_users_service)],
 ) -> UserResponse:
     """Get user by id.
 
     Args:
         uid (str): User id.
-        admin (User): Current user must be an admin.
+        admin (AuthorizedUser): Current user must be an admin.
         service (UsersService): Users service.
 
     Raises:
@@ -165,7 +173,7 @@ async def get_user(
 @router.post('/')
 async def create_user(
     user_data: UserCreate,
-    admin: Annotated[User, Depends(get_admin)],
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
     service: Annotated[UsersService, Depends(get_users_service)],
 ) -> UserPasswordResponse:
     """Create user.
@@ -173,12 +181,12 @@ async def create_user(
     Password and user id are generated automatically.
     On creation login set to user id. Can be changed later.
 
-    See `app.core.users.generate_uid` and `app.core.security.get_password_hash`
+    See `app.core.users.generate_uid` and `app.core.passwords.PasswordHasher`
     for more details.
 
     Args:
         user_data (UserCreate): User name and role.
-        admin (User): Current user must be an admin.
+        admin (AuthorizedUser): Current user must be an admin.
         service (UsersService): Users service.
 
     Raises:
@@ -201,7 +209,7 @@ async def create_user(
 async def update_user(
     uid: str,
     user_data: UserUpdate,
-    admin: Annotated[User, Depends(get_admin)],
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
     service: Annotated[UsersService, Depends(get_users_service)],
 ) -> UserResponse:
     """Update user data.
@@ -209,7 +217,7 @@ async def update_user(
     Args:
         uid (str): User id.
         user_data (UserUpdate): User data. All fields are optional.
-        admin (User): Current user must be an admin.
+        admin (AuthorizedUser): Current user must be an admin.
         service (UsersService): Users service.
 
     Raises:
@@ -237,14 +245,14 @@ async def update_user(
 @router.patch('/{uid}/password')
 async def update_user_password(
     uid: str,
-    admin: Annotated[User, Depends(get_admin)],
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
     service: Annotated[UsersService, Depends(get_users_service)],
 ) -> UserPasswordResponse:
     """Generate new password for user.
 
     Args:
         uid (str): User id.
-        admin (User): Current user must be an admin.
+        admin (AuthorizedUser): Current user must be an admin.
         service (UsersService): Users service.
 
     Raises:
@@ -268,14 +276,14 @@ async def update_user_password(
 @router.delete('/{uid}')
 async def delete_user(
     uid: str,
-    admin: Annotated[User, Depends(get_admin)],
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
     service: Annotated[UsersService, Depends(get_users_service)],
 ) -> UserResponse:
     """Delete user.
 
     Args:
         uid (str): User id.
-        admin (User): Current user must be an admin.
+        admin (AuthorizedUser): Current user must be an admin.
         service (UsersService): Users service.
 
     Raises:
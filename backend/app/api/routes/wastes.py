@@ -5,15 +5,18 @@ Contains CRUD operations for wastes.
 
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 
 from app.api.dependencies.auth import get_admin, get_current_user
 from app.api.dependencies.wastes import get_wastes_service
 from app.api.exceptions.wastes import BadFKKOCode, WasteNotFound
 from app.api.schemes.wastes import (
+    FkkoGroupListResponse,
     WasteCreate,
     WasteListResponse,
     WasteResponse,
+    WastesReindexResponse,
+    WasteSuggestionListResponse,
     WasteUpdate,
 )
 from app.core.pagination import PaginationParams
@@ -23,14 +26,14 @@ from app.core.wastes import (
     WastesFilter,
     WastesService,
 )
-from app.models.user import User
+from app.models.user import AuthorizedUser
 
 router = APIRouter(prefix='/wastes', tags=['wastes'])
 
 
 @router.get('/')
 async def get_wastes(
-    user: Annotated[User, Depends(get_current_user)],
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
     service: Annotated[WastesService, Depends(get_wastes_service)],
     pagination: Annotated[PaginationParams, Depends(PaginationParams)],
     wastes_filter: Annotated[WastesFilter, Depends(WastesFilter)],
@@ -38,7 +41,7 @@ async def get_wastes(
     """Get all wastes.
 
     Args:
-        user (User): Current authorized user.
+        user (AuthorizedUser): Current authorized user.
         service (WastesService): Wastes service.
         pagination (PaginationParams): Pagination params.
         wastes_filter (WastesFilter): Wastes filter.
@@ -53,17 +56,70 @@ async def get_wastes(
     )
 
 
+@router.get('/fkko_groups')
+async def get_fkko_groups(
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
+    service: Annotated[WastesService, Depends(get_wastes_service)],
+    fkko_code_prefix: str = '',
+) -> FkkoGroupListResponse:
+    """Get groups of next FKKO hierarchy level with wastes counts.
+
+    Used to browse wastes catalog level by level.
+
+    Args:
+        user (AuthorizedUser): Current authorized user.
+        service (WastesService): Wastes service.
+        fkko_code_prefix (str): FKKO code prefix. Empty for top level.
+
+    Raises:
+        BadFKKOCode: Raised when the FKKO code prefix is invalid.
+
+    Returns:
+        FkkoGroupListResponse: FKKO groups.
+    """
+    try:
+        groups = await service.get_fkko_groups(fkko_code_prefix)
+    except BadFKKOCodeError:
+        raise BadFKKOCode()
+
+    return FkkoGroupListResponse(groups=groups)
+
+
+@router.get('/suggest')
+async def suggest_wastes(
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
+    service: Annotated[WastesService, Depends(get_wastes_service)],
+    query: str,
+    limit: Annotated[int, Query(ge=1, le=100)] = 10,
+) -> WasteSuggestionListResponse:
+    """Suggest wastes for typed name or FKKO code.
+
+    Used by autocomplete, so only fields shown to user are returned.
+
+    Args:
+        user (AuthorizedUser): Current authorized user.
+        service (WastesService): Wastes service.
+        query (str): Typed name or FKKO code.
+        limit (int): Max number of suggestions.
+
+    Returns:
+        WasteSuggestionListResponse: Suggested wastes, best first.
+    """
+    suggestions = await service.suggest_wastes(query, limit)
+    return WasteSuggestionListResponse(suggestions=suggestions)
+
+
 @router.get('/{waste_id}')
 async def get_waste(
     waste_id: str,
-    user: Annotated[User, Depends(get_current_user)],
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
     service: Annotated[WastesService, Depends(get_wastes_service)],
 ) -> WasteResponse:
     """Get waste by id.
 
     Args:
         waste_id (str): Waste id.
-        user (User): Current authorized user.
+        user (AuthorizedUser): Current authorized user.
         service (WastesService): Wastes service.
 
     Raises:
@@ -83,14 +139,14 @@ async def get_waste(
 @router.post('/')
 async def create_waste(
     waste_data: WasteCreate,
-    admin: Annotated[User, Depends(get_admin)],
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
     service: Annotated[WastesService, Depends(get_wastes_service)],
 ) -> WasteResponse:
     """Create a new waste.
 
     Args:
         waste_data (WasteCreate): Waste data.
-        admin (User): Current user must be an admin.
+        admin (AuthorizedUser): Current user must be an admin.
         service (WastesService): Wastes service.
 
     Raises:
@@ -110,18 +166,40 @@ async def create_waste(
     return WasteResponse(waste=waste)
 
 
+@router.post('/reindex')
+async def reindex_wastes(
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
+    service: Annotated[WastesService, Depends(get_wastes_service)],
+) -> WastesReindexResponse:
+    """Recompute search fields of all stored wastes.
+
+    Backfill job for change of normalization rules.
+
+    Args:
+        admin (AuthorizedUser): Current user must be an admin.
+        service (WastesService): Wastes service.
+
+    Returns:
+        WastesReindexResponse: Number of updated wastes.
+    """
+    updated_count = await service.reindex_wastes()
+    return WastesReindexResponse(updated_count=updated_count)
+
+
 @router.put('/{waste_id}')
 async def update_waste(
     waste_id: str,
     waste_data: WasteUpdate,
-    admin: Annotated[User, Depends(get_admin)],
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
+    service: Annotated[WastesService, Depends(get_wastes_service)],
 ) -> WasteResponse:
     """Update waste.
 
     Args:
         waste_id (str): Waste id.
         waste_data (WasteUpdate): Waste data.
-        admin (User): Current user must be an admin.
+        admin (AuthorizedUser): Current user must be an admin.
+        service (WastesService): Wastes service.
 
     Raises:
         WasteNotFound: Raised when the waste is not found.
@@ -130,7 +208,7 @@ async def update_waste(
         WasteResponse: Updated waste.
     """
     try:
-        waste = await WastesService().update_waste(
+        waste = await service.update_waste(
             waste_id=waste_id,
             name=waste_data.name,
             fkko_code=waste_data.fkko_code,
@@ -144,14 +222,14 @@ async def update_waste(
 @router.delete('/{waste_id}')
 async def delete_waste(
     waste_id: str,
-    admin: Annotated[User, Depends(get_admin)],
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
     service: Annotated[WastesService, Depends(get_wastes_service)],
 ) -> WasteResponse:
     """Delete waste.
 
     Args:
         waste_id (str): Waste id.
-        admin (User): Current user must be an admin.
+        admin (AuthorizedUser): Current user must be an admin.
         service (WastesService): Wastes service.
 
     Raises:
@@ -5,7 +5,7 @@ Contains CRUD operations for works.
 
 from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 
 from app.api.dependencies.auth import get_admin, get_current_user
 from app.api.dependencies.works import get_works_service
@@ -14,18 +14,20 @@ from app.api.schemes.works import (
     WorkCreate,
     WorkListResponse,
     WorkResponse,
+    WorksReindexResponse,
+    WorkSuggestionListResponse,
     WorkUpdate,
 )
 from app.core.pagination import PaginationParams
 from app.core.works import WorkNotFoundError, WorksFilter, WorksService
-from app.models.user import User
+from app.models.user import AuthorizedUser
 
 router = APIRouter(prefix='/works', tags=['works'])
 
 
 @router.get('/')
 async def get_works(
-    user: Annotated[User, Depends(get_current_user)],
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
     service: Annotated[WorksService, Depends(get_works_service)],
     pagination: Annotated[PaginationParams, Depends(PaginationParams)],
     works_filter: Annotated[Optional[WorksFilter], Depends(WorksFilter)],
@@ -33,7 +35,7 @@ async def get_works(
     """Get all works.
 
     Args:
-        user (User): Current authorized user.
+        user (AuthorizedUser): Current authorized user.
         service (WorksService): Works service.
         pagination (PaginationParams): Pagination params.
         works_filter (WorksFilter): Works filter.
@@ -48,17 +50,41 @@ async def get_works(
     )
 
 
+@router.get('/suggest')
+async def suggest_works(
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
+    service: Annotated[WorksService, Depends(get_works_service)],
+    query: str,
+    limit: Annotated[int, Query(ge=1, le=100)] = 10,
+) -> WorkSuggestionListResponse:
+    """Suggest works for typed name.
+
+    Used by autocomplete, so only fields shown to user are returned.
+
+    Args:
+        user (AuthorizedUser): Current authorized user.
+        service (WorksService): Works service.
+        query (str): Typed name.
+        limit (int): Max number of suggestions.
+
+    Returns:
+        WorkSuggestionListResponse: Suggested works, best first.
+    """
+    suggestions = await service.suggest_works(query, limit)
+    return WorkSuggestionListResponse(suggestions=suggestions)
+
+
 @router.get('/{work_id}')
 async def get_work(
     work_id: str,
-    user: Annotated[User, Depends(get_current_user)],
+    user: Annotated[AuthorizedUser, Depends(get_current_user)],
     service: Annotated[WorksService, Depends(get_works_service)],
 ) -> WorkResponse:
     """Get work by id.
 
     Args:
         work_id (str): Work id.
-        user (User): Current authorized user.
+        user (AuthorizedUser): Current authorized user.
         service (WorksService): Works service.
 
     Raises:
@@ -78,14 +104,14 @@ async def get_work(
 @router.post('/')
 async def create_work(
     work_data: WorkCreate,
-    admin: Annotated[User, Depends(get_admin)],
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
     service: Annotated[WorksService, Depends(get_works_service)],
 ) -> WorkResponse:
     """Create a new work.
 
     Args:
         work_data (WorkCreate): Work data.
-        admin (User): Current user must be an admin.
+        admin (AuthorizedUser): Current user must be an admin.
         service (WorksService): Works service.
 
     Raises:
@@ -98,11 +124,31 @@ async def create_work(
     return WorkResponse(work=work)
 
 
+@router.post('/reindex')
+async def reindex_works(
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
+    service: Annotated[WorksService, Depends(get_works_service)],
+) -> WorksReindexResponse:
+    """Recompute search fields of all stored works.
+
+    Backfill job for change of normalization rules.
+
+    Args:
+        admin (AuthorizedUser): Current user must be an admin.
+        service (WorksService): Works service.
+
+    Returns:
+        WorksReindexResponse: Number of updated works.
+    """
+    updated_count = await service.reindex_works()
+    return WorksReindexResponse(updated_count=updated_count)
+
+
 @router.put('/{work_id}')
 async def update_work(
     work_id: str,
     work_data: WorkUpdate,
-    admin: Annotated[User, Depends(get_admin)],
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
     service: Annotated[WorksService, Depends(get_works_service)],
 ) -> WorkResponse:
     """Update work.
@@ -110,7 +156,7 @@ async def update_work(
     Args:
         work_id (str): Work id.
         work_data (WorkUpdate): Work data.
-        admin (User): Current user must be an admin.
+        admin (AuthorizedUser): Current user must be an admin.
         service (WorksService): Works service.
 
     Raises:
@@ -130,14 +176,14 @@ async def update_work(
 @router.delete('/{work_id}')
 async def delete_work(
     work_id: str,
-    admin: Annotated[User, Depends(get_admin)],
+    admin: Annotated[AuthorizedUser, Depends(get_admin)],
     service: Annotated[WorksService, Depends(get_works_service)],
 ) -> WorkResponse:
     """Delete work.
 
     Args:
         work_id (str): Work id.
-        admin (User): Current user must be an admin.
+        admin (AuthorizedUser): Current user must be an admin.
         service (WorksService): Works service.
 
     Raises:
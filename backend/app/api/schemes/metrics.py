@@ -0,0 +1,18 @@
+"""Schemes of metrics API."""
+
+from pydantic import BaseModel
+
+from app.core.cache import CacheStats
+from app.core.passwords import PasswordHasherStats
+from app.core.render import RenderEngineStats
+
+
+class MetricsResponse(BaseModel):
+    """Application metrics response scheme."""
+
+    render: RenderEngineStats
+
+    # Caches of Deta Bases by names
+    entity_cache: dict[str, CacheStats]
+
+    password_hasher: PasswordHasherStats
@@ -23,6 +23,14 @@ class OfferTemplateListResponse(BaseModel):
     last: Optional[str]
 
 
+class OfferTemplateSchemaResponse(BaseModel):
+    """Offer template schema response scheme."""
+
+    # Context variables used by template.
+    # None if template was uploaded before variables collection.
+    variables: Optional[list[str]]
+
+
 class OfferTemplateCreate(BaseModel):
     """Offer template create scheme."""
 
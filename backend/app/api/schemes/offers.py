@@ -1,10 +1,11 @@
 """Schemes of offers API."""
 
 
-from typing import Optional
+from typing import Any, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
+from app.core.config import MAX_BUILD_BATCH_SIZE
 from app.models.offer import Offer
 
 
@@ -34,3 +35,18 @@ class OfferUpdate(BaseModel):
 
     name: Optional[str] = None
     offer_file: Optional[str] = None
+
+
+class OffersBuild(BaseModel):
+    """Scheme of offers batch build from template."""
+
+    contexts: list[dict[str, Any]] = Field(
+        min_items=1,
+        max_items=MAX_BUILD_BATCH_SIZE,
+    )
+
+
+class BuildedOffersResponse(BaseModel):
+    """Response scheme of builded offers."""
+
+    offers: list[Offer]
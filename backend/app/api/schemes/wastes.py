@@ -4,7 +4,7 @@ from typing import Optional
 
 from pydantic import BaseModel
 
-from app.models.waste import Waste
+from app.models.waste import FkkoGroup, Waste, WasteSuggestion
 
 
 class WasteCreate(BaseModel):
@@ -33,3 +33,21 @@ class WasteListResponse(BaseModel):
     wastes: list[Waste]
 
     last: Optional[str]
+
+
+class FkkoGroupListResponse(BaseModel):
+    """FKKO groups list response scheme."""
+
+    groups: list[FkkoGroup]
+
+
+class WasteSuggestionListResponse(BaseModel):
+    """Waste suggestions list response scheme."""
+
+    suggestions: list[WasteSuggestion]
+
+
+class WastesReindexResponse(BaseModel):
+    """Wastes reindex response scheme."""
+
+    updated_count: int
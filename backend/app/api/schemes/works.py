@@ -4,7 +4,7 @@ from typing import Optional
 
 from pydantic import BaseModel
 
-from app.models.work import Work
+from app.models.work import Work, WorkSuggestion
 
 
 class WorkCreate(BaseModel):
@@ -31,3 +31,15 @@ class WorkListResponse(BaseModel):
     works: list[Work]
 
     last: Optional[str]
+
+
+class WorkSuggestionListResponse(BaseModel):
+    """Work suggestions list response scheme."""
+
+    suggestions: list[WorkSuggestion]
+
+
+class WorksReindexResponse(BaseModel):
+    """Works reindex response scheme."""
+
+    updated_count: int
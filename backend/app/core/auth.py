@@ -1,12 +1,10 @@
 """Auth  functions and utilities."""
 
 from datetime import datetime, timedelta
-from secrets import token_urlsafe
+from secrets import compare_digest, token_urlsafe
 from typing import Any, Optional
 
-from deta import Base
 from jose import jwt
-from passlib.context import CryptContext
 
 from app.core.config import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
@@ -14,22 +12,25 @@ from app.core.config import (
     ROOT_LOGIN,
     ROOT_PASSWORD,
 )
-from app.core.deta import serialize_model
+from app.core.deta import Storage, serialize_model
+from app.core.passwords import PasswordHasher
 from app.models.user import User, UserRole
 
-pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
-
 ALGORITHM = 'HS256'
 
 
 def create_user_access_token(
-    uid: str,
+    user: User,
     expires_delta: Optional[timedelta] = None,
 ) -> str:
     """Create access JWT token for user auth.
 
+    User id is used as JWT subject. User login, name, role and token version
+    are signed as token claims, so requests can be authorized without
+    user lookup. See `app.core.users.get_authorized_user`.
+
     Args:
-        uid (str): User id. Will be used as JWT subject.
+        user (User): Authorized user.
         expires_delta (timedelta, optional): \
             Expires time. Defaults to ACCESS_TOKEN_EXPIRE_MINUTES.
 
@@ -43,7 +44,14 @@ def create_user_access_token(
             minutes=ACCESS_TOKEN_EXPIRE_MINUTES,
         )
 
-    token_data = {'exp': expire, 'sub': uid}
+    token_data = {
+        'exp': expire,
+        'sub': user.uid,
+        'login': user.login,
+        'name': user.name,
+        'role': user.role.value,
+        'ver': user.token_version,
+    }
     return jwt.encode(token_data, JWT_SECRET_KEY, algorithm=ALGORITHM)
 
 
@@ -73,31 +81,6 @@ def generate_password(length: int = 8) -> str:
     return token_urlsafe(length)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify password hash.
-
-    Args:
-        plain_password (str): Password to verify.
-        hashed_password (str): Hashed password.
-
-    Returns:
-        bool: True if password is correct, False otherwise.
-    """
-    return pwd_context.verify(plain_password, hashed_password)
-
-
-def get_password_hash(password: str) -> str:
-    """Get password hash with bcrypt HS256.
-
-    Args:
-        password (str): Password to hash.
-
-    Returns:
-        str: Hashed password.
-    """
-    return pwd_context.hash(password)
-
-
 class BadCredentialsError(Exception):
     """Bad credentials error."""
 
@@ -108,14 +91,26 @@ class AuthService(object):
     Provides methods for user authorization.
     """
 
-    def __init__(self) -> None:
-        """Initialize auth service."""
-        self.base = Base('users')
+    def __init__(
+        self,
+        storage: Storage,
+        password_hasher: PasswordHasher,
+    ) -> None:
+        """Initialize auth service.
+
+        Args:
+            storage (Storage): Deta storage.
+            password_hasher (PasswordHasher): Password hasher.
+        """
+        self.base = storage.base('users')
+        self.password_hasher = password_hasher
 
     async def authorize_user(self, login: str, password: str) -> User:
         """Verify user credentials.
 
-        New root user will be created and returned if user is root.
+        Root user is verified by `ROOT_PASSWORD` without password hashing.
+        Password hash of other users is updated if bcrypt cost factor
+        is changed.
 
         Args:
             login (str): User login.
@@ -127,38 +122,101 @@ class AuthService(object):
         Returns:
             User: User instance if credentials are valid.
         """
-        root_user = await self._register_root_user()
-        if login == ROOT_LOGIN and password == ROOT_PASSWORD:
-            return root_user
+        if login == ROOT_LOGIN:
+            return await self._authorize_root_user(password)
 
-        users_with_login = self.base.fetch({'login': login}).items
+        response = await self.base.fetch({'login': login})
+        users_with_login = response.items
         if not users_with_login:
             raise BadCredentialsError()
 
         user = User(**users_with_login[0])
 
-        if not verify_password(password, user.password_hash):
+        is_verified, new_password_hash = (
+            await self.password_hasher.verify_and_update(
+                password,
+                user.password_hash,
+            )
+        )
+        if not is_verified:
             raise BadCredentialsError()
 
+        if new_password_hash is not None:
+            user.password_hash = new_password_hash
+            await self.base.put(serialize_model(user), user.uid)
+
         return user
 
-    async def _register_root_user(self) -> User:
+    async def bootstrap_root_user(self) -> User:
         """Register root user.
 
-        If root user already exists, do nothing.
+        Called once on application startup. If root user already exists
+        with actual password, role and cost factor of password hash,
+        do nothing.
 
         See ROOT_LOGIN and ROOT_PASSWORD in Spacefile.
 
         Returns:
             User: User instance.
         """
+        db_user = await self.base.get(ROOT_LOGIN)
+        if db_user is not None:
+            root_user = User.parse_obj(db_user)
+            if await self._is_actual_root_user(root_user):
+                return root_user
+
+        # Token version is kept, so revoked root tokens stay revoked
         user = User(
             uid=ROOT_LOGIN,
             login=ROOT_LOGIN,
             name='Root',
             role=UserRole.superuser,
-            password_hash=get_password_hash(ROOT_PASSWORD),
+            password_hash=await self.password_hasher.hash(ROOT_PASSWORD),
+            token_version=db_user.get('token_version', 0) if db_user else 0,
         )
-        self.base.put(serialize_model(user), user.uid)
+        await self.base.put(serialize_model(user), user.uid)
 
         return User(**user.dict())
+
+    async def _authorize_root_user(self, password: str) -> User:
+        """Verify root user password.
+
+        Args:
+            password (str): User password.
+
+        Raises:
+            BadCredentialsError: If password is invalid.
+
+        Returns:
+            User: Root user instance.
+        """
+        if not compare_digest(password.encode(), ROOT_PASSWORD.encode()):
+            raise BadCredentialsError()
+
+        db_user = await self.base.get(ROOT_LOGIN)
+        # Root user may be deleted or demoted after bootstrap
+        if db_user is None or db_user['role'] != UserRole.superuser.value:
+            return await self.bootstrap_root_user()
+
+        return User.parse_obj(db_user)
+
+    async def _is_actual_root_user(self, user: User) -> bool:
+        """Check if root user has actual role and password.
+
+        Args:
+            user (User): Root user.
+
+        Returns:
+            bool: True if user is superuser with ROOT_PASSWORD, \
+                False otherwise.
+        """
+        if user.role != UserRole.superuser:
+            return False
+
+        if self.password_hasher.needs_update(user.password_hash):
+            return False
+
+        return await self.password_hasher.verify(
+            ROOT_PASSWORD,
+            user.password_hash,
+        )
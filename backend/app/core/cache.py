@@ -0,0 +1,133 @@
+"""In-memory caches."""
+
+from collections import OrderedDict
+from time import monotonic
+from typing import Generic, Optional, TypeVar
+
+from pydantic import BaseModel
+
+ValueType = TypeVar('ValueType')
+
+
+class CacheStats(BaseModel):
+    """Cache metrics."""
+
+    # Number of cached entries
+    size: int
+
+    # Lookups served from cache, including cached misses
+    hits: int
+
+    # Lookups not found in cache or expired
+    misses: int
+
+    # Entries evicted to keep cache size
+    evictions: int
+
+
+class CacheEntry(Generic[ValueType]):
+    """Cached value with expiration time."""
+
+    __slots__ = ('expires_at', 'cache_value')
+
+    def __init__(
+        self,
+        expires_at: float,
+        cache_value: Optional[ValueType],
+    ) -> None:
+        """Initialize entry.
+
+        Args:
+            expires_at (float): Expiration time by monotonic clock.
+            cache_value (Optional[ValueType]): Cached value.
+        """
+        self.expires_at = expires_at
+        self.cache_value = cache_value
+
+
+class TTLCache(Generic[ValueType]):
+    """LRU cache with entries expiration.
+
+    `None` values are cached as well, so missing entities
+    can be cached too (negative caching) with own TTL.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        negative_ttl: float,
+    ) -> None:
+        """Initialize cache.
+
+        Args:
+            max_size (int): Max number of entries.
+            ttl (float): Entry time to live in seconds.
+            negative_ttl (float): Time to live of `None` entry in seconds.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: OrderedDict[str, CacheEntry[ValueType]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: str) -> tuple[bool, Optional[ValueType]]:
+        """Get cached value.
+
+        Args:
+            key (str): Entry key.
+
+        Returns:
+            tuple[bool, Optional[ValueType]]: Flag whether entry was found \
+                and cached value.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at < monotonic():
+            self._misses += 1
+            return False, None
+
+        self._hits += 1
+        self._entries.move_to_end(key)
+        return True, entry.cache_value
+
+    def set(self, key: str, cache_value: Optional[ValueType]) -> None:
+        """Set cached value.
+
+        Args:
+            key (str): Entry key.
+            cache_value (Optional[ValueType]): Value. `None` is cached \
+                with negative TTL.
+        """
+        ttl = self.negative_ttl if cache_value is None else self.ttl
+        self._entries[key] = CacheEntry(monotonic() + ttl, cache_value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def invalidate(self, key: str) -> None:
+        """Remove cached value.
+
+        Args:
+            key (str): Entry key.
+        """
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all cached values."""
+        self._entries.clear()
+
+    def get_stats(self) -> CacheStats:
+        """Get cache metrics.
+
+        Returns:
+            CacheStats: Cache metrics.
+        """
+        return CacheStats(
+            size=len(self._entries),
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+        )
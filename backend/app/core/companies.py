@@ -1,8 +1,7 @@
 """Companies business logic."""
 
-from deta import Base
 
-from app.core.deta import serialize_model
+from app.core.deta import Storage, serialize_model
 from app.core.models import generate_id
 from app.core.pagination import (
     PaginationParams,
@@ -22,9 +21,13 @@ class CompaniesService(object):
     Contains CRUD and manipulating operations for companies.
     """
 
-    def __init__(self) -> None:
-        """Initialize companies service."""
-        self.base = Base('companies')
+    def __init__(self, storage: Storage) -> None:
+        """Initialize companies service.
+
+        Args:
+            storage (Storage): Deta storage.
+        """
+        self.base = storage.base('companies')
 
     async def get_companies(
         self,
@@ -38,7 +41,7 @@ class CompaniesService(object):
         Returns:
             PaginationResponse[Company]: Pagination response.
         """
-        response = self.base.fetch(
+        response = await self.base.fetch(
             limit=pagination.limit,
             last=pagination.last,
         )
@@ -63,7 +66,7 @@ class CompaniesService(object):
         Returns:
             Company: Company instance.
         """
-        db_company = self.base.get(company_id)
+        db_company = await self.base.get(company_id)
         if db_company is None:
             raise CompanyNotFoundError()
 
@@ -83,7 +86,7 @@ class CompaniesService(object):
             company_id=company_id,
             name=name,
         )
-        self.base.put(serialize_model(company), company_id)
+        await self.base.put(serialize_model(company), company_id)
 
         return company
 
@@ -100,12 +103,12 @@ class CompaniesService(object):
         Returns:
             Company: Updated company.
         """
-        db_company = self.base.get(company_id)
+        db_company = await self.base.get(company_id)
         if db_company is None:
             raise CompanyNotFoundError()
 
         db_company['name'] = name
-        self.base.put(db_company, company_id)
+        await self.base.put(db_company, company_id)
 
         return Company.parse_obj(db_company)
 
@@ -121,10 +124,10 @@ class CompaniesService(object):
         Returns:
             Company: Deleted company.
         """
-        db_company = self.base.get(company_id)
+        db_company = await self.base.get(company_id)
         if db_company is None:
             raise CompanyNotFoundError()
 
-        self.base.delete(company_id)
+        await self.base.delete(company_id)
 
         return Company.parse_obj(db_company)
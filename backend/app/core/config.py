@@ -13,6 +13,79 @@ AGENTS_API_KEY = environ['AGENTS_API_KEY']
 
 PDF_API_KEY = environ['PDF_API_KEY']
 
+# Max number of concurrent connections to PSPDFKit API
+PDF_API_CONNECTIONS = int(environ.get('PDF_API_CONNECTIONS', '4'))
+
+# Docx to PDF converter: `pspdfkit` (remote API) or `libreoffice` (local)
+PDF_CONVERTER = environ.get('PDF_CONVERTER', 'pspdfkit')
+
+# Max number of concurrent background conversions of uploaded files to PDF.
+# Files uploaded while limit is reached are converted on first download.
+PDF_PRERENDER_JOBS = int(environ.get('PDF_PRERENDER_JOBS', '2'))
+
+# Path to LibreOffice executable
+LIBREOFFICE_PATH = environ.get('LIBREOFFICE_PATH', 'soffice')
+
+# Number of LibreOffice workers. Max number of concurrent conversions.
+LIBREOFFICE_WORKERS = int(environ.get('LIBREOFFICE_WORKERS', '2'))
+
+# LibreOffice conversion timeout in seconds
+LIBREOFFICE_TIMEOUT = float(environ.get('LIBREOFFICE_TIMEOUT', '30'))
+
+# Number of conversions after which LibreOffice worker profile is recreated
+LIBREOFFICE_MAX_JOBS = int(environ.get('LIBREOFFICE_MAX_JOBS', '100'))
+
 ROOT_LOGIN = environ['ROOT_LOGIN']
 
 ROOT_PASSWORD = environ['ROOT_PASSWORD']
+
+# Max size of uploaded offer files in bytes. Defaults to 20 MiB.
+MAX_UPLOAD_SIZE = int(environ.get('MAX_UPLOAD_SIZE', '20971520'))
+
+# Max size of uploaded offer template files in bytes. Templates are validated
+# and compiled as a whole, so they are read to memory. Defaults to 10 MiB.
+MAX_OFFER_TPL_SIZE = int(environ.get('MAX_OFFER_TPL_SIZE', '10485760'))
+
+# Max number of offers built from template by single request
+MAX_BUILD_BATCH_SIZE = int(environ.get('MAX_BUILD_BATCH_SIZE', '200'))
+
+# Memory budget of compiled offer templates cache in bytes. Defaults to 64 MiB.
+OFFER_TPL_CACHE_SIZE = int(environ.get('OFFER_TPL_CACHE_SIZE', '67108864'))
+
+# Number of worker processes used for offers rendering
+RENDER_WORKERS = int(environ.get('RENDER_WORKERS', '2'))
+
+# Max number of cached items per Deta Base. Cache is disabled if zero.
+ENTITY_CACHE_SIZE = int(environ.get('ENTITY_CACHE_SIZE', '1000'))
+
+# Time to live of cached items in seconds
+ENTITY_CACHE_TTL = float(environ.get('ENTITY_CACHE_TTL', '300'))
+
+# Time to live of cached absence of items in seconds
+ENTITY_CACHE_NEGATIVE_TTL = float(
+    environ.get('ENTITY_CACHE_NEGATIVE_TTL', '30'),
+)
+
+# bcrypt cost factor. Hashes with other cost are updated on login.
+BCRYPT_ROUNDS = int(environ.get('BCRYPT_ROUNDS', '12'))
+
+# Number of threads used for password hashing
+PASSWORD_HASHER_WORKERS = int(environ.get('PASSWORD_HASHER_WORKERS', '2'))
+
+# Refresh interval of access token versions table in seconds
+TOKEN_VERSIONS_REFRESH_INTERVAL = float(
+    environ.get('TOKEN_VERSIONS_REFRESH_INTERVAL', '60'),
+)
+
+# Refresh interval of wastes search index in seconds
+WASTES_INDEX_REFRESH_INTERVAL = float(
+    environ.get('WASTES_INDEX_REFRESH_INTERVAL', '300'),
+)
+
+# Refresh interval of works search index in seconds
+WORKS_INDEX_REFRESH_INTERVAL = float(
+    environ.get('WORKS_INDEX_REFRESH_INTERVAL', '300'),
+)
+
+# Max number of cached typeahead suggestions per index, 0 to disable cache
+SUGGESTIONS_CACHE_SIZE = int(environ.get('SUGGESTIONS_CACHE_SIZE', '256'))
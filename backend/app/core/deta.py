@@ -1,12 +1,37 @@
-"""Utilities for Deta SDK."""
+"""Utilities for Deta SDK.
 
+Services work with Deta Base and Drive through async clients of `Storage`,
+so concurrent requests overlap their I/O instead of blocking event loop.
+"""
 
+
+import asyncio
 import json
-from io import BytesIO
-from typing import Any, Iterator, Literal, Optional
+from collections import Counter
+from collections.abc import Callable
+from contextlib import contextmanager
+from copy import deepcopy
+from io import BufferedIOBase
+from queue import Empty, SimpleQueue
+from typing import (
+    Any,
+    Awaitable,
+    BinaryIO,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Union,
+)
 
+from deta import Deta
 from pydantic import BaseModel
 
+from app.core.cache import CacheStats, TTLCache
+
+# Max number of items in single put_many request of Deta Base
+PUT_MANY_LIMIT = 25
+
 
 def serialize_model(model: BaseModel) -> Any:
     """Serialize pydantic model to valid json.
@@ -20,65 +45,571 @@ def serialize_model(model: BaseModel) -> Any:
     return json.loads(model.json())
 
 
-class BytesIterator(BytesIO):
-    """Wrapper for bytes iterator to IO.
+class FetchResponse(NamedTuple):
+    """Response of Base fetch."""
+
+    # Fetched items
+    items: list[dict[str, Any]]  # noqa: WPS110
+
+    # Last item key. None, if there are no more items.
+    last: Optional[str]
+
 
-    Used to wrap Drive stream body to make it readable.
+class AsyncBase(object):
+    """Async Deta Base client.
 
-    See https://docs.python.org/3/library/io.html#io.BufferedIOBase
-    for more details.
+    Wraps `AsyncBase` from `deta[async]`. Underlying client owns aiohttp
+    session, so it is created lazily inside running event loop.
     """
 
-    def __init__(self, iterator: Iterator[bytes]) -> None:
-        """Initialize wrapper.
+    def __init__(self, deta: Deta, name: str) -> None:
+        """Initialize client.
 
         Args:
-            iterator (Iterator[bytes]): Bytes iterator
+            deta (Deta): Deta project.
+            name (str): Base name.
         """
-        self._iterator = iterator
-        self._buffer = BytesIO()
+        self.name = name
+        self._deta = deta
+        self._client: Any = None
 
-    def read(self, size: Optional[int] = -1) -> bytes:
-        """Read bytes from iterator.
+    async def get(self, key: str) -> Optional[dict[str, Any]]:
+        """Get item by key.
 
         Args:
-            size (int): Bytes to read. Defaults to -1.
+            key (str): Item key.
 
         Returns:
-            bytes: Read bytes
+            Optional[dict[str, Any]]: Item if found, None otherwise.
+        """
+        return await self._get_client().get(key)  # type: ignore[no-any-return]
+
+    async def put(self, record: dict[str, Any], key: str) -> None:
+        """Put item.
+
+        Args:
+            record (dict[str, Any]): Item data.
+            key (str): Item key.
+        """
+        await self._get_client().put(record, key)
+
+    async def put_many(self, records: dict[str, dict[str, Any]]) -> None:
+        """Put items by batches of `PUT_MANY_LIMIT` items.
+
+        Batches are put concurrently.
+
+        Args:
+            records (dict[str, dict[str, Any]]): Items data by keys.
         """
-        if size is None or size < 0:
-            return b''.join(self._iterator)
+        keyed_records = [
+            {**record, 'key': key}
+            for key, record in records.items()
+        ]
+        await asyncio.gather(*(
+            self._get_client().put_many(
+                keyed_records[start:start + PUT_MANY_LIMIT],
+            )
+            for start in range(0, len(keyed_records), PUT_MANY_LIMIT)
+        ))
+
+    async def update(self, updates: dict[str, Any], key: str) -> None:
+        """Update fields of existing item.
+
+        Other fields are left as they are in storage, so concurrent
+        updates of different fields do not overwrite each other.
 
-        while self._buffer.tell() < size:
-            try:
-                self._buffer.write(next(self._iterator))
-            except StopIteration:
-                break
+        Args:
+            updates (dict[str, Any]): New values by field names.
+            key (str): Item key.
+        """
+        await self._get_client().update(updates, key)
+
+    async def delete(self, key: str) -> None:
+        """Delete item.
+
+        Args:
+            key (str): Item key.
+        """
+        await self._get_client().delete(key)
 
-        self._buffer.seek(0)
-        return self._buffer.read(size)
+    async def fetch(
+        self,
+        query: Optional[dict[str, Any]] = None,
+        limit: int = 1000,
+        last: Optional[str] = None,
+    ) -> FetchResponse:
+        """Fetch items.
 
-    def readable(self) -> Literal[True]:
-        """Define that stream is readable.
+        Args:
+            query (Optional[dict[str, Any]]): Deta query.
+            limit (int): Max items count. Defaults to 1000.
+            last (Optional[str]): Last item key from previous page.
 
         Returns:
-            bool: Always True
+            FetchResponse: Fetched items.
         """
-        return True
+        response = await self._get_client().fetch(
+            query,
+            limit=limit,
+            last=last,
+        )
+        return FetchResponse(items=response.items, last=response.last)
+
+    async def update_all(
+        self,
+        update: Callable[[dict[str, Any]], bool],
+    ) -> int:
+        """Update all items page by page.
 
-    def writable(self) -> Literal[False]:
-        """Define that stream is not writable.
+        Changed items of page are put by batches, see `put_many`,
+        before next page is fetched.
+
+        Args:
+            update (Callable[[dict[str, Any]], bool]): Function, which \
+                changes item in place and returns True if it was changed.
 
         Returns:
-            bool: Always False
+            int: Number of changed items.
         """
-        return False
+        updated_count = 0
+        last: Optional[str] = None
+        while True:
+            response = await self.fetch(last=last)
+            records = {
+                record['key']: record
+                for record in response.items
+                if update(record)
+            }
+            await self.put_many(records)
+            updated_count += len(records)
+
+            last = response.last
+            if last is None:
+                return updated_count
 
-    def as_iterator(self) -> Iterator[bytes]:
-        """Get bytes iterator.
+    async def close(self) -> None:
+        """Close client session."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    def _get_client(self) -> Any:
+        """Get underlying client, creating it on first use.
 
         Returns:
-            Iterator[bytes]: Bytes iterator
+            Any: `deta.AsyncBase` client.
+        """
+        if self._client is None:
+            self._client = self._deta.AsyncBase(self.name)
+
+        return self._client
+
+
+class CachedBase(AsyncBase):
+    """Async Deta Base client with read-through cache of items.
+
+    Items are cached by `get` and updated or invalidated by `put` and `delete`
+    of this client. Missing items are cached too. Cached items are copied,
+    so callers can modify them freely.
+
+    Keys have write generations, which are increased by every write. Item
+    fetched on cache miss is cached only if its key was not written during
+    fetch, so fetched outdated item does not replace newer one. Generations
+    are kept only for keys with pending fetches.
+    """
+
+    def __init__(self, deta: Deta, name: str, cache: TTLCache[Any]) -> None:
+        """Initialize client.
+
+        Args:
+            deta (Deta): Deta project.
+            name (str): Base name.
+            cache (TTLCache[Any]): Items cache.
         """
-        return self._iterator
+        super().__init__(deta, name)
+        self.cache = cache
+        self._generations: dict[str, int] = {}
+        # Number of pending fetches by key
+        self._fetches: Counter[str] = Counter()
+
+    async def get(self, key: str) -> Optional[dict[str, Any]]:
+        """Get item by key, using cache.
+
+        Args:
+            key (str): Item key.
+
+        Raises:
+            Exception: Fetch error.
+            asyncio.CancelledError: If fetch is cancelled.
+
+        Returns:
+            Optional[dict[str, Any]]: Item if found, None otherwise.
+        """
+        found, cached_record = self.cache.get(key)
+        if found:
+            return deepcopy(cached_record)
+
+        generation = self._generations.setdefault(key, 0)
+        self._fetches[key] += 1
+        try:
+            cached_record = await super().get(key)
+        except (Exception, asyncio.CancelledError):
+            self._finish_fetch(key)
+            raise
+
+        # Item written during fetch may be newer than fetched one
+        if self._generations[key] == generation:
+            self.cache.set(key, cached_record)
+
+        self._finish_fetch(key)
+        return deepcopy(cached_record)
+
+    async def put(self, record: dict[str, Any], key: str) -> None:
+        """Put item and cache it.
+
+        Args:
+            record (dict[str, Any]): Item data.
+            key (str): Item key.
+        """
+        # Item is invalidated first, so failed put does not leave stale item
+        self._invalidate(key)
+        await super().put(record, key)
+        self._store(key, deepcopy({**record, 'key': key}))
+
+    async def put_many(self, records: dict[str, dict[str, Any]]) -> None:
+        """Put items and cache them.
+
+        Args:
+            records (dict[str, dict[str, Any]]): Items data by keys.
+        """
+        # Items are invalidated first, so failed put does not leave stale items
+        for outdated_key in records:
+            self._invalidate(outdated_key)
+
+        await super().put_many(records)
+        for key, record in records.items():
+            self._store(key, deepcopy({**record, 'key': key}))
+
+    async def update(self, updates: dict[str, Any], key: str) -> None:
+        """Update fields of item and invalidate it.
+
+        Args:
+            updates (dict[str, Any]): New values by field names.
+            key (str): Item key.
+        """
+        # Updated item is not known without fetch, so it is not cached
+        self._invalidate(key)
+        await super().update(updates, key)
+        self._invalidate(key)
+
+    async def delete(self, key: str) -> None:
+        """Delete item and cache its absence.
+
+        Args:
+            key (str): Item key.
+        """
+        self._invalidate(key)
+        await super().delete(key)
+        self._store(key, None)
+
+    def _finish_fetch(self, key: str) -> None:
+        """Stop tracking generation of key without pending fetches.
+
+        Args:
+            key (str): Item key.
+        """
+        self._fetches[key] -= 1
+        if not self._fetches[key]:
+            self._fetches.pop(key)
+            self._generations.pop(key)
+
+    def _invalidate(self, key: str) -> None:
+        """Remove cached item before write.
+
+        Args:
+            key (str): Item key.
+        """
+        generation = self._generations.get(key)
+        if generation is not None:
+            self._generations[key] = generation + 1
+
+        self.cache.invalidate(key)
+
+    def _store(self, key: str, record: Optional[dict[str, Any]]) -> None:
+        """Cache written item.
+
+        Generation is increased again, so fetches overlapping write
+        do not cache item read before write completion.
+
+        Args:
+            key (str): Item key.
+            record (Optional[dict[str, Any]]): Item or None if deleted.
+        """
+        generation = self._generations.get(key)
+        if generation is not None:
+            self._generations[key] = generation + 1
+
+        self.cache.set(key, record)
+
+
+class AsyncDrive(object):
+    """Deta Drive client with async interface.
+
+    Deta SDK has no async Drive client, so calls of sync client are run
+    in threads. Sync client keeps single HTTP connection and is not
+    thread-safe, so every call takes own client from pool.
+    """
+
+    def __init__(self, deta: Deta, name: str) -> None:
+        """Initialize client.
+
+        Args:
+            deta (Deta): Deta project.
+            name (str): Drive name.
+        """
+        self.name = name
+        self._deta = deta
+        self._clients: SimpleQueue[Any] = SimpleQueue()
+
+    async def get(self, name: str) -> Any:
+        """Get file stream.
+
+        Stream holds connection until it is read,
+        so its client is not returned to pool.
+
+        Args:
+            name (str): File name.
+
+        Returns:
+            Any: Drive streaming body if file found, None otherwise.
+        """
+        client = self._acquire()
+        return await asyncio.to_thread(client.get, name)
+
+    async def read(self, name: str) -> Optional[bytes]:
+        """Read whole file.
+
+        Args:
+            name (str): File name.
+
+        Returns:
+            Optional[bytes]: File data if file found, None otherwise.
+        """
+        return await asyncio.to_thread(self._read, name)
+
+    async def put(
+        self,
+        name: str,
+        file_data: Union[bytes, BinaryIO, BufferedIOBase],
+    ) -> None:
+        """Put file.
+
+        Large file objects are uploaded by chunks.
+
+        Args:
+            name (str): File name.
+            file_data (Union[bytes, BinaryIO, BufferedIOBase]): File data \
+                or file object.
+        """
+        await asyncio.to_thread(self._call, 'put', name, file_data)
+
+    async def delete(self, name: str) -> None:
+        """Delete file.
+
+        Args:
+            name (str): File name.
+        """
+        await asyncio.to_thread(self._call, 'delete', name)
+
+    def close(self) -> None:
+        """Drop pooled clients with their connections."""
+        while not self._clients.empty():
+            self._clients.get_nowait()
+
+    def _read(self, name: str) -> Optional[bytes]:
+        """Read whole file with pooled client.
+
+        Args:
+            name (str): File name.
+
+        Returns:
+            Optional[bytes]: File data if file found, None otherwise.
+        """
+        with self._pooled_client() as client:
+            stream_body = client.get(name)
+            return stream_body.read() if stream_body else None
+
+    def _call(self, method: str, *args: Any) -> Any:
+        """Call method of pooled client.
+
+        Args:
+            method (str): Client method name.
+            args (Any): Method arguments.
+
+        Returns:
+            Any: Method result.
+        """
+        with self._pooled_client() as client:
+            return getattr(client, method)(*args)
+
+    @contextmanager
+    def _pooled_client(self) -> Iterator[Any]:
+        """Take client from pool and return it back after use.
+
+        Client is not returned if call failed,
+        because its connection can be left in inconsistent state.
+
+        Yields:
+            Any: `deta.Drive` client.
+        """
+        client = self._acquire()
+        yield client
+        self._clients.put(client)
+
+    def _acquire(self) -> Any:
+        """Take client from pool or create new one.
+
+        Returns:
+            Any: `deta.Drive` client.
+        """
+        try:
+            return self._clients.get_nowait()
+        except Empty:
+            return self._deta.Drive(self.name)
+
+
+class Storage(object):
+    """Deta storage.
+
+    Single entry point to Deta Base and Drive for services.
+    Storage lives during whole application lifetime, so clients are
+    created once per name and their keep-alive connections are reused
+    by all requests.
+    """
+
+    def __init__(
+        self,
+        cache_size: int = 0,
+        cache_ttl: float = 0,
+        cache_negative_ttl: float = 0,
+    ) -> None:
+        """Initialize storage. Project key is taken from environment.
+
+        Args:
+            cache_size (int): Max number of cached items per Base. \
+                Items are not cached if zero.
+            cache_ttl (float): Time to live of cached items in seconds.
+            cache_negative_ttl (float): Time to live of cached absence \
+                of items in seconds.
+        """
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.cache_negative_ttl = cache_negative_ttl
+        self._deta: Optional[Deta] = None
+        self._bases: dict[str, AsyncBase] = {}
+        self._drives: dict[str, AsyncDrive] = {}
+
+    def base(self, name: str) -> AsyncBase:
+        """Get Base client.
+
+        Args:
+            name (str): Base name.
+
+        Returns:
+            AsyncBase: Base client. Client is cached if cache is enabled.
+        """
+        base = self._bases.get(name)
+        if base is not None:
+            return base
+
+        if self.cache_size:
+            cache: TTLCache[Any] = TTLCache(
+                self.cache_size,
+                self.cache_ttl,
+                self.cache_negative_ttl,
+            )
+            self._bases[name] = CachedBase(self._get_deta(), name, cache)
+        else:
+            self._bases[name] = AsyncBase(self._get_deta(), name)
+
+        return self._bases[name]
+
+    def drive(self, name: str) -> AsyncDrive:
+        """Get Drive client.
+
+        Args:
+            name (str): Drive name.
+
+        Returns:
+            AsyncDrive: Drive client.
+        """
+        if name not in self._drives:
+            self._drives[name] = AsyncDrive(self._get_deta(), name)
+
+        return self._drives[name]
+
+    def get_cache_stats(self) -> dict[str, CacheStats]:
+        """Get metrics of Base caches.
+
+        Returns:
+            dict[str, CacheStats]: Cache metrics by Base name.
+        """
+        return {
+            name: base.cache.get_stats()
+            for name, base in self._bases.items()
+            if isinstance(base, CachedBase)
+        }
+
+    async def close(self) -> None:
+        """Close all clients."""
+        for drive in self._drives.values():
+            drive.close()
+
+        bases = self._bases.values()
+        await asyncio.gather(*(base.close() for base in bases))
+
+    def _get_deta(self) -> Deta:
+        """Get Deta project, creating it on first use.
+
+        Returns:
+            Deta: Deta project.
+        """
+        if self._deta is None:
+            self._deta = Deta()
+
+        return self._deta
+
+
+async def gather_writes(
+    writes: Iterable[Awaitable[Any]],
+    keys: list[str],
+    storages: Iterable[Union[AsyncBase, AsyncDrive]],
+) -> None:
+    """Run independent writes of items to Bases and Drives concurrently.
+
+    Writes take single round trip instead of one per storage. If any write
+    fails, items are deleted from all storages, so no record is left
+    referring to missing file or vice versa. All writes are finished
+    before deletion, so it does not race with writes in progress.
+
+    Args:
+        writes (Iterable[Awaitable[Any]]): Writes of items.
+        keys (list[str]): Keys of written items.
+        storages (Iterable[Union[AsyncBase, AsyncDrive]]): Storages \
+            written to.
+
+    Raises:
+        Exception: Error of failed write. Written items are deleted.
+    """
+    pending = [asyncio.ensure_future(write) for write in writes]
+    await asyncio.wait(pending)
+    try:
+        for write in pending:
+            write.result()
+    except Exception:
+        # Deletion is best effort, the write error is more relevant
+        await asyncio.gather(
+            *(storage.delete(key) for storage in storages for key in keys),
+            return_exceptions=True,
+        )
+        raise
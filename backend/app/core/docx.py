@@ -1,15 +1,17 @@
 """MS Word docx files utilities."""
 
 
+import asyncio
 import base64
 import json
+from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Iterator, Optional
+from typing import AsyncIterator, BinaryIO, Optional
 
-import requests
+import aiohttp
 
 from app.api.exceptions.docx import FailConvertToPDF
-from app.core.config import PDF_API_KEY
+from app.core.streams import CHUNK_SIZE
 
 
 def decode_base64(file_data: str) -> Optional[bytes]:
@@ -36,6 +38,17 @@ class DocFormat(Enum):
 
 PDF_API_URL_BASE = 'https://api.pspdfkit.com'
 
+# Timeout of connection and of every read from PSPDFKit API in seconds
+PDF_API_TIMEOUT = 10
+
+PDF_API_INSTRUCTIONS = json.dumps({
+    'parts': [
+        {
+            'file': 'document',
+        },
+    ],
+})
+
 
 class UnsupportedFileFormat(Exception):
     """Raised when the file format is unsupported."""
@@ -43,46 +56,123 @@ class UnsupportedFileFormat(Exception):
     pass
 
 
-def convert_to_pdf(file_data: bytes) -> Iterator[bytes]:
-    """Convert docx file to PDF.
+class PdfConverter(ABC):
+    """Converter of docx files to PDF.
+
+    Converter is started with application and closed on its shutdown.
+    See `app.lifespan.create_pdf_converter` for available backends.
+    """
 
-    This function actually saves the file to /temp folder
-    and then converts it to PDF s:
-        file_data (bytes): File data
+    @abstractmethod
+    async def start(self) -> None:
+        """Prepare converter resources."""
 
-    Raises:
-        FailConvertToPDF: Raised when the file conversion failed
+    @abstractmethod
+    async def convert(
+        self,
+        document: AsyncIterator[bytes],
+        pdf_file: BinaryIO,
+    ) -> None:
+        """Convert docx file to PDF.
 
-    Returns:
-        Iterator[bytes]: Converted file data
+        Args:
+            document (AsyncIterator[bytes]): Docx file data chunks
+            pdf_file (BinaryIO): File to write PDF data to
+
+        Raises:
+            FailConvertToPDF: Raised when the file conversion failed
+        """
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Release converter resources."""
+
+
+class PSPDFKitConverter(PdfConverter):
+    """Converter using remote PSPDFKit API.
+
+    Requests are sent by single session, so its pool of keep-alive
+    connections is reused by all conversions. Document is uploaded
+    and PDF is downloaded by chunks, without buffering of whole files.
     """
-    url = '{url_base}/build'.format(url_base=PDF_API_URL_BASE)
-    instructions = {
-        'parts': [
-            {
-                'file': 'document',
-            },
-        ],
-    }
-
-    response = requests.post(
-        url,
-        files={
-            'document': file_data,
-        },
-        headers={
-            'Authorization': 'Bearer {api_key}'.format(api_key=PDF_API_KEY),
-        },
-        data={
-            'instructions': json.dumps(instructions),
-        },
-        stream=True,
-        timeout=10,
-    )
-    if not response.ok:
-        raise FailConvertToPDF(response.text)
 
-    return response.iter_content(chunk_size=1024)
+    def __init__(self, api_key: str, connections: int) -> None:
+        """Initialize converter.
+
+        Args:
+            api_key (str): PSPDFKit API key
+            connections (int): Max number of concurrent connections to API
+        """
+        self.api_key = api_key
+        self.connections = connections
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self) -> None:
+        """Do nothing, since session is created on first conversion."""
+
+    async def convert(
+        self,
+        document: AsyncIterator[bytes],
+        pdf_file: BinaryIO,
+    ) -> None:
+        """Convert docx file to PDF.
+
+        Args:
+            document (AsyncIterator[bytes]): Docx file data chunks
+            pdf_file (BinaryIO): File to write PDF data to
+
+        Raises:
+            FailConvertToPDF: Raised when the file conversion failed
+        """
+        form = aiohttp.FormData()
+        form.add_field('instructions', PDF_API_INSTRUCTIONS)
+        form.add_field(
+            'document',
+            document,
+            filename='document.docx',
+            content_type=get_media_type(DocFormat.docx),
+        )
+        try:
+            async with self._get_session().post('/build', data=form) as resp:
+                if not resp.ok:
+                    raise FailConvertToPDF(await resp.text())
+
+                async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                    pdf_file.write(chunk)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            raise FailConvertToPDF(repr(exc))
+
+    async def close(self) -> None:
+        """Close session with its connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get API session, creating it on first use.
+
+        Session is bound to event loop, so it is created
+        inside running loop.
+
+        Returns:
+            aiohttp.ClientSession: API session.
+        """
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                PDF_API_URL_BASE,
+                connector=aiohttp.TCPConnector(limit=self.connections),
+                headers={
+                    'Authorization': 'Bearer {api_key}'.format(
+                        api_key=self.api_key,
+                    ),
+                },
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=PDF_API_TIMEOUT,
+                    sock_read=PDF_API_TIMEOUT,
+                ),
+            )
+
+        return self._session
 
 
 def get_media_type(file_format: DocFormat) -> str:
@@ -0,0 +1,174 @@
+"""Conditional and partial downloads of stored files.
+
+Files are identified by SHA-256 of docx file data, which is stored
+with file record, so unchanged file is revalidated by ETag without
+reading it from Drive. Sizes are stored at write time too, so file
+is sent with Content-Length and single byte range can be requested.
+See RFC 9110, sections 13 and 14.
+"""
+
+import re
+from typing import Iterator, NamedTuple, Optional
+from urllib.parse import quote
+
+from app.core.docx import DocFormat
+from app.core.streams import ChunkedReader
+
+RANGE_PATTERN = re.compile(r'bytes=(\d*)-(\d*)')
+
+# Characters, which are replaced in ASCII fallback of file name
+UNSAFE_FILE_NAME_PATTERN = re.compile(r'[^\x20-\x7e]|["\\/]')
+
+
+class StoredFile(NamedTuple):
+    """Stored file data with its size."""
+
+    # File data
+    reader: ChunkedReader
+
+    # File size in bytes. None for files stored before sizes were stored.
+    size: Optional[int]
+
+
+class RangeNotSatisfiableError(Exception):
+    """Requested range is outside of file."""
+
+
+def format_etag(
+    file_hash: Optional[str],
+    file_format: DocFormat,
+) -> Optional[str]:
+    """Get entity tag of file.
+
+    PDF is converted from docx file, so its tag is derived from docx hash.
+    Repeated conversion may produce different bytes, so the tag is weak.
+
+    Args:
+        file_hash (Optional[str]): SHA-256 of docx file data.
+        file_format (DocFormat): Format of downloaded file.
+
+    Returns:
+        Optional[str]: Entity tag or None if file hash is unknown.
+    """
+    if file_hash is None:
+        return None
+
+    if file_format == DocFormat.pdf:
+        return 'W/"{file_hash}-pdf"'.format(file_hash=file_hash)
+
+    return '"{file_hash}"'.format(file_hash=file_hash)
+
+
+def match_etag(if_none_match: str, etag: str) -> bool:
+    """Check If-None-Match header against entity tag.
+
+    Tags are compared weakly, as required for If-None-Match.
+
+    Args:
+        if_none_match (str): If-None-Match header value.
+        etag (str): Entity tag of file.
+
+    Returns:
+        bool: True if client has file with the tag.
+    """
+    if if_none_match.strip() == '*':
+        return True
+
+    opaque_tag = etag.removeprefix('W/')
+    return any(
+        tag.strip().removeprefix('W/') == opaque_tag
+        for tag in if_none_match.split(',')
+    )
+
+
+def parse_range(range_header: str, size: int) -> Optional[tuple[int, int]]:
+    """Parse single byte range of Range header.
+
+    Malformed and multiple ranges are ignored, so full file is sent.
+
+    Args:
+        range_header (str): Range header value.
+        size (int): File size in bytes.
+
+    Raises:
+        RangeNotSatisfiableError: If range starts after end of file.
+
+    Returns:
+        Optional[tuple[int, int]]: First and last byte positions \
+            or None if range is ignored.
+    """
+    match = RANGE_PATTERN.fullmatch(range_header.strip())
+    if match is None:
+        return None
+
+    first, last = (
+        int(position) if position else None
+        for position in match.groups()
+    )
+    if first is None:
+        if last is None:
+            return None
+
+        # Suffix range of last bytes
+        first = max(size - last, 0)
+        last = None
+
+    if first >= size:
+        raise RangeNotSatisfiableError()
+
+    last_position = size - 1
+    if last is not None:
+        last_position = min(last, last_position)
+
+    if last_position < first:
+        return None
+
+    return first, last_position
+
+
+def iterate_range(
+    chunks: Iterator[bytes],
+    first: int,
+    last: int,
+) -> Iterator[bytes]:
+    """Cut byte range from file data chunks.
+
+    Chunks before range are skipped, chunks after range are not read.
+
+    Args:
+        chunks (Iterator[bytes]): File data chunks.
+        first (int): First byte position.
+        last (int): Last byte position.
+
+    Yields:
+        bytes: Range data chunk.
+    """
+    position = 0
+    for chunk in chunks:
+        chunk_end = position + len(chunk)
+        if chunk_end > first:
+            range_start = max(first - position, 0)
+            yield chunk[range_start:last + 1 - position]
+
+        position = chunk_end
+        if position > last:
+            return
+
+
+def format_content_disposition(file_name: str) -> str:
+    """Get Content-Disposition header of attachment.
+
+    Names are not ASCII usually, so UTF-8 name is sent in `filename*`
+    and ASCII fallback in `filename` for older clients. See RFC 6266.
+
+    Args:
+        file_name (str): File name.
+
+    Returns:
+        str: Content-Disposition header value.
+    """
+    header = "attachment; filename=\"{fallback}\"; filename*=UTF-8''{name}"
+    return header.format(
+        fallback=UNSAFE_FILE_NAME_PATTERN.sub('_', file_name),
+        name=quote(file_name, safe=''),
+    )
@@ -0,0 +1,291 @@
+"""Local docx to PDF converter based on LibreOffice.
+
+Conversion is done by headless LibreOffice (soffice) on the same host.
+Each worker has own LibreOffice user profile, because instances sharing
+profile can not run concurrently. Profiles are initialized on startup,
+so conversions do not pay for first start of LibreOffice, and recreated
+after configured number of conversions or after failure.
+Files are written and read in threads, so event loop is not blocked
+by disk I/O.
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import signal
+from contextlib import asynccontextmanager
+from pathlib import Path
+from subprocess import DEVNULL, PIPE  # noqa: S404
+from tempfile import TemporaryDirectory, mkdtemp
+from typing import AsyncIterator, BinaryIO, Optional
+
+from app.api.exceptions.docx import FailConvertToPDF
+from app.core.docx import PdfConverter
+from app.core.streams import CHUNK_SIZE
+
+SOFFICE_OPTIONS = (
+    '--headless',
+    '--invisible',
+    '--nologo',
+    '--nodefault',
+    '--nolockcheck',
+    '--norestore',
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def save_document(
+    document: AsyncIterator[bytes],
+    docx_path: Path,
+) -> None:
+    """Write docx file chunks to disk.
+
+    Args:
+        document (AsyncIterator[bytes]): Docx file data chunks.
+        docx_path (Path): Path of docx file.
+    """
+    with docx_path.open('wb') as docx_file:
+        async for chunk in document:
+            await asyncio.to_thread(docx_file.write, chunk)
+
+
+class LibreOfficeWorker(object):
+    """LibreOffice instance with own user profile."""
+
+    def __init__(self, soffice_path: str, work_dir: Path) -> None:
+        """Initialize worker. Profile is not created until `warm_up` call.
+
+        Args:
+            soffice_path (str): Path to soffice executable.
+            work_dir (Path): Worker directory.
+        """
+        self.soffice_path = soffice_path
+        self.work_dir = work_dir
+        self.profile_dir = work_dir / 'profile'
+        self.jobs = 0
+        self.broken = False
+
+    async def warm_up(self, timeout: float) -> None:
+        """Recreate user profile and start LibreOffice once to fill it.
+
+        Args:
+            timeout (float): Start timeout in seconds.
+        """
+        await asyncio.to_thread(
+            shutil.rmtree,
+            self.profile_dir,
+            ignore_errors=True,
+        )
+        self.jobs = 0
+        self.broken = False
+        await self._run_soffice('--terminate_after_init', timeout=timeout)
+
+    async def convert(
+        self,
+        document: AsyncIterator[bytes],
+        pdf_file: BinaryIO,
+        timeout: float,
+    ) -> None:
+        """Convert docx file to PDF.
+
+        Args:
+            document (AsyncIterator[bytes]): Docx file data chunks.
+            pdf_file (BinaryIO): File to write PDF data to.
+            timeout (float): Conversion timeout in seconds.
+
+        Raises:
+            FailConvertToPDF: If conversion failed.
+        """
+        self.jobs += 1
+        with TemporaryDirectory(dir=self.work_dir) as job_dir:
+            docx_path = Path(job_dir) / 'document.docx'
+            await save_document(document, docx_path)
+            await self._run_soffice(
+                '--convert-to',
+                'pdf',
+                '--outdir',
+                job_dir,
+                str(docx_path),
+                timeout=timeout,
+            )
+
+            pdf_path = docx_path.with_suffix('.pdf')
+            if not pdf_path.exists():
+                raise FailConvertToPDF('LibreOffice produced no file')
+
+            with pdf_path.open('rb') as converted_file:
+                await asyncio.to_thread(
+                    shutil.copyfileobj,
+                    converted_file,
+                    pdf_file,
+                    CHUNK_SIZE,
+                )
+
+    async def _run_soffice(
+        self,
+        *args: str,
+        timeout: float,
+    ) -> None:
+        """Run soffice with worker profile.
+
+        Process is run in own session, so it is killed with all its
+        children on timeout.
+
+        Args:
+            args (str): soffice arguments.
+            timeout (float): Timeout in seconds.
+
+        Raises:
+            FailConvertToPDF: If soffice failed or timed out.
+            asyncio.CancelledError: If job is cancelled. Process is killed.
+        """
+        process = await asyncio.create_subprocess_exec(
+            self.soffice_path,
+            *SOFFICE_OPTIONS,
+            '-env:UserInstallation={uri}'.format(
+                uri=self.profile_dir.as_uri(),
+            ),
+            *args,
+            stdin=DEVNULL,
+            stdout=DEVNULL,
+            stderr=PIPE,
+            start_new_session=True,
+        )
+        try:
+            _, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            await self._kill(process)
+            raise FailConvertToPDF('LibreOffice timed out')
+        except asyncio.CancelledError:
+            # Process must not outlive job, because it uses worker profile
+            await self._kill(process)
+            raise
+
+        if process.returncode:
+            raise FailConvertToPDF(stderr.decode(errors='replace'))
+
+    async def _kill(self, process: asyncio.subprocess.Process) -> None:
+        """Kill soffice process with all its children.
+
+        Args:
+            process (asyncio.subprocess.Process): soffice process.
+        """
+        os.killpg(process.pid, signal.SIGKILL)
+        await process.wait()
+
+
+class LibreOfficeConverter(PdfConverter):
+    """Pool of LibreOffice workers.
+
+    Number of workers limits concurrent conversions,
+    other jobs wait for free worker.
+    """
+
+    def __init__(
+        self,
+        soffice_path: str,
+        workers: int,
+        timeout: float,
+        max_jobs: int,
+    ) -> None:
+        """Initialize converter. Workers are not started until `start` call.
+
+        Args:
+            soffice_path (str): Path to soffice executable.
+            workers (int): Number of workers.
+            timeout (float): Conversion timeout in seconds.
+            max_jobs (int): Number of conversions after which \
+                worker profile is recreated.
+        """
+        self.soffice_path = soffice_path
+        self.workers = workers
+        self.timeout = timeout
+        self.max_jobs = max_jobs
+        self._work_dir: Optional[Path] = None
+        self._idle_workers: asyncio.Queue[LibreOfficeWorker] = asyncio.Queue()
+        self._recycling: set[asyncio.Task[None]] = set()
+
+    async def start(self) -> None:
+        """Create workers and initialize their profiles."""
+        self._work_dir = Path(mkdtemp(prefix='offers-soffice-'))
+        workers = []
+        for index in range(self.workers):
+            worker_dir = self._work_dir / str(index)
+            worker_dir.mkdir()
+            workers.append(LibreOfficeWorker(self.soffice_path, worker_dir))
+
+        await asyncio.gather(
+            *(worker.warm_up(self.timeout) for worker in workers),
+        )
+        for worker in workers:
+            self._idle_workers.put_nowait(worker)
+
+    async def convert(
+        self,
+        document: AsyncIterator[bytes],
+        pdf_file: BinaryIO,
+    ) -> None:
+        """Convert docx file to PDF in free worker.
+
+        Args:
+            document (AsyncIterator[bytes]): Docx file data chunks.
+            pdf_file (BinaryIO): File to write PDF data to.
+        """
+        async with self._acquire_worker() as worker:
+            await worker.convert(document, pdf_file, self.timeout)
+
+    async def close(self) -> None:
+        """Wait for workers recycling and remove their profiles."""
+        await asyncio.gather(*self._recycling, return_exceptions=True)
+        if self._work_dir is not None:
+            shutil.rmtree(self._work_dir, ignore_errors=True)
+            self._work_dir = None
+
+    @asynccontextmanager
+    async def _acquire_worker(self) -> AsyncIterator[LibreOfficeWorker]:
+        """Take free worker and return it back after conversion.
+
+        Worker is recycled before return if it is worn out or failed.
+
+        Raises:
+            Exception: Conversion error. Worker is recycled.
+            asyncio.CancelledError: If job is cancelled. Worker is recycled.
+
+        Yields:
+            LibreOfficeWorker: Free worker.
+        """
+        worker = await self._idle_workers.get()
+        try:
+            yield worker
+        except (Exception, asyncio.CancelledError):
+            # Profile can be left in inconsistent state
+            worker.broken = True
+            raise
+        finally:
+            if worker.broken or worker.jobs >= self.max_jobs:
+                recycling = asyncio.create_task(self._recycle(worker))
+                self._recycling.add(recycling)
+                recycling.add_done_callback(self._recycling.discard)
+            else:
+                self._idle_workers.put_nowait(worker)
+
+    async def _recycle(self, worker: LibreOfficeWorker) -> None:
+        """Recreate worker profile and return worker to pool.
+
+        Worker is returned to pool even if recycling failed,
+        otherwise pool could be left without workers.
+
+        Args:
+            worker (LibreOfficeWorker): Worn out or failed worker.
+        """
+        try:
+            await worker.warm_up(self.timeout)
+        except FailConvertToPDF:
+            # Profile will be created by next conversion
+            worker.broken = False
+        except Exception:
+            logger.exception('LibreOffice worker recycling failed')
+        finally:
+            self._idle_workers.put_nowait(worker)
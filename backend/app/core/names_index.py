@@ -0,0 +1,409 @@
+"""In-memory index of entity names.
+
+Deta Base evaluates `contains` queries by scan of whole Base, so search
+of entities by name substring and typeahead suggestions are served
+by in-process index.
+
+Every trigram of normalized name has posting list of entity ids.
+Substring of at least three characters can only be contained in names,
+which have all its trigrams, so candidates are found by intersection
+of posting lists. Words of names are kept in sorted array, so shorter
+queries are completed as word prefixes by binary search.
+
+Misspelled queries are matched by similarity. Words are stemmed, so
+inflected forms match, and stems are split to trigrams with word
+boundaries. Names are scored by number of shared trigrams, counted
+over posting lists of query trigrams only.
+
+Whole index is built from all names by `build_names_index`, which yields
+to event loop between batches of names, so requests are served meanwhile.
+"""
+
+import asyncio
+import heapq
+import math
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Iterator, Optional
+
+from app.core.cache import TTLCache
+
+TRIGRAM_SIZE = 3
+
+# Sorts after any character of names and codes, so it bounds range of prefix
+MAX_CHAR = '\U0010ffff'
+
+# Ranks of query match in name. Names with lower rank are suggested first.
+EXACT_MATCH = 0
+PREFIX_MATCH = 1
+WORD_PREFIX_MATCH = 2
+SUBSTRING_MATCH = 3
+
+# Min share of query trigrams, which similar name must have
+SIMILARITY_THRESHOLD = 0.4
+
+# Min length of word stem
+MIN_STEM_LENGTH = 3
+
+# Russian inflectional endings
+ENDINGS = frozenset((
+    *'иями ями ами ого его ому ему ыми ими'.split(),
+    *'ых их ой ей ий ый ая яя ое ее ые ие ов ев ам ям'.split(),
+    *'ах ях ом ем ую юю ия ья ье'.split(),
+    *'а я о е ы и у ю ь й'.split(),
+))
+
+MAX_ENDING_LENGTH = max(map(len, ENDINGS))
+
+# Number of names inserted by index build between yields to event loop
+BUILD_BATCH_SIZE = 100
+
+
+def get_trigrams(text: str) -> set[str]:
+    """Get all substrings of text with length of trigram.
+
+    Args:
+        text (str): Normalized text.
+
+    Returns:
+        set[str]: Trigrams. Empty if text is shorter than trigram.
+    """
+    return {
+        text[position:position + TRIGRAM_SIZE]
+        for position in range(len(text) - TRIGRAM_SIZE + 1)
+    }
+
+
+def get_stem(word: str) -> str:
+    """Strip inflectional ending of word.
+
+    Longest ending is stripped, if stem keeps min length.
+
+    Args:
+        word (str): Normalized word.
+
+    Returns:
+        str: Word stem. Word itself if it has no ending.
+    """
+    max_length = min(MAX_ENDING_LENGTH, len(word) - MIN_STEM_LENGTH)
+    for length in range(max_length, 0, -1):
+        if word[-length:] in ENDINGS:
+            return word[:-length]
+
+    return word
+
+
+def get_stem_trigrams(text: str) -> set[str]:
+    """Get trigrams of word stems of text for similarity search.
+
+    Stems are padded with spaces, so trigrams at word boundaries
+    are distinct from inner ones.
+
+    Args:
+        text (str): Normalized text.
+
+    Returns:
+        set[str]: Trigrams of all stems.
+    """
+    trigrams: set[str] = set()
+    for word in text.split():
+        trigrams.update(get_trigrams(' {stem} '.format(stem=get_stem(word))))
+
+    return trigrams
+
+
+def discard_posting(
+    postings: defaultdict[str, set[str]],
+    terms: set[str],
+    entity_id: str,
+) -> None:
+    """Remove entity from posting lists of terms.
+
+    Emptied posting lists are removed.
+
+    Args:
+        postings (defaultdict[str, set[str]]): Posting lists by terms.
+        terms (set[str]): Trigrams or words of entity name.
+        entity_id (str): Entity id.
+    """
+    for term in terms:
+        posting = postings[term]
+        posting.discard(entity_id)
+        if not posting:
+            postings.pop(term)
+
+
+def get_match_rank(name: str, query: str) -> Optional[int]:
+    """Get rank of query match in name.
+
+    Args:
+        name (str): Normalized name.
+        query (str): Normalized query.
+
+    Returns:
+        Optional[int]: Match rank. None if name does not contain query.
+    """
+    if name == query:
+        return EXACT_MATCH
+
+    if name.startswith(query):
+        return PREFIX_MATCH
+
+    if ' {query}'.format(query=query) in name:
+        return WORD_PREFIX_MATCH
+
+    return SUBSTRING_MATCH if query in name else None
+
+
+class NamesIndex(object):
+    """Trigram posting lists and sorted words of normalized names."""
+
+    def __init__(self, suggestions_cache_size: int = 0) -> None:
+        """Initialize empty index.
+
+        Args:
+            suggestions_cache_size (int): Max number of cached suggestions \
+                of recent queries. Cache is disabled if zero.
+        """
+        self._names: dict[str, str] = {}
+        self._postings: defaultdict[str, set[str]] = defaultdict(set)
+        self._stem_postings: defaultdict[str, set[str]] = defaultdict(set)
+        self._word_postings: defaultdict[str, set[str]] = defaultdict(set)
+        # Distinct words of names. New words are appended, and whole list
+        # is sorted once on next prefix search, so bulk insert is linear.
+        self._words: list[str] = []
+        self._words_sorted = True
+        # Suggested entities ids by query. Cleared on any change of index.
+        self._suggestions: TTLCache[list[str]] = TTLCache(
+            max_size=suggestions_cache_size,
+            ttl=math.inf,
+            negative_ttl=math.inf,
+        )
+
+    def insert(self, entity_id: str, name: str) -> None:
+        """Insert name of entity.
+
+        Args:
+            entity_id (str): Entity id.
+            name (str): Normalized name.
+        """
+        self._names[entity_id] = name
+        for trigram in get_trigrams(name):
+            self._postings[trigram].add(entity_id)
+
+        for stem_trigram in get_stem_trigrams(name):
+            self._stem_postings[stem_trigram].add(entity_id)
+
+        for word in set(name.split()):
+            if word not in self._word_postings:
+                self._words.append(word)
+                self._words_sorted = False
+
+            self._word_postings[word].add(entity_id)
+
+        self._suggestions.clear()
+
+    def discard(self, entity_id: str) -> None:
+        """Remove name of entity if it is in index.
+
+        Args:
+            entity_id (str): Entity id.
+        """
+        name = self._names.pop(entity_id, None)
+        if name is None:
+            return
+
+        discard_posting(self._postings, get_trigrams(name), entity_id)
+        discard_posting(
+            self._stem_postings,
+            get_stem_trigrams(name),
+            entity_id,
+        )
+
+        words = set(name.split())
+        discard_posting(self._word_postings, words, entity_id)
+        for word in words:
+            if word not in self._word_postings:
+                self._words.remove(word)
+
+        self._suggestions.clear()
+
+    def find(self, substring: str) -> Optional[set[str]]:
+        """Find entities, which names can contain substring.
+
+        Args:
+            substring (str): Normalized substring of name.
+
+        Returns:
+            Optional[set[str]]: Ids of candidates, which names have all \
+                trigrams of substring. None if substring is shorter \
+                than trigram, so any name can contain it.
+        """
+        trigrams = get_trigrams(substring)
+        if not trigrams:
+            return None
+
+        postings = sorted(
+            (self._postings.get(trigram, set()) for trigram in trigrams),
+            key=len,
+        )
+        return set.intersection(*postings)
+
+    def find_similar(self, query: str) -> list[str]:
+        """Find entities, which names are similar to query.
+
+        Name is similar if it has enough trigrams of query stems.
+        Tolerates typos and other word forms.
+
+        Args:
+            query (str): Normalized query.
+
+        Returns:
+            list[str]: Ids of similar entities, most similar first.
+        """
+        trigrams = get_stem_trigrams(query)
+        min_shared = len(trigrams) * SIMILARITY_THRESHOLD
+        similar = sorted(
+            (-shared, len(self._names[entity_id]), entity_id)
+            for entity_id, shared in self._count_shared(trigrams).items()
+            if shared >= min_shared
+        )
+        return [similar_entity[-1] for similar_entity in similar]
+
+    def suggest(self, query: str, limit: int) -> list[str]:
+        """Get entities, which names match query best.
+
+        Exact matches go first, then names starting with query, names
+        with word starting with query and names containing query.
+        Shorter names go first within rank. Only best matches are kept
+        in heap, so all candidates are not sorted. Rest of suggestions
+        is filled with similar names, so misspelled query still gets
+        suggestions. Results of recent queries are cached.
+
+        Args:
+            query (str): Normalized query. Query shorter than trigram \
+                is matched as word prefix only.
+            limit (int): Max number of suggestions.
+
+        Returns:
+            list[str]: Ids of suggested entities, best first.
+        """
+        cache_key = '{limit} {query}'.format(limit=limit, query=query)
+        found, entity_ids = self._suggestions.get(cache_key)
+        if found and entity_ids is not None:
+            return entity_ids
+
+        best_matches = heapq.nsmallest(limit, self._rank_candidates(query))
+        entity_ids = [best_match[-1] for best_match in best_matches]
+        if len(entity_ids) < limit and len(query) >= TRIGRAM_SIZE:
+            self._add_similar(query, entity_ids, limit)
+
+        self._suggestions.set(cache_key, entity_ids)
+        return entity_ids
+
+    def _find_candidates(self, query: str) -> set[str]:
+        """Find entities, which names can match query.
+
+        Args:
+            query (str): Normalized query.
+
+        Returns:
+            set[str]: Ids of candidates.
+        """
+        candidates = self.find(query)
+        if candidates is not None:
+            return candidates
+
+        if not self._words_sorted:
+            # Words sorted before are single run, so few appended words
+            # are merged into it in about linear time
+            self._words.sort()
+            self._words_sorted = True
+
+        first = bisect_left(self._words, query)
+        end = bisect_left(self._words, query + MAX_CHAR)
+        word_candidates: set[str] = set()
+        return word_candidates.union(*(
+            self._word_postings[word] for word in self._words[first:end]
+        ))
+
+    def _rank_candidates(
+        self,
+        query: str,
+    ) -> Iterator[tuple[int, int, str, str]]:
+        """Rank names of candidates, which match query.
+
+        Args:
+            query (str): Normalized query.
+
+        Yields:
+            tuple[int, int, str, str]: Match rank, name length, name \
+                and entity id. Tuples are ordered from best match.
+        """
+        for entity_id in self._find_candidates(query):
+            name = self._names[entity_id]
+            rank = get_match_rank(name, query)
+            if rank is not None:
+                yield rank, len(name), name, entity_id
+
+    def _add_similar(
+        self,
+        query: str,
+        entity_ids: list[str],
+        limit: int,
+    ) -> None:
+        """Fill suggestions with similar names up to limit.
+
+        Args:
+            query (str): Normalized query.
+            entity_ids (list[str]): Ids of suggested entities. \
+                Similar entities are appended in place.
+            limit (int): Max number of suggestions.
+        """
+        for entity_id in self.find_similar(query):
+            if len(entity_ids) >= limit:
+                return
+
+            if entity_id not in entity_ids:
+                entity_ids.append(entity_id)
+
+    def _count_shared(self, trigrams: set[str]) -> Counter[str]:
+        """Count shared stem trigrams of names with query.
+
+        Only posting lists of query trigrams are visited, so names
+        without common trigrams cost nothing.
+
+        Args:
+            trigrams (set[str]): Stem trigrams of query.
+
+        Returns:
+            Counter[str]: Number of shared trigrams by entity ids.
+        """
+        shared: Counter[str] = Counter()
+        for trigram in trigrams:
+            shared.update(self._stem_postings.get(trigram, ()))
+
+        return shared
+
+
+async def build_names_index(
+    names: dict[str, str],
+    suggestions_cache_size: int = 0,
+) -> NamesIndex:
+    """Build index of names without blocking event loop for long.
+
+    Args:
+        names (dict[str, str]): Normalized names by entity ids.
+        suggestions_cache_size (int): Max number of cached suggestions \
+            of recent queries. Cache is disabled if zero.
+
+    Returns:
+        NamesIndex: Index of all names.
+    """
+    names_index = NamesIndex(suggestions_cache_size)
+    for inserted, (entity_id, name) in enumerate(names.items(), start=1):
+        names_index.insert(entity_id, name)
+        if inserted % BUILD_BATCH_SIZE == 0:
+            await asyncio.sleep(0)
+
+    return names_index
@@ -0,0 +1,41 @@
+"""Normalization of names and FKKO codes for search.
+
+Stored entities keep normalized copies of searchable fields, and queries
+are normalized the same way, so search compares normalized forms.
+"""
+
+import re
+
+# Punctuation and symbols, including non-ASCII ones like guillemets
+# and dashes. Combining diacritical marks are kept as part of words.
+SEPARATOR_PATTERN = re.compile(r'[^\w\s\u0300-\u036f]|_')
+
+
+def normalize_name(name: str) -> str:
+    """Get name normalized for search.
+
+    Convert to lowercase, fold ё to е, replace punctuation with spaces
+    and collapse whitespace.
+
+    Args:
+        name (str): Name.
+
+    Returns:
+        str: Normalized name.
+    """
+    name = SEPARATOR_PATTERN.sub(' ', name.lower().replace('ё', 'е'))
+    return ' '.join(name.split())
+
+
+def normalize_fkko_code(fkko_code: str) -> str:
+    """Get FKKO code normalized for search.
+
+    Remove whitespace.
+
+    Args:
+        fkko_code (str): FKKO code.
+
+    Returns:
+        str: Normalized FKKO code.
+    """
+    return ''.join(fkko_code.split())
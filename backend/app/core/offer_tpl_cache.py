@@ -0,0 +1,399 @@
+"""Cache of compiled offer templates.
+
+Building an offer requires parsing of the docx template, patching of its XML
+and compiling of Jinja templates for the document body, headers and footers.
+The result of these steps depends only on the template file content,
+so compiled templates are kept in process memory and reused between builds.
+
+Compiled Jinja code is never stored outside of process, so templates are
+compiled from docx files by each process, which renders them.
+"""
+
+import re
+from collections import OrderedDict
+from functools import partial
+from hashlib import sha256
+from io import BytesIO
+from threading import Lock
+from typing import IO, Any, Callable, Iterator, NamedTuple, Optional
+
+from docxtpl import DocxTemplate
+from jinja2 import Environment, Template, meta, nodes
+
+from app.core.config import OFFER_TPL_CACHE_SIZE
+from app.core.streams import CHUNK_SIZE
+
+PARAGRAPH_START_PATTERN = re.compile('<w:p([ >])')
+
+RENDERED_PARAGRAPH_START_PATTERN = re.compile('\n<w:p([ >])')
+
+# Escaped Jinja tags are restored after render. See `docxtpl` for details.
+ESCAPED_JINJA_TAGS = (
+    ('{_{', '{{'),
+    ('}_}', '}}'),
+    ('{_%', '{%'),
+    ('%_}', '%}'),
+)
+
+BODY_PART_KEY = 'body'
+
+# Tests and filters, which make template handle missing variable
+OPTIONAL_VARIABLE_GUARDS = frozenset(('defined', 'undefined', 'default', 'd'))
+
+
+class CompiledPart(NamedTuple):
+    """Compiled XML part of docx template."""
+
+    # Jinja template of patched part XML
+    template: Template
+
+    # Part XML encoding
+    encoding: str
+
+    # Size of template source. Used to estimate cache memory usage.
+    source_size: int
+
+    # Context variables required by template
+    variables: frozenset[str]
+
+
+class PrecompiledDocxTemplate(DocxTemplate):  # type: ignore[misc]
+    """Docx template, that reuses compiled XML parts.
+
+    Document itself is still loaded for every render, because rendering
+    modifies it in place. XML patching and Jinja compilation are done only
+    once per part and shared between renders.
+    """
+
+    def __init__(
+        self,
+        template_file: BytesIO,
+        compiled_parts: dict[str, CompiledPart],
+    ) -> None:
+        """Initialize template.
+
+        Args:
+            template_file (BytesIO): Template file stream.
+            compiled_parts (dict[str, CompiledPart]): Shared compiled parts.
+        """
+        super().__init__(template_file)
+        self._compiled_parts = compiled_parts
+        # docxtpl renders XML without autoescape too
+        self._jinja_env = Environment()  # noqa: S701
+
+    def compile_parts(self) -> None:
+        """Compile body, headers and footers of template."""
+        self.init_docx(reload=False)
+        self._get_compiled_part(BODY_PART_KEY, self.get_xml)
+        for uri in (self.HEADER_URI, self.FOOTER_URI):
+            for rel_key, part in self.get_headers_footers(uri):
+                self._get_compiled_part(
+                    rel_key,
+                    partial(self.get_part_xml, part),
+                )
+
+    def build_xml(
+        self,
+        context: dict[str, Any],
+        jinja_env: Optional[Environment] = None,
+    ) -> str:
+        """Render document body XML.
+
+        Args:
+            context (dict[str, Any]): Template context.
+            jinja_env (Optional[Environment]): Unused, kept for compatibility.
+
+        Returns:
+            str: Rendered body XML.
+        """
+        compiled_part = self._get_compiled_part(BODY_PART_KEY, self.get_xml)
+        body_part = self.docx._part  # noqa: WPS437
+        return self._render_part(compiled_part, body_part, context)
+
+    def build_headers_footers_xml(
+        self,
+        context: dict[str, Any],
+        uri: str,
+        jinja_env: Optional[Environment] = None,
+    ) -> Iterator[tuple[str, bytes]]:
+        """Render headers or footers XML.
+
+        Args:
+            context (dict[str, Any]): Template context.
+            uri (str): Relationship type of headers or footers.
+            jinja_env (Optional[Environment]): Unused, kept for compatibility.
+
+        Yields:
+            tuple[str, bytes]: Relationship key and rendered XML.
+        """
+        for rel_key, part in self.get_headers_footers(uri):
+            compiled_part = self._get_compiled_part(
+                rel_key,
+                partial(self.get_part_xml, part),
+            )
+            xml = self._render_part(compiled_part, part, context)
+            yield rel_key, xml.encode(compiled_part.encoding)
+
+    def _get_compiled_part(
+        self,
+        part_key: str,
+        get_src_xml: Callable[[], str],
+    ) -> CompiledPart:
+        """Get compiled part or compile it.
+
+        Part XML is serialized only if part is not compiled yet,
+        so renders of cached template skip it.
+
+        Args:
+            part_key (str): Part key.
+            get_src_xml (Callable[[], str]): Serializer of part XML.
+
+        Returns:
+            CompiledPart: Compiled part.
+        """
+        compiled_part = self._compiled_parts.get(part_key)
+        if compiled_part is not None:
+            return compiled_part
+
+        src_xml = get_src_xml()
+        encoding = self.get_headers_footers_encoding(src_xml)
+        src_xml = PARAGRAPH_START_PATTERN.sub(
+            r'\n<w:p\1',
+            self.patch_xml(src_xml),
+        )
+        parsed_template = self._jinja_env.parse(src_xml)
+        compiled_part = CompiledPart(
+            template=self._jinja_env.from_string(parsed_template),
+            encoding=encoding,
+            source_size=len(src_xml),
+            variables=find_required_variables(parsed_template),
+        )
+        self._compiled_parts[part_key] = compiled_part
+        return compiled_part
+
+    def _render_part(
+        self,
+        compiled_part: CompiledPart,
+        part: Any,
+        context: dict[str, Any],
+    ) -> str:
+        """Render compiled part.
+
+        Mirrors post-processing of `DocxTemplate.render_xml_part`.
+
+        Args:
+            compiled_part (CompiledPart): Compiled part.
+            part (Any): Docx part that is rendered.
+            context (dict[str, Any]): Template context.
+
+        Returns:
+            str: Rendered XML.
+        """
+        self.current_rendering_part = part
+        dst_xml = compiled_part.template.render(context)
+        dst_xml = RENDERED_PARAGRAPH_START_PATTERN.sub(r'<w:p\1', dst_xml)
+        for escaped_tag, jinja_tag in ESCAPED_JINJA_TAGS:
+            dst_xml = dst_xml.replace(escaped_tag, jinja_tag)
+
+        return str(self.resolve_listing(dst_xml))
+
+
+class CompiledOfferTemplate(object):
+    """Offer template compiled for rendering."""
+
+    def __init__(self, offer_tpl_file: bytes) -> None:
+        """Compile offer template.
+
+        Args:
+            offer_tpl_file (bytes): Offer template file data.
+        """
+        self.offer_tpl_file = offer_tpl_file
+        self._compiled_parts: dict[str, CompiledPart] = {}
+        docx = PrecompiledDocxTemplate(
+            BytesIO(offer_tpl_file),
+            self._compiled_parts,
+        )
+        docx.compile_parts()
+
+    @property
+    def size(self) -> int:
+        """Estimate memory used by compiled template.
+
+        Returns:
+            int: Size in bytes.
+        """
+        sources_size = sum(
+            compiled_part.source_size
+            for compiled_part in self._compiled_parts.values()
+        )
+        return len(self.offer_tpl_file) + sources_size
+
+    @property
+    def variables(self) -> list[str]:
+        """Get context variables required by template.
+
+        Returns:
+            list[str]: Sorted variable names.
+        """
+        return sorted(frozenset().union(*(
+            compiled_part.variables
+            for compiled_part in self._compiled_parts.values()
+        )))
+
+    def render(self, context: dict[str, Any]) -> bytes:
+        """Render offer template with context.
+
+        Args:
+            context (dict[str, Any]): Offer context data.
+
+        Returns:
+            bytes: Filled offer file data.
+        """
+        docx = PrecompiledDocxTemplate(
+            BytesIO(self.offer_tpl_file),
+            self._compiled_parts,
+        )
+        docx.render(context)
+
+        filled_offer_stream = BytesIO()
+        docx.save(filled_offer_stream)
+        return filled_offer_stream.getvalue()
+
+
+def find_required_variables(parsed_template: nodes.Template) -> frozenset[str]:
+    """Find context variables, which template can not be rendered without.
+
+    Variables tested by `is defined` or `is undefined` or passed
+    to `default` filter anywhere in template are handled by template
+    when missing, so they are optional.
+
+    Args:
+        parsed_template (nodes.Template): Parsed Jinja template.
+
+    Returns:
+        frozenset[str]: Names of required variables.
+    """
+    guarded_nodes = [
+        guard.node
+        for guard in parsed_template.find_all((nodes.Test, nodes.Filter))
+        if guard.name in OPTIONAL_VARIABLE_GUARDS
+    ]
+    optional_variables = {
+        guarded.name
+        for guarded in guarded_nodes
+        if isinstance(guarded, nodes.Name)
+    }
+    return frozenset(
+        meta.find_undeclared_variables(parsed_template) - optional_variables,
+    )
+
+
+def get_file_hash(file_data: bytes) -> str:
+    """Get SHA-256 hash of file data.
+
+    Args:
+        file_data (bytes): File data.
+
+    Returns:
+        str: Hex digest.
+    """
+    return sha256(file_data).hexdigest()
+
+
+def get_file_object_hash(file_object: IO[bytes]) -> str:
+    """Get SHA-256 hash of file read by chunks.
+
+    File is rewound to start position after hashing.
+
+    Args:
+        file_object (IO[bytes]): File at start position.
+
+    Returns:
+        str: Hex digest.
+    """
+    file_hash = sha256()
+    for chunk in iter(partial(file_object.read, CHUNK_SIZE), b''):
+        file_hash.update(chunk)
+
+    file_object.seek(0)
+    return file_hash.hexdigest()
+
+
+class OfferTemplatesCache(object):
+    """LRU cache of compiled offer templates with memory budget.
+
+    Entries are keyed by content hash, so a stale entry is never returned
+    for updated template file and cache needs no invalidation. Compiled
+    versions of updated and deleted templates are not used anymore,
+    so they are evicted as least recently used.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        """Initialize cache.
+
+        Args:
+            max_size (int): Memory budget in bytes.
+        """
+        self.max_size = max_size
+        self._entries: OrderedDict[str, CompiledOfferTemplate] = (
+            OrderedDict()
+        )
+        self._size = 0
+        self._lock = Lock()
+
+    def get(self, offer_tpl_file: bytes) -> CompiledOfferTemplate:
+        """Get compiled offer template, compiling it on cache miss.
+
+        Args:
+            offer_tpl_file (bytes): Offer template file data.
+
+        Returns:
+            CompiledOfferTemplate: Compiled offer template.
+        """
+        return self.get_by_hash(
+            get_file_hash(offer_tpl_file),
+            lambda: offer_tpl_file,
+        )
+
+    def get_by_hash(
+        self,
+        file_hash: str,
+        read_file: Callable[[], bytes],
+    ) -> CompiledOfferTemplate:
+        """Get compiled offer template by hash of its file.
+
+        File is read and compiled only on cache miss.
+
+        Args:
+            file_hash (str): SHA-256 of offer template file data.
+            read_file (Callable[[], bytes]): Reader of template file data.
+
+        Returns:
+            CompiledOfferTemplate: Compiled offer template.
+        """
+        with self._lock:
+            offer_tpl = self._entries.get(file_hash)
+            if offer_tpl is not None:
+                self._entries.move_to_end(file_hash)
+                return offer_tpl
+
+        # Reading and compilation are slow, so they are done without lock
+        offer_tpl = CompiledOfferTemplate(read_file())
+        with self._lock:
+            # Same file may be compiled by concurrent call meanwhile
+            fits = offer_tpl.size <= self.max_size
+            if fits and file_hash not in self._entries:
+                self._entries[file_hash] = offer_tpl
+                self._size += offer_tpl.size
+                self._evict()
+
+        return offer_tpl
+
+    def _evict(self) -> None:
+        """Evict least recently used entries. Lock must be acquired."""
+        while self._size > self.max_size and self._entries:
+            _, offer_tpl = self._entries.popitem(last=False)
+            self._size -= offer_tpl.size
+
+
+offer_tpls_cache = OfferTemplatesCache(OFFER_TPL_CACHE_SIZE)
@@ -0,0 +1,111 @@
+"""Offer templates validation.
+
+Uploaded template is validated once, in render worker process, before it
+is stored. Docx file is a zip archive, so its entries are checked by
+central directory without inflation to reject zip bombs. Then template is
+compiled, so broken Jinja syntax is reported on upload instead of build.
+Only context variables used by template are stored with it.
+"""
+
+from io import BytesIO
+from typing import NamedTuple, Optional
+from zipfile import BadZipFile, ZipFile, ZipInfo
+
+from app.core.offer_tpl_cache import offer_tpls_cache
+
+# Max number of entries in docx archive
+MAX_ARCHIVE_ENTRIES = 1000
+
+# Max total size of inflated docx archive entries in bytes
+MAX_ARCHIVE_SIZE = 104857600
+
+# Max compression ratio of docx archive entry
+MAX_COMPRESSION_RATIO = 100
+
+DOCUMENT_ENTRY = 'word/document.xml'
+
+
+class InvalidOfferTemplateError(Exception):
+    """Offer template file is not valid docx template."""
+
+
+class ValidatedOfferTemplate(NamedTuple):
+    """Result of offer template validation."""
+
+    # Context variables used by template
+    variables: list[str]
+
+
+def find_archive_problem(entries: list[ZipInfo]) -> Optional[str]:
+    """Check docx archive entries against limits.
+
+    Args:
+        entries (list[ZipInfo]): Archive entries.
+
+    Returns:
+        Optional[str]: Problem description or None if archive is fine.
+    """
+    if len(entries) > MAX_ARCHIVE_ENTRIES:
+        return 'Too many archive entries'
+
+    if sum(entry.file_size for entry in entries) > MAX_ARCHIVE_SIZE:
+        return 'Archive is too large'
+
+    overcompressed = [
+        entry.filename
+        for entry in entries
+        if entry.file_size / (entry.compress_size or 1) > MAX_COMPRESSION_RATIO
+    ]
+    if overcompressed:
+        return 'Entry {name} is compressed too much'.format(
+            name=overcompressed[0],
+        )
+
+    if DOCUMENT_ENTRY not in {entry.filename for entry in entries}:
+        return 'Document is missing'
+
+    return None
+
+
+def inspect_archive(offer_tpl_file: bytes) -> None:
+    """Check docx archive limits without inflating its entries.
+
+    Args:
+        offer_tpl_file (bytes): Offer template file data.
+
+    Raises:
+        InvalidOfferTemplateError: If file is not docx archive \
+            or exceeds limits.
+    """
+    try:
+        with ZipFile(BytesIO(offer_tpl_file)) as archive:
+            entries = archive.infolist()
+    except BadZipFile:
+        raise InvalidOfferTemplateError('File is not zip archive')
+
+    problem = find_archive_problem(entries)
+    if problem is not None:
+        raise InvalidOfferTemplateError(problem)
+
+
+def validate_offer_tpl(offer_tpl_file: bytes) -> ValidatedOfferTemplate:
+    """Validate and compile offer template in worker process.
+
+    Compiled template is kept in worker cache for following builds.
+
+    Args:
+        offer_tpl_file (bytes): Offer template file data
+
+    Raises:
+        InvalidOfferTemplateError: If template is not valid.
+
+    Returns:
+        ValidatedOfferTemplate: Template variables.
+    """
+    inspect_archive(offer_tpl_file)
+    try:
+        offer_tpl = offer_tpls_cache.get(offer_tpl_file)
+    except Exception as exc:
+        raise InvalidOfferTemplateError(str(exc))
+
+    return ValidatedOfferTemplate(variables=offer_tpl.variables)
@@ -1,19 +1,23 @@
 """Offer templates utilities."""
 
+import asyncio
 from io import BytesIO
-from typing import Optional
+from typing import Any, NamedTuple, Optional
 
-from deta import Base, Drive
-from docxtpl.template import DocxTemplate
-
-from app.core.deta import BytesIterator, serialize_model
-from app.core.docx import DocFormat, UnsupportedFileFormat, convert_to_pdf
+from app.core.config import MAX_OFFER_TPL_SIZE
+from app.core.deta import Storage, gather_writes, serialize_model
+from app.core.docx import DocFormat, UnsupportedFileFormat
+from app.core.downloads import StoredFile
 from app.core.models import generate_id
+from app.core.offer_tpl_validation import InvalidOfferTemplateError
 from app.core.pagination import (
     PaginationParams,
     PaginationResponse,
     default_pagination,
 )
+from app.core.pdf_cache import PdfCache
+from app.core.render import RenderEngine
+from app.core.streams import CHUNK_SIZE, ChunkedReader, FileData, HashingReader
 from app.models.offer_tpl import OfferTemplate
 
 
@@ -25,20 +29,81 @@ class BadOfferTemplateFileError(Exception):
     """Offer template file is bad."""
 
 
+class UploadedOfferTemplate(NamedTuple):
+    """Validated offer template file ready to be stored."""
+
+    # Offer template file data
+    file_data: bytes
+
+    # SHA-256 of offer template file data
+    file_hash: str
+
+    # Context variables required by template
+    variables: list[str]
+
+
 class IncorrectOfferTemplateContextError(Exception):
     """Incorrect offer template context."""
 
 
+def check_offer_context(
+    offer_tpl: OfferTemplate,
+    context: dict[str, Any],
+) -> None:
+    """Check that context has all variables required by offer template.
+
+    Variables are collected on template upload, so context is checked
+    without template file. Templates uploaded before variables collection
+    are not checked. Variables, which template checks by `is defined`
+    or `default` filter, are not required.
+
+    Args:
+        offer_tpl (OfferTemplate): Offer template
+        context (dict[str, Any]): Offer context data
+
+    Raises:
+        IncorrectOfferTemplateContextError: If context misses variables
+    """
+    if offer_tpl.variables is None:
+        return
+
+    missing_variables = [
+        var_name
+        for var_name in offer_tpl.variables
+        if var_name not in context
+    ]
+    if missing_variables:
+        raise IncorrectOfferTemplateContextError(
+            'Missing variables: {variables}'.format(
+                variables=', '.join(missing_variables),
+            ),
+        )
+
+
 class OfferTemplatesService(object):
     """Offer templates service.
 
     Provides methods for working with offer templates.
     """
 
-    def __init__(self) -> None:
-        """Initialize service."""
-        self.base = Base('offer_tpls')
-        self.drive = Drive('offer_tpls')
+    def __init__(
+        self,
+        storage: Storage,
+        pdf_cache: PdfCache,
+        render_engine: RenderEngine,
+    ) -> None:
+        """Initialize service.
+
+        Args:
+            storage (Storage): Deta storage.
+            pdf_cache (PdfCache): Cache of converted PDF files.
+            render_engine (RenderEngine): Render engine. Used to validate \
+                and compile uploaded templates.
+        """
+        self.base = storage.base('offer_tpls')
+        self.drive = storage.drive('offer_tpls')
+        self.pdf_cache = pdf_cache
+        self.render_engine = render_engine
 
     async def get_offer_tpls(
         self,
@@ -52,7 +117,7 @@ class OfferTemplatesService(object):
         Returns:
             PaginationResponse[OfferTemplate]: Pagination response
         """
-        response = self.base.fetch(
+        response = await self.base.fetch(
             limit=pagination.limit,
             last=pagination.last,
         )
@@ -77,7 +142,7 @@ class OfferTemplatesService(object):
         Returns:
             OfferTemplate: Offer template
         """
-        db_offer_tpl = self.base.get(offer_tpl_id)
+        db_offer_tpl = await self.base.get(offer_tpl_id)
         if not db_offer_tpl:
             raise OfferTemplateNotFoundError()
 
@@ -86,28 +151,41 @@ class OfferTemplatesService(object):
     async def create_offer_tpl(
         self,
         name: str,
-        offer_tpl_file: bytes,
+        offer_tpl_file: FileData,
     ) -> OfferTemplate:
         """Create offer template.
 
         Args:
             name (str): Offer template name
-            offer_tpl_file (bytes): Offer template file data
+            offer_tpl_file (FileData): Offer template file data or file
 
         Raises:
             BadOfferTemplateFileError: If offer template file is bad
+            FileTooLargeError: If file exceeds upload size limit
 
         Returns:
             OfferTemplate: Offer template
         """
         offer_tpl_id = generate_id()
-        await self._update_offer_tpl_file(offer_tpl_id, offer_tpl_file)
+        uploaded = await self._upload_offer_tpl_file(offer_tpl_file)
 
         offer_tpl = OfferTemplate(
             offer_tpl_id=offer_tpl_id,
             name=name,
+            file_hash=uploaded.file_hash,
+            file_size=len(uploaded.file_data),
+            variables=uploaded.variables,
+        )
+        # Nothing refers to new template yet, so record and file
+        # are written at once and rolled back together.
+        await gather_writes(
+            writes=[
+                self.base.put(serialize_model(offer_tpl), offer_tpl_id),
+                self.drive.put(offer_tpl_id, uploaded.file_data),
+            ],
+            keys=[offer_tpl_id],
+            storages=[self.base, self.drive],
         )
-        self.base.put(serialize_model(offer_tpl), offer_tpl_id)
 
         return offer_tpl
 
@@ -115,31 +193,42 @@ class OfferTemplatesService(object):
         self,
         offer_tpl_id: str,
         name: Optional[str] = None,
-        offer_tpl_file: Optional[bytes] = None,
+        offer_tpl_file: Optional[FileData] = None,
     ) -> OfferTemplate:
         """Update offer template.
 
+        File is stored before record, so record never refers
+        to missing file.
+
         Args:
             offer_tpl_id (str): Offer template id
             name (Optional[str]): Offer template name
-            offer_tpl_file (Optional[bytes]): Offer template file data
+            offer_tpl_file (Optional[FileData]): Offer template file data \
+                or file
 
         Raises:
             OfferTemplateNotFoundError: If offer template is not found
             BadOfferTemplateFileError: If offer template file is bad
+            FileTooLargeError: If file exceeds upload size limit
 
         Returns:
             OfferTemplate: Offer template
         """
-        db_offer_tpl = self.base.get(offer_tpl_id)
+        db_offer_tpl = await self.base.get(offer_tpl_id)
         if not db_offer_tpl:
             raise OfferTemplateNotFoundError()
 
         db_offer_tpl['name'] = name or db_offer_tpl['name']
-        self.base.put(db_offer_tpl, offer_tpl_id)
-
         if offer_tpl_file:
-            await self._update_offer_tpl_file(offer_tpl_id, offer_tpl_file)
+            uploaded = await self._upload_offer_tpl_file(offer_tpl_file)
+            await self.drive.put(offer_tpl_id, uploaded.file_data)
+            db_offer_tpl.update(
+                file_hash=uploaded.file_hash,
+                file_size=len(uploaded.file_data),
+                variables=uploaded.variables,
+            )
+
+        await self.base.put(db_offer_tpl, offer_tpl_id)
 
         return OfferTemplate.parse_obj(db_offer_tpl)
 
@@ -155,12 +244,16 @@ class OfferTemplatesService(object):
         Returns:
             OfferTemplate: Deleted offer template
         """
-        db_offer_tpl = self.base.get(offer_tpl_id)
+        db_offer_tpl = await self.base.get(offer_tpl_id)
         if not db_offer_tpl:
             raise OfferTemplateNotFoundError()
 
-        self.base.delete(offer_tpl_id)
-        self.drive.delete(offer_tpl_id)
+        # If record deletion fails, client can retry it.
+        # If file deletion fails, file is only left orphaned.
+        await asyncio.gather(
+            self.base.delete(offer_tpl_id),
+            self.drive.delete(offer_tpl_id),
+        )
 
         return OfferTemplate.parse_obj(db_offer_tpl)
 
@@ -168,8 +261,10 @@ class OfferTemplatesService(object):
         self,
         offer_tpl_id: str,
         file_format: DocFormat,
-    ) -> BytesIterator:
-        """Get offer template file data.
+    ) -> StoredFile:
+        """Get offer template file.
+
+        Converted PDF is cached, so template is converted only once.
 
         Args:
             offer_tpl_id (str): Offer template id
@@ -181,62 +276,93 @@ class OfferTemplatesService(object):
             FailedToConvertToPdf: If failed to convert to pdf
 
         Returns:
-            BytesIterator: Offer template file data
+            StoredFile: Offer template file data and size
         """
-        stream_body = self.drive.get(offer_tpl_id)
-        if not stream_body:
-            raise OfferTemplateNotFoundError()
-
         if file_format == DocFormat.docx:
-            return BytesIterator(stream_body.iter_chunks())
+            db_offer_tpl, stream_body = await asyncio.gather(
+                self.base.get(offer_tpl_id),
+                self.drive.get(offer_tpl_id),
+            )
+            if not stream_body:
+                raise OfferTemplateNotFoundError()
+
+            return StoredFile(
+                reader=ChunkedReader(stream_body.iter_chunks(CHUNK_SIZE)),
+                size=(db_offer_tpl or {}).get('file_size'),
+            )
 
         if file_format == DocFormat.pdf:
-            file_stream = convert_to_pdf(stream_body.read())
-            return BytesIterator(file_stream)
+            pdf_file = await self.pdf_cache.get_converted_file(
+                self.base,
+                self.drive,
+                offer_tpl_id,
+            )
+            if pdf_file is None:
+                raise OfferTemplateNotFoundError()
+
+            return pdf_file
 
         raise UnsupportedFileFormat()
 
-    async def _update_offer_tpl_file(
-        self,
-        offer_tpl_id: str,
-        offer_tpl_data: bytes,
-    ) -> None:
-        """Update offer template file data.
+    async def read_offer_tpl_file(self, offer_tpl_id: str) -> bytes:
+        """Read whole offer template docx file.
 
         Args:
             offer_tpl_id (str): Offer template id
-            offer_tpl_data (bytes): Offer template file data
 
         Raises:
-            BadOfferTemplateFileError: \
-                Raised when the offer template file is bad.
-            IncorrectOfferTemplateFile: \
-                Raised when the offer template file is incorrect.
-            OfferTemplateUploadFailed: \
-                Raised when the offer template upload failed.
+            OfferTemplateNotFoundError: If offer template is not found
+
+        Returns:
+            bytes: Offer template file data
         """
-        if not self._validate_offer_tpl_file(offer_tpl_data):
-            raise BadOfferTemplateFileError()
+        offer_tpl_file = await self.drive.read(offer_tpl_id)
+        if offer_tpl_file is None:
+            raise OfferTemplateNotFoundError()
 
-        self.drive.put(offer_tpl_id, offer_tpl_data)
+        return offer_tpl_file
 
-    async def _validate_offer_tpl_file(
+    async def _upload_offer_tpl_file(
         self,
-        offer_tpl_data: bytes,
-    ) -> bool:
-        """Validate offer template file data.
+        offer_tpl_data: FileData,
+    ) -> UploadedOfferTemplate:
+        """Read, validate and compile offer template file.
+
+        Validation and compilation are done in render worker process,
+        which needs whole file, so file is read to memory. Memory used
+        by upload is bounded by `MAX_OFFER_TPL_SIZE`, unlike offer files,
+        which are streamed to storage. Nothing is stored, so caller can
+        write file together with record.
 
         Args:
-            offer_tpl_data (bytes): Offer template file data
+            offer_tpl_data (FileData): Offer template file data or file
+
+        Raises:
+            BadOfferTemplateFileError: \
+                Raised when the offer template file is bad.
+            FileTooLargeError: If file exceeds upload size limit
 
         Returns:
-            bool: True if offer template file data is valid, False otherwise
+            UploadedOfferTemplate: Validated offer template file
         """
-        offer_tpl_stream = BytesIO(offer_tpl_data)
-        docx_tpl = DocxTemplate(offer_tpl_stream)
+        if isinstance(offer_tpl_data, bytes):
+            offer_tpl_data = BytesIO(offer_tpl_data)
+
+        # One byte over limit is enough to detect too large file
+        reader = HashingReader(offer_tpl_data, MAX_OFFER_TPL_SIZE)
+        offer_tpl_file = await asyncio.to_thread(
+            reader.read,
+            MAX_OFFER_TPL_SIZE + 1,
+        )
         try:
-            docx_tpl.get_docx()
-        except Exception:
-            return False
+            validated = await self.render_engine.validate_offer_tpl(
+                offer_tpl_file,
+            )
+        except InvalidOfferTemplateError:
+            raise BadOfferTemplateFileError()
 
-        return True
+        return UploadedOfferTemplate(
+            file_data=offer_tpl_file,
+            file_hash=reader.file_hash,
+            variables=validated.variables,
+        )
@@ -1,25 +1,44 @@
 """Offers utilities."""
 
 
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
-from typing import Any, Optional
+from typing import Any, AsyncIterator, NamedTuple, Optional, Sequence
 
-from deta import Base, Drive
-from docxtpl import DocxTemplate
+from jinja2 import TemplateError
 
-from app.core.deta import BytesIterator, serialize_model
-from app.core.docx import (  # noqa: WPS450
-    DocFormat,
-    UnsupportedFileFormat,
-    convert_to_pdf,
+from app.core.config import MAX_UPLOAD_SIZE
+from app.core.deta import (
+    PUT_MANY_LIMIT,
+    Storage,
+    gather_writes,
+    serialize_model,
 )
+from app.core.docx import DocFormat, UnsupportedFileFormat
+from app.core.downloads import StoredFile
 from app.core.models import generate_id
+from app.core.offer_tpl_cache import get_file_hash
 from app.core.pagination import (
     PaginationParams,
     PaginationResponse,
     default_pagination,
 )
-from app.models.offer import Offer
+from app.core.pdf_cache import PdfCache
+from app.core.render import RenderEngine
+from app.core.streams import (
+    CHUNK_SIZE,
+    ChunkedReader,
+    FileData,
+    FileTooLargeError,
+    HashingReader,
+    get_file_size,
+)
+from app.models.offer import Offer, PdfStatus
+
+# Offers are built by batches, so memory used by rendered files is bounded
+# and records of batch are saved by single request.
+BUILD_BATCH_SIZE = PUT_MANY_LIMIT
 
 
 class OfferNotFoundError(Exception):
@@ -34,16 +53,39 @@ class IncorrectOfferContextError(Exception):
     """Incorrect offer context."""
 
 
+class BuiltOffer(NamedTuple):
+    """Offer built from template."""
+
+    # Saved offer
+    offer: Offer
+
+    # Filled offer file data
+    offer_file: bytes
+
+
 class OffersService(object):
     """Offers service.
 
     Provides methods for working with offers.
     """
 
-    def __init__(self) -> None:
-        """Initialize service."""
-        self.base = Base('offers')
-        self.drive = Drive('offers')
+    def __init__(
+        self,
+        storage: Storage,
+        render_engine: RenderEngine,
+        pdf_cache: PdfCache,
+    ) -> None:
+        """Initialize service.
+
+        Args:
+            storage (Storage): Deta storage
+            render_engine (RenderEngine): Engine used to render offers
+            pdf_cache (PdfCache): Cache of converted PDF files
+        """
+        self.base = storage.base('offers')
+        self.drive = storage.drive('offers')
+        self.pdf_cache = pdf_cache
+        self.render_engine = render_engine
 
     async def get_offers(
         self,
@@ -57,7 +99,7 @@ class OffersService(object):
         Returns:
             PaginationResponse[Offer]: Pagination response
         """
-        response = self.base.fetch(
+        response = await self.base.fetch(
             limit=pagination.limit,
             last=pagination.last,
         )
@@ -82,7 +124,7 @@ class OffersService(object):
         Returns:
             Offer: Offer
         """
-        db_offer = self.base.get(offer_id)
+        db_offer = await self.base.get(offer_id)
         if not db_offer:
             raise OfferNotFoundError()
 
@@ -92,42 +134,71 @@ class OffersService(object):
         self,
         name: str,
         created_by: str,
-        offer_file: bytes,
+        offer_file: FileData,
     ) -> Offer:
         """Create offer.
 
+        Offer file is converted to PDF in background. Uploaded file
+        is hashed while it is stored, so its record is put after it.
+
         Args:
             name (str): Offer name
             created_by (str): Offer creator name
-            offer_file (bytes): Offer file data
+            offer_file (FileData): Offer file data or file
+
+        Raises:
+            FileTooLargeError: If file exceeds upload size limit
 
         Returns:
             Offer: Offer
         """
-        offer_id = generate_id()
-        await self._update_offer_file(offer_id, offer_file)
+        if isinstance(offer_file, bytes):
+            offers = await self._create_offers(
+                name,
+                created_by,
+                [offer_file],
+                prerender=True,
+            )
+            return offers[0]
+
+        if get_file_size(offer_file) > MAX_UPLOAD_SIZE:
+            raise FileTooLargeError()
 
+        offer_id = generate_id()
+        file_hash, file_size = await self._update_offer_file(
+            offer_id,
+            offer_file,
+        )
         offer = Offer(
             offer_id=offer_id,
             name=name,
             created_by=created_by,
+            file_hash=file_hash,
+            file_size=file_size,
+            pdf_status=PdfStatus.pending,
         )
-        self.base.put(serialize_model(offer), offer_id)
-
+        await gather_writes(
+            writes=[self.base.put(serialize_model(offer), offer_id)],
+            keys=[offer_id],
+            storages=[self.base, self.drive],
+        )
+        self.pdf_cache.prerender(self.base, self.drive, offer_id, file_hash)
         return offer
 
     async def update_offer(
         self,
         offer_id: str,
         name: Optional[str] = None,
-        offer_file: Optional[bytes] = None,
+        offer_file: Optional[FileData] = None,
     ) -> Offer:
         """Update offer.
 
+        New offer file is converted to PDF in background.
+
         Args:
             offer_id (str): Offer id
             name (Optional[str]): Offer name
-            offer_file (Optional[bytes]): Offer file data
+            offer_file (Optional[FileData]): Offer file data or file
 
         Raises:
             OfferNotFoundError: If offer is not found
@@ -135,15 +206,34 @@ class OffersService(object):
         Returns:
             Offer: Offer
         """
-        db_offer = self.base.get(offer_id)
+        db_offer = await self.base.get(offer_id)
         if not db_offer:
             raise OfferNotFoundError()
 
         db_offer['name'] = name or db_offer['name']
-        self.base.put(serialize_model(db_offer), offer_id)
-
+        outdated_file_hash = db_offer.get('file_hash')
+        file_hash = outdated_file_hash
         if offer_file:
-            await self._update_offer_file(offer_id, offer_file)
+            file_hash, file_size = await self._update_offer_file(
+                offer_id,
+                offer_file,
+            )
+            db_offer['file_size'] = file_size
+
+        if file_hash != outdated_file_hash:
+            db_offer['file_hash'] = file_hash
+            db_offer['pdf_status'] = PdfStatus.pending.value
+
+        await self.base.put(db_offer, offer_id)
+
+        if offer_file and file_hash != outdated_file_hash:
+            self.pdf_cache.prerender(
+                self.base,
+                self.drive,
+                offer_id,
+                db_offer['file_hash'],
+                offer_file if isinstance(offer_file, bytes) else None,
+            )
 
         return Offer.parse_obj(db_offer)
 
@@ -159,51 +249,70 @@ class OffersService(object):
         Returns:
             Offer: Deleted offer
         """
-        db_offer = self.base.get(offer_id)
+        db_offer = await self.base.get(offer_id)
         if not db_offer:
             raise OfferNotFoundError()
 
-        self.base.delete(offer_id)
-        self.drive.delete(offer_id)
+        # If record deletion fails, client can retry it.
+        # If file deletion fails, file is only left orphaned.
+        await asyncio.gather(
+            self.base.delete(offer_id),
+            self.drive.delete(offer_id),
+        )
 
         return Offer.parse_obj(db_offer)
 
-    async def build_offer(
+    async def build_offers(
         self,
         name: str,
         created_by: str,
-        context: dict[str, Any],
+        contexts: list[dict[str, Any]],
         offer_tpl_file: bytes,
-    ) -> Offer:
-        """Build offer file data with context.
+    ) -> AsyncIterator[BuiltOffer]:
+        """Build offers from template with several contexts.
+
+        Offers are rendered in parallel by render engine workers and saved
+        by batches, so built offers are yielded as their batch is saved.
+        Built offers are converted to PDF on first download.
 
         Args:
-            name (str): Offer name
-            created_by (str): Offer creator name
-            context (dict[str, Any]): Offer context data
+            name (str): Offers name
+            created_by (str): Offers creator name
+            contexts (list[dict[str, Any]]): Offers context data
             offer_tpl_file (bytes): Offer template file data
 
         Raises:
-            OfferNotFoundError: If offer is not found
-            UnsupportedFileFormat: If file format is unsupported
-            FailedToConvertToPdf: If failed to convert to pdf
+            BrokenProcessPool: If render worker died
+            IncorrectOfferContextError: If context is incorrect
 
-        Returns:
-            Offer: Offer
+        Yields:
+            BuiltOffer: Built offers in order of contexts
         """
-        offer_file = self._fill_offer(offer_tpl_file, context)
-
-        offer = await self.create_offer(name, created_by, offer_file)
-        await self._update_offer_file(offer.offer_id, offer_file)
-
-        return offer
+        for start in range(0, len(contexts), BUILD_BATCH_SIZE):
+            try:
+                offer_files = await self.render_engine.render_offers(
+                    offer_tpl_file,
+                    contexts[start:start + BUILD_BATCH_SIZE],
+                )
+            except BrokenProcessPool:
+                # It is also RuntimeError, but not related to context
+                raise
+            except (RuntimeError, TypeError, TemplateError):
+                # Context fits template variables, but not their usage
+                raise IncorrectOfferContextError()
+
+            offers = await self._create_offers(name, created_by, offer_files)
+            for offer, offer_file in zip(offers, offer_files):
+                yield BuiltOffer(offer=offer, offer_file=offer_file)
 
     async def get_offer_file(
         self,
         offer_id: str,
         file_format: DocFormat,
-    ) -> BytesIterator:
-        """Get offer file data.
+    ) -> StoredFile:
+        """Get offer file.
+
+        Converted PDF is cached, so offer is converted only once.
 
         Args:
             offer_id (str): Offer id
@@ -215,59 +324,124 @@ class OffersService(object):
             FailedToConvertToPdf: If failed to convert to pdf
 
         Returns:
-            BytesIterator: Offer file data
+            StoredFile: Offer file data and size
         """
-        stream_body = self.drive.get(offer_id)
-        if not stream_body:
-            raise OfferNotFoundError()
-
         if file_format == DocFormat.docx:
-            return BytesIterator(stream_body.iter_chunks())
+            db_offer, stream_body = await asyncio.gather(
+                self.base.get(offer_id),
+                self.drive.get(offer_id),
+            )
+            if not stream_body:
+                raise OfferNotFoundError()
+
+            return StoredFile(
+                reader=ChunkedReader(stream_body.iter_chunks(CHUNK_SIZE)),
+                size=(db_offer or {}).get('file_size'),
+            )
 
         if file_format == DocFormat.pdf:
-            file_stream = convert_to_pdf(stream_body.read())
-            return BytesIterator(file_stream)
+            pdf_file = await self.pdf_cache.get_converted_file(
+                self.base,
+                self.drive,
+                offer_id,
+            )
+            if pdf_file is None:
+                raise OfferNotFoundError()
+
+            return pdf_file
 
         raise UnsupportedFileFormat()
 
     async def _update_offer_file(
         self,
         offer_id: str,
-        offer_data: bytes,
-    ) -> None:
+        offer_data: FileData,
+    ) -> tuple[str, int]:
         """Update offer file data.
 
+        File is uploaded by chunks, hashed and measured on the fly.
+
         Args:
             offer_id (str): Offer id
-            offer_data (bytes): Offer file data
+            offer_data (FileData): Offer file data or file
+
+        Raises:
+            FileTooLargeError: If file exceeds upload size limit
+
+        Returns:
+            tuple[str, int]: SHA-256 and size of offer file data
         """
-        self.drive.put(offer_id, offer_data)
+        if isinstance(offer_data, bytes):
+            offer_data = BytesIO(offer_data)
 
-    def _fill_offer(
+        reader = HashingReader(offer_data, MAX_UPLOAD_SIZE)
+        await self.drive.put(offer_id, reader)
+        return reader.file_hash, reader.size
+
+    async def _create_offers(  # noqa: WPS210
         self,
-        offer_tpl_file: bytes,
-        context: dict[str, Any],
-    ) -> bytes:
-        """Fill offer template with context data.
+        name: str,
+        created_by: str,
+        offer_files: Sequence[bytes],
+        prerender: bool = False,
+    ) -> list[Offer]:
+        """Create offers with single put of records.
+
+        File data is hashed before upload, so records are put concurrently
+        with uploads of files, see `gather_writes`.
 
         Args:
-            offer_tpl_file (bytes): Offer template file data
-            context (dict[str, Any]): Offer data
+            name (str): Offers name
+            created_by (str): Offers creator name
+            offer_files (Sequence[bytes]): Offers file data
+            prerender (bool): Whether to convert offer files to PDF \
+                in background. Defaults to False.
 
         Raises:
-            IncorrectOfferContextError: If context is incorrect
+            FileTooLargeError: If any file exceeds upload size limit. \
+                Nothing is written then.
 
         Returns:
-            bytes: Filled offer template file
+            list[Offer]: Offers in order of files
         """
-        offer_tpl_stream = BytesIO(offer_tpl_file)
-        docx = DocxTemplate(offer_tpl_stream)
-        try:
-            docx.render(context)
-        except RuntimeError:
-            raise IncorrectOfferContextError()
-
-        filled_offer_stream = BytesIO()
-        docx.save(filled_offer_stream)
-        filled_offer_stream.seek(0)
-        return filled_offer_stream.read()
+        if max(map(len, offer_files)) > MAX_UPLOAD_SIZE:
+            raise FileTooLargeError()
+
+        offer_ids = [generate_id() for _ in offer_files]
+        file_hashes = [get_file_hash(offer_file) for offer_file in offer_files]
+        offers = [
+            Offer(
+                offer_id=offer_id,
+                name=name,
+                created_by=created_by,
+                file_hash=file_hash,
+                file_size=len(offer_file),
+                pdf_status=PdfStatus.pending,
+            )
+            for offer_id, file_hash, offer_file in zip(
+                offer_ids,
+                file_hashes,
+                offer_files,
+            )
+        ]
+        records = dict(zip(offer_ids, map(serialize_model, offers)))
+        uploads = map(self.drive.put, offer_ids, offer_files)
+        await gather_writes(
+            writes=[self.base.put_many(records), *uploads],
+            keys=offer_ids,
+            storages=[self.base, self.drive],
+        )
+
+        if not prerender:
+            return offers
+
+        for offer_index, offer_file in enumerate(offer_files):
+            self.pdf_cache.prerender(
+                self.base,
+                self.drive,
+                offer_ids[offer_index],
+                file_hashes[offer_index],
+                offer_file,
+            )
+
+        return offers
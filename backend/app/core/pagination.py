@@ -1,7 +1,8 @@
 """Pagination logic."""
 
 
-from typing import Generic, Optional, TypeVar
+from bisect import bisect_right
+from typing import Generic, Optional, Sequence, TypeVar
 
 from pydantic import BaseModel, Field
 
@@ -33,3 +34,29 @@ class PaginationResponse(BaseModel, Generic[ItemsType]):
     # Can be used as `last` param for next page.
     # None, if there are no more pages.
     last: Optional[str] = None
+
+
+def paginate(
+    entities: Sequence[ItemsType],
+    keys: Sequence[str],
+    pagination: PaginationParams = default_pagination,
+) -> PaginationResponse[ItemsType]:
+    """Get page of entities in memory, as Deta Base fetch does.
+
+    Args:
+        entities (Sequence[ItemsType]): Entities sorted by keys.
+        keys (Sequence[str]): Sorted keys of entities.
+        pagination (PaginationParams): Pagination params.
+
+    Returns:
+        PaginationResponse[ItemsType]: Page of entities.
+    """
+    page_start = 0
+    if pagination.last is not None:
+        page_start = bisect_right(keys, pagination.last)
+
+    page_end = page_start + pagination.limit
+    return PaginationResponse(
+        items=list(entities[page_start:page_end]),
+        last=keys[page_end - 1] if page_end < len(keys) else None,
+    )
@@ -0,0 +1,205 @@
+"""Password hashing.
+
+bcrypt is slow by design, so passwords are hashed and verified in a
+dedicated bounded pool of threads. bcrypt releases GIL while hashing,
+so the event loop keeps serving other requests during bursts of logins.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+from time import perf_counter
+from typing import Callable, Optional, TypeVar
+
+from passlib.context import CryptContext
+from pydantic import BaseModel
+
+ResultType = TypeVar('ResultType')
+
+
+class PasswordHasherStats(BaseModel):
+    """Password hasher metrics."""
+
+    # Number of hashing threads. Max number of concurrent bcrypt rounds.
+    workers: int
+
+    # bcrypt cost factor of new hashes
+    rounds: int
+
+    # Jobs submitted but not finished yet
+    in_flight: int
+
+    # Jobs waiting for free thread
+    queued: int
+
+    # Successfully finished jobs
+    completed: int
+
+    # Average time in queue in seconds
+    avg_queue_time: float
+
+    # Average hashing time in seconds
+    avg_job_time: float
+
+
+class PasswordHasher(object):
+    """Bounded pool of threads for password hashing and verification."""
+
+    def __init__(self, workers: int, rounds: int) -> None:
+        """Initialize hasher.
+
+        Args:
+            workers (int): Number of hashing threads.
+            rounds (int): bcrypt cost factor. Hashes with other cost factor \
+                are updated on successful verification.
+        """
+        self.workers = workers
+        self.rounds = rounds
+        self._context = CryptContext(
+            schemes=['bcrypt'],
+            deprecated='auto',
+            bcrypt__rounds=rounds,
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='password-hasher',
+        )
+        self._lock = Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._queue_time = 0.0  # noqa: WPS358
+        self._jobs_time = 0.0  # noqa: WPS358
+
+    async def hash(self, password: str) -> str:
+        """Get password hash.
+
+        Args:
+            password (str): Password to hash.
+
+        Returns:
+            str: Hashed password.
+        """
+        return await self._run(partial(self._context.hash, password))
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        """Verify password.
+
+        Args:
+            password (str): Password to verify.
+            password_hash (str): Hashed password.
+
+        Returns:
+            bool: True if password is correct, False otherwise.
+        """
+        return await self._run(
+            partial(self._context.verify, password, password_hash),
+        )
+
+    async def verify_and_update(
+        self,
+        password: str,
+        password_hash: str,
+    ) -> tuple[bool, Optional[str]]:
+        """Verify password and rehash it if cost factor is changed.
+
+        Args:
+            password (str): Password to verify.
+            password_hash (str): Hashed password.
+
+        Returns:
+            tuple[bool, Optional[str]]: Flag whether password is correct \
+                and new hash if hash must be updated.
+        """
+        return await self._run(
+            partial(self._context.verify_and_update, password, password_hash),
+        )
+
+    def needs_update(self, password_hash: str) -> bool:
+        """Check if hash has outdated cost factor.
+
+        Args:
+            password_hash (str): Hashed password.
+
+        Returns:
+            bool: True if hash must be updated, False otherwise.
+        """
+        return self._context.needs_update(password_hash)
+
+    async def shutdown(self) -> None:
+        """Stop hashing threads, waiting for running jobs."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown)
+
+    def get_stats(self) -> PasswordHasherStats:
+        """Get hasher metrics.
+
+        Returns:
+            PasswordHasherStats: Hasher metrics.
+        """
+        with self._lock:
+            completed = self._completed
+            queue_time = self._queue_time
+            jobs_time = self._jobs_time
+
+        return PasswordHasherStats(
+            workers=self.workers,
+            rounds=self.rounds,
+            in_flight=self._in_flight,
+            queued=max(self._in_flight - self.workers, 0),
+            completed=completed,
+            avg_queue_time=queue_time / completed if completed else 0,
+            avg_job_time=jobs_time / completed if completed else 0,
+        )
+
+    async def _run(self, job: Callable[[], ResultType]) -> ResultType:
+        """Run job in hashing thread.
+
+        Args:
+            job (Callable[[], ResultType]): Hashing job.
+
+        Returns:
+            ResultType: Job result.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self._executor,
+            self._measure_job,
+            perf_counter(),
+            job,
+        )
+        self._in_flight += 1
+        future.add_done_callback(self._finish_job)
+        return await future
+
+    def _measure_job(
+        self,
+        submitted_at: float,
+        job: Callable[[], ResultType],
+    ) -> ResultType:
+        """Run job and update its time metrics. Called in hashing thread.
+
+        Args:
+            submitted_at (float): Job submit time.
+            job (Callable[[], ResultType]): Hashing job.
+
+        Returns:
+            ResultType: Job result.
+        """
+        started_at = perf_counter()
+        job_result = job()
+        finished_at = perf_counter()
+        with self._lock:
+            self._completed += 1
+            self._queue_time += started_at - submitted_at
+            self._jobs_time += finished_at - started_at
+
+        return job_result
+
+    def _finish_job(self, future: 'asyncio.Future[ResultType]') -> None:
+        """Update metrics with finished job.
+
+        Args:
+            future (asyncio.Future[ResultType]): Finished job.
+        """
+        self._in_flight -= 1
@@ -0,0 +1,364 @@
+"""Cache of converted PDF files.
+
+Conversion of docx to PDF is slow and, for remote API, limited
+by API quota. Converted files are stored in Deta Drive and keyed by SHA-256
+of docx file content, so same document is converted only once and changed
+document never gets stale PDF. Sizes of converted files are stored
+in Deta Base under the same keys, so PDF is downloaded with Content-Length.
+Cached files are not deleted on change or deletion of items, since
+other items may have files with same content.
+
+Conversion of a file is done by single job. Requests for file, which is
+being converted, wait for running job instead of starting new one.
+Number of background conversions of uploaded files is limited, other
+files are converted on first download.
+Docx files are streamed to converter and PDF is spooled to temporary file,
+so memory used by conversion does not depend on document size.
+"""
+
+import asyncio
+import logging
+import os
+from functools import partial
+from io import BytesIO
+from tempfile import TemporaryFile
+from typing import IO, AsyncIterator, NamedTuple, Optional
+
+from app.core.deta import AsyncBase, AsyncDrive, Storage
+from app.core.docx import PdfConverter
+from app.core.downloads import StoredFile
+from app.core.offer_tpl_cache import get_file_object_hash
+from app.core.streams import CHUNK_SIZE, ChunkedReader, iterate_file
+from app.models.offer import PdfStatus
+
+logger = logging.getLogger(__name__)
+
+
+class FileItem(NamedTuple):
+    """Docx file with its Base item."""
+
+    # Base of file items
+    base: AsyncBase
+
+    # Drive of docx files
+    drive: AsyncDrive
+
+    # Item key and file name
+    key: str
+
+
+def forget_job(
+    jobs: dict[str, 'asyncio.Task[bool]'],
+    file_hash: str,
+    job: 'asyncio.Task[bool]',
+) -> None:
+    """Remove finished conversion job.
+
+    Background jobs may have no waiters, so job exception is retrieved
+    here to not be reported as unhandled. Failure is logged by job itself.
+
+    Args:
+        jobs (dict[str, asyncio.Task[bool]]): Running jobs by file hashes.
+        file_hash (str): SHA-256 of converted file.
+        job (asyncio.Task[bool]): Finished job.
+    """
+    if jobs.get(file_hash) is job:
+        jobs.pop(file_hash)
+
+    if not job.cancelled():
+        job.exception()
+
+
+async def backfill_file_hash(file_item: FileItem) -> Optional[str]:
+    """Store hash of file, which item is created before hashes were stored.
+
+    File is spooled to temporary file, which is closed after hashing.
+    Only hash field of item is updated, so concurrent changes of other
+    fields are kept.
+
+    Args:
+        file_item (FileItem): Docx file.
+
+    Returns:
+        Optional[str]: SHA-256 of file data if file is found, \
+            None otherwise.
+    """
+    stream_body = await file_item.drive.get(file_item.key)
+    if not stream_body:
+        return None
+
+    reader = ChunkedReader(stream_body.iter_chunks(CHUNK_SIZE))
+    with await asyncio.to_thread(reader.spool) as docx_file:
+        file_hash = await asyncio.to_thread(get_file_object_hash, docx_file)
+
+    await file_item.base.update({'file_hash': file_hash}, file_item.key)
+    return file_hash
+
+
+async def open_document(
+    file_item: FileItem,
+    docx_file: Optional[IO[bytes]],
+) -> Optional[AsyncIterator[bytes]]:
+    """Get docx file data chunks.
+
+    Args:
+        file_item (FileItem): Docx file.
+        docx_file (Optional[IO[bytes]]): Docx file object. \
+            File is streamed from Drive if None.
+
+    Returns:
+        Optional[AsyncIterator[bytes]]: Docx file data chunks \
+            if file is found, None otherwise.
+    """
+    if docx_file is not None:
+        return iterate_file(docx_file)
+
+    stream_body = await file_item.drive.get(file_item.key)
+    if not stream_body:
+        return None
+
+    return iterate_file(stream_body)
+
+
+class PdfCache(object):
+    """Converted PDF files stored in Deta Drive.
+
+    Base items of converted files keep SHA-256 of file data
+    in `file_hash` field. Items with `pdf_status` field also get
+    status of conversion, see `app.models.offer.PdfStatus`.
+    """
+
+    def __init__(
+        self,
+        storage: Storage,
+        converter: PdfConverter,
+        prerender_jobs: int,
+    ) -> None:
+        """Initialize cache.
+
+        Args:
+            storage (Storage): Deta storage.
+            converter (PdfConverter): Converter used on cache miss.
+            prerender_jobs (int): Max number of concurrent background \
+                conversions.
+        """
+        self.drive = storage.drive('pdf_cache')
+        self.base = storage.base('pdf_cache')
+        self.converter = converter
+        self.prerender_jobs = prerender_jobs
+        self._jobs: dict[str, asyncio.Task[bool]] = {}
+        self._prerendering: set[asyncio.Task[bool]] = set()
+
+    async def start(self) -> None:
+        """Start converter."""
+        await self.converter.start()
+
+    async def close(self) -> None:
+        """Wait for running conversions and close converter."""
+        await asyncio.gather(*self._jobs.values(), return_exceptions=True)
+        await self.converter.close()
+
+    async def get_converted_file(
+        self,
+        base: AsyncBase,
+        drive: AsyncDrive,
+        key: str,
+    ) -> Optional[StoredFile]:
+        """Get docx file converted to PDF, converting it on cache miss.
+
+        Args:
+            base (AsyncBase): Base of file items.
+            drive (AsyncDrive): Drive of docx files.
+            key (str): Item key and file name.
+
+        Returns:
+            Optional[StoredFile]: PDF file if item and its file \
+                are found, None otherwise.
+        """
+        db_item = await base.get(key)
+        if not db_item:
+            return None
+
+        file_item = FileItem(base, drive, key)
+        file_hash: Optional[str] = db_item.get('file_hash')
+        if file_hash is None:
+            file_hash = await backfill_file_hash(file_item)
+            if file_hash is None:
+                return None
+
+        cached_file = await self._get_pdf(file_hash)
+        if cached_file is not None:
+            return cached_file
+
+        # Job is shared, so it is not cancelled with waiting request
+        converted = await asyncio.shield(
+            self._convert(file_item, file_hash, None),
+        )
+        if not converted:
+            return None
+
+        return await self._get_pdf(file_hash)
+
+    def prerender(  # noqa: WPS211
+        self,
+        base: AsyncBase,
+        drive: AsyncDrive,
+        key: str,
+        file_hash: str,
+        file_data: Optional[bytes] = None,
+    ) -> None:
+        """Start conversion of docx file in background.
+
+        Conversion is skipped if max number of background conversions
+        is running, file is converted on first download then.
+
+        Args:
+            base (AsyncBase): Base of file items.
+            drive (AsyncDrive): Drive of docx files.
+            key (str): Item key and file name.
+            file_hash (str): SHA-256 of docx file data.
+            file_data (Optional[bytes]): Docx file data. \
+                File is streamed from Drive if None.
+        """
+        if file_hash in self._jobs:
+            return
+
+        if len(self._prerendering) >= self.prerender_jobs:
+            return
+
+        job = self._convert(
+            FileItem(base, drive, key),
+            file_hash,
+            None if file_data is None else BytesIO(file_data),
+        )
+        self._prerendering.add(job)
+        job.add_done_callback(self._prerendering.discard)
+
+    async def _get_pdf(self, file_hash: str) -> Optional[StoredFile]:
+        """Get converted PDF file, waiting for running conversion.
+
+        Args:
+            file_hash (str): SHA-256 of docx file data.
+
+        Returns:
+            Optional[StoredFile]: PDF file if it is cached \
+                or being converted, None otherwise. Size is None \
+                for files converted before sizes were stored.
+        """
+        job = self._jobs.get(file_hash)
+        if job is not None:
+            await asyncio.shield(job)
+
+        stream_body, db_pdf = await asyncio.gather(
+            self.drive.get(file_hash),
+            self.base.get(file_hash),
+        )
+        if not stream_body:
+            return None
+
+        return StoredFile(
+            reader=ChunkedReader(stream_body.iter_chunks(CHUNK_SIZE)),
+            size=db_pdf.get('size') if db_pdf else None,
+        )
+
+    def _convert(
+        self,
+        file_item: FileItem,
+        file_hash: str,
+        docx_file: Optional[IO[bytes]],
+    ) -> 'asyncio.Task[bool]':
+        """Get running conversion job of file or start new one.
+
+        Args:
+            file_item (FileItem): Docx file.
+            file_hash (str): SHA-256 of docx file data.
+            docx_file (Optional[IO[bytes]]): Docx file object. \
+                File is streamed from Drive if None.
+
+        Returns:
+            asyncio.Task[bool]: Conversion job.
+        """
+        job = self._jobs.get(file_hash)
+        if job is None:
+            job = asyncio.create_task(
+                self._run_job(file_item, file_hash, docx_file),
+            )
+            self._jobs[file_hash] = job
+            job.add_done_callback(partial(forget_job, self._jobs, file_hash))
+
+        return job
+
+    async def _run_job(
+        self,
+        file_item: FileItem,
+        file_hash: str,
+        docx_file: Optional[IO[bytes]],
+    ) -> bool:
+        """Convert docx file to PDF and cache result.
+
+        PDF is spooled to temporary file and uploaded to Drive by chunks.
+
+        Args:
+            file_item (FileItem): Docx file.
+            file_hash (str): SHA-256 of docx file data.
+            docx_file (Optional[IO[bytes]]): Docx file object. \
+                File is streamed from Drive if None.
+
+        Raises:
+            Exception: If conversion failed. Status is set to failed.
+
+        Returns:
+            bool: True if file is converted, False if docx file is not found.
+        """
+        document = await open_document(file_item, docx_file)
+        if document is None:
+            return False
+
+        with TemporaryFile() as pdf_file:
+            try:
+                await self.converter.convert(document, pdf_file)
+            except Exception:
+                logger.exception(
+                    'PDF conversion of {key} failed'.format(key=file_item.key),
+                )
+                await self._set_status(file_item, file_hash, PdfStatus.failed)
+                raise
+
+            pdf_size = pdf_file.seek(0, os.SEEK_END)
+            pdf_file.seek(0)
+            await asyncio.gather(
+                self.drive.put(file_hash, pdf_file),
+                self.base.put({'size': pdf_size}, file_hash),
+            )
+
+        await self._set_status(file_item, file_hash, PdfStatus.ready)
+        return True
+
+    async def _set_status(
+        self,
+        file_item: FileItem,
+        file_hash: str,
+        pdf_status: PdfStatus,
+    ) -> None:
+        """Set conversion status of item.
+
+        Status is not set if item does not track it
+        or its file was changed during conversion. Only status field
+        is updated, so other fields changed during conversion are kept.
+
+        Args:
+            file_item (FileItem): Converted docx file.
+            file_hash (str): SHA-256 of converted file data.
+            pdf_status (PdfStatus): Conversion status.
+        """
+        db_item = await file_item.base.get(file_item.key)
+        if not db_item or 'pdf_status' not in db_item:
+            return
+
+        if db_item.get('file_hash') != file_hash:
+            return
+
+        await file_item.base.update(
+            {'pdf_status': pdf_status.value},
+            file_item.key,
+        )
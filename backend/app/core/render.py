@@ -0,0 +1,322 @@
+"""Offers rendering engine.
+
+Rendering of docx templates is CPU bound, so it is done in a pool
+of worker processes to keep the event loop responsive. Workers are started
+with the application and live until its shutdown, so each of them keeps
+compiled templates hot in its own `offer_tpls_cache`. Uploaded templates are
+validated and compiled in workers too.
+
+Jobs carry only hash of template file. Engine stores template files
+in temporary directory, and worker reads file from there only if it has
+not compiled the template yet, so large files are not sent with every job.
+"""
+
+import asyncio
+import itertools
+import math
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any, Callable, Optional, Sequence, TypeVar
+
+from pydantic import BaseModel
+
+from app.core.offer_tpl_cache import (
+    CompiledOfferTemplate,
+    get_file_hash,
+    offer_tpls_cache,
+)
+from app.core.offer_tpl_validation import (
+    ValidatedOfferTemplate,
+    validate_offer_tpl,
+)
+
+ResultType = TypeVar('ResultType')
+
+
+def store_offer_tpl_file(offer_tpls_dir: str, offer_tpl_file: bytes) -> str:
+    """Store offer template file for worker processes.
+
+    File is written under its hash once. It is renamed into place after
+    write, so workers never read partly written file.
+
+    Args:
+        offer_tpls_dir (str): Directory of template files.
+        offer_tpl_file (bytes): Offer template file data
+
+    Returns:
+        str: SHA-256 of offer template file data
+    """
+    file_hash = get_file_hash(offer_tpl_file)
+    file_path = Path(offer_tpls_dir, file_hash)
+    if not file_path.exists():
+        temp_path = file_path.with_suffix('.{pid}'.format(pid=os.getpid()))
+        temp_path.write_bytes(offer_tpl_file)
+        temp_path.replace(file_path)
+
+    return file_hash
+
+
+def load_offer_tpl(
+    offer_tpls_dir: str,
+    file_hash: str,
+) -> CompiledOfferTemplate:
+    """Get compiled offer template in worker process.
+
+    Template file is read only if it is not compiled yet.
+
+    Args:
+        offer_tpls_dir (str): Directory of template files.
+        file_hash (str): SHA-256 of offer template file data
+
+    Returns:
+        CompiledOfferTemplate: Compiled offer template
+    """
+    return offer_tpls_cache.get_by_hash(
+        file_hash,
+        Path(offer_tpls_dir, file_hash).read_bytes,
+    )
+
+
+def render_offers(
+    offer_tpls_dir: str,
+    file_hash: str,
+    contexts: list[dict[str, Any]],
+) -> list[bytes]:
+    """Render offer template with several contexts in worker process.
+
+    Args:
+        offer_tpls_dir (str): Directory of template files.
+        file_hash (str): SHA-256 of offer template file data
+        contexts (list[dict[str, Any]]): Offers context data
+
+    Returns:
+        list[bytes]: Filled offers file data in order of contexts
+    """
+    offer_tpl = load_offer_tpl(offer_tpls_dir, file_hash)
+    return [offer_tpl.render(context) for context in contexts]
+
+
+def warm_up_worker(offer_tpls_dir: str, file_hashes: Sequence[str]) -> None:
+    """Compile offer templates at start of worker process.
+
+    Used as initializer of worker processes, so each worker compiles
+    templates before its first job.
+
+    Args:
+        offer_tpls_dir (str): Directory of template files.
+        file_hashes (Sequence[str]): SHA-256 of offer template files
+    """
+    for file_hash in file_hashes:
+        load_offer_tpl(offer_tpls_dir, file_hash)
+
+
+class RenderEngineStats(BaseModel):
+    """Render engine metrics."""
+
+    # Number of worker processes
+    workers: int
+
+    # Jobs submitted but not finished yet
+    in_flight: int
+
+    # Jobs waiting for free worker
+    queued: int
+
+    # Successfully finished jobs
+    completed: int
+
+    # Failed jobs
+    failed: int
+
+    # Average job time in seconds, including time in queue
+    avg_job_time: float
+
+
+class RenderEngine(object):
+    """Pool of worker processes for offers rendering."""
+
+    def __init__(self, workers: int) -> None:
+        """Initialize engine. Pool is not started until `start` call.
+
+        Args:
+            workers (int): Number of worker processes.
+        """
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._offer_tpls_dir = TemporaryDirectory(prefix='offer-tpls-')
+        # Hashes of templates compiled by workers at their start
+        self._warm_up_hashes: tuple[str, ...] = ()
+        # Jobs, which start worker processes of current pool
+        self._warm_up_jobs: list['Future[int]'] = []
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._jobs_time = 0.0  # noqa: WPS358
+
+    async def start(self, offer_tpl_files: Sequence[bytes] = ()) -> None:
+        """Start worker processes and wait until they are ready.
+
+        Args:
+            offer_tpl_files (Sequence[bytes]): Templates, which each worker \
+                compiles at its start. Defaults to none.
+        """
+        self._warm_up_hashes = tuple([
+            await asyncio.to_thread(
+                store_offer_tpl_file,
+                self._offer_tpls_dir.name,
+                offer_tpl_file,
+            )
+            for offer_tpl_file in offer_tpl_files
+        ])
+        self._start_executor()
+        await asyncio.gather(*map(asyncio.wrap_future, self._warm_up_jobs))
+
+    async def shutdown(self) -> None:
+        """Stop worker processes, waiting for running jobs."""
+        if self._executor is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._executor.shutdown)
+            self._executor = None
+
+        self._offer_tpls_dir.cleanup()
+
+    async def render_offers(
+        self,
+        offer_tpl_file: bytes,
+        contexts: list[dict[str, Any]],
+    ) -> list[bytes]:
+        """Render offers in parallel over worker processes.
+
+        Contexts are split into one chunk per worker. Template file
+        is stored once and read only by workers, which have not compiled
+        the template yet.
+
+        Args:
+            offer_tpl_file (bytes): Offer template file data
+            contexts (list[dict[str, Any]]): Offers context data
+
+        Returns:
+            list[bytes]: Filled offers file data in order of contexts
+        """
+        file_hash = await asyncio.to_thread(
+            store_offer_tpl_file,
+            self._offer_tpls_dir.name,
+            offer_tpl_file,
+        )
+        chunk_size = max(math.ceil(len(contexts) / self.workers), 1)
+        rendered_chunks = await asyncio.gather(*(
+            self._submit(
+                render_offers,
+                self._offer_tpls_dir.name,
+                file_hash,
+                contexts[start:start + chunk_size],
+            )
+            for start in range(0, len(contexts), chunk_size)
+        ))
+        return list(itertools.chain.from_iterable(rendered_chunks))
+
+    async def validate_offer_tpl(
+        self,
+        offer_tpl_file: bytes,
+    ) -> ValidatedOfferTemplate:
+        """Validate and compile offer template in worker process.
+
+        Args:
+            offer_tpl_file (bytes): Offer template file data
+
+        Returns:
+            ValidatedOfferTemplate: Template variables
+        """
+        return await self._submit(validate_offer_tpl, offer_tpl_file)
+
+    def get_stats(self) -> RenderEngineStats:
+        """Get engine metrics.
+
+        Returns:
+            RenderEngineStats: Engine metrics.
+        """
+        finished = self._completed + self._failed
+        return RenderEngineStats(
+            workers=self.workers,
+            in_flight=self._in_flight,
+            queued=max(self._in_flight - self.workers, 0),
+            completed=self._completed,
+            failed=self._failed,
+            avg_job_time=self._jobs_time / finished if finished else 0,
+        )
+
+    async def _submit(
+        self,
+        func: Callable[..., ResultType],
+        *args: Any,
+    ) -> ResultType:
+        """Run job in worker process.
+
+        Args:
+            func (Callable[..., ResultType]): Job function.
+            args (Any): Job function arguments.
+
+        Raises:
+            BrokenProcessPool: If worker process died. Pool is restarted.
+
+        Returns:
+            ResultType: Job result.
+        """
+        executor = self._executor or self._start_executor()
+        loop = asyncio.get_running_loop()
+        job = loop.run_in_executor(executor, func, *args)
+        self._in_flight += 1
+        job.add_done_callback(partial(self._finish_job, perf_counter()))
+        try:
+            return await job
+        except BrokenProcessPool:
+            # All jobs of broken pool fail, but pool is restarted once
+            if self._executor is executor:
+                executor.shutdown(wait=False)
+                self._start_executor()
+            raise
+
+    def _start_executor(self) -> ProcessPoolExecutor:
+        """Start new pool of worker processes.
+
+        Pool starts processes on demand, so job is submitted for each
+        worker to start all of them at once.
+
+        Returns:
+            ProcessPoolExecutor: Started pool.
+        """
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            # Forking of process with running event loop is not safe
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=warm_up_worker,
+            initargs=(self._offer_tpls_dir.name, self._warm_up_hashes),
+        )
+        self._warm_up_jobs = [
+            self._executor.submit(os.getpid) for _ in range(self.workers)
+        ]
+        return self._executor
+
+    def _finish_job(
+        self,
+        started_at: float,
+        job: 'asyncio.Future[Any]',
+    ) -> None:
+        """Update metrics with finished job.
+
+        Args:
+            started_at (float): Job submit time.
+            job (asyncio.Future[Any]): Finished job.
+        """
+        self._in_flight -= 1
+        self._jobs_time += perf_counter() - started_at
+        if job.cancelled() or job.exception() is not None:
+            self._failed += 1
+        else:
+            self._completed += 1
@@ -0,0 +1,309 @@
+"""Streams of file data.
+
+Files are passed between Drive, PDF converters and clients by chunks,
+so memory used by transfer does not depend on file size.
+"""
+
+import asyncio
+import os
+from contextlib import closing
+from hashlib import sha256
+from io import BufferedIOBase, RawIOBase
+from tempfile import SpooledTemporaryFile
+from typing import IO, Any, AsyncIterator, Iterator, Literal, Optional, Union
+from zipfile import ZIP_STORED, ZipFile
+
+# Size of chunks read from streams. Defaults to 64 KiB.
+CHUNK_SIZE = 65536
+
+# Max size of spooled file kept in memory. Defaults to 8 MiB.
+SPOOL_MAX_SIZE = 8388608
+
+# File data in memory or file object
+FileData = Union[bytes, IO[bytes]]
+
+
+class ChunkedReader(BufferedIOBase):
+    """Buffered reader of bytes chunks iterator.
+
+    Used to wrap Drive stream body to make it readable. Buffer keeps only
+    chunks, which are not read yet, and is filled just up to read size,
+    so only last buffered chunk can be read partly. Its rest is kept
+    as memoryview, so every byte is copied once, when it is returned from
+    `read`, and whole buffer is taken by single join. Chunk of read size
+    is returned without copying.
+
+    See https://docs.python.org/3/library/io.html#io.BufferedIOBase
+    for more details.
+    """
+
+    def __init__(self, iterator: Iterator[bytes]) -> None:
+        """Initialize reader.
+
+        Args:
+            iterator (Iterator[bytes]): Bytes iterator
+        """
+        self._iterator = iterator
+        self._chunks: list[Union[bytes, memoryview]] = []
+        self._buffered = 0
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        """Read bytes from iterator.
+
+        Args:
+            size (Optional[int]): Bytes to read. Reads all bytes \
+                if None or negative. Defaults to -1.
+
+        Returns:
+            bytes: Read bytes. Less than `size` only at the end of stream.
+        """
+        if size is None or size < 0:
+            return b''.join(self.as_iterator())
+
+        self._fill(size)
+        return self._take(size)
+
+    def readable(self) -> Literal[True]:
+        """Define that stream is readable.
+
+        Returns:
+            bool: Always True
+        """
+        return True
+
+    def as_iterator(self) -> Iterator[bytes]:
+        """Get iterator of bytes, which are not read yet.
+
+        Yields:
+            bytes: Bytes chunk
+        """
+        chunks = self._chunks
+        self._chunks = []
+        self._buffered = 0
+        yield from map(bytes, chunks)
+        yield from self._iterator
+
+    def spool(self, max_size: int = SPOOL_MAX_SIZE) -> IO[bytes]:
+        """Read rest of stream to temporary file.
+
+        File is kept in memory until its size exceeds `max_size`
+        and is moved to disk after that.
+
+        Args:
+            max_size (int): Max size of file kept in memory. \
+                Defaults to SPOOL_MAX_SIZE.
+
+        Returns:
+            IO[bytes]: Temporary file at start position.
+        """
+        spooled_file: IO[bytes] = SpooledTemporaryFile(max_size=max_size)
+        for chunk in self.as_iterator():
+            spooled_file.write(chunk)
+
+        spooled_file.seek(0)
+        return spooled_file
+
+    def _fill(self, size: int) -> None:
+        """Buffer chunks until buffer has `size` bytes or stream is over.
+
+        Args:
+            size (int): Required buffer size.
+        """
+        while self._buffered < size:
+            chunk = next(self._iterator, None)
+            if chunk is None:
+                return
+
+            self._chunks.append(chunk)
+            self._buffered += len(chunk)
+
+    def _take(self, size: int) -> bytes:
+        """Take bytes from buffer.
+
+        Args:
+            size (int): Bytes to take.
+
+        Returns:
+            bytes: Taken bytes. Less than `size` if buffer is smaller.
+        """
+        chunks = self._chunks
+        excess = self._buffered - size
+        self._chunks = []
+        if excess > 0:
+            # Buffer is filled just up to size, so excess is in last chunk
+            last_chunk = memoryview(chunks[-1])
+            chunks[-1] = last_chunk[:-excess]
+            self._chunks.append(last_chunk[-excess:])
+
+        self._buffered = max(excess, 0)
+        return b''.join(chunks)
+
+
+class FileTooLargeError(Exception):
+    """File exceeds size limit."""
+
+
+class HashingReader(BufferedIOBase):
+    """Reader, that hashes file data while it is read.
+
+    Used to upload file to Drive and get its SHA-256 in single pass.
+    Size of file is checked on every read, so upload of too large file
+    is stopped without reading it to the end.
+    """
+
+    def __init__(self, file_object: IO[bytes], max_size: int) -> None:
+        """Initialize reader.
+
+        Args:
+            file_object (IO[bytes]): File at start position.
+            max_size (int): Max file size in bytes.
+        """
+        self.max_size = max_size
+        self.size = 0
+        self._file_object = file_object
+        self._hash = sha256()
+
+    @property
+    def file_hash(self) -> str:
+        """Get SHA-256 of data read so far.
+
+        Returns:
+            str: Hex digest.
+        """
+        return self._hash.hexdigest()
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        """Read bytes from file.
+
+        Args:
+            size (Optional[int]): Bytes to read. Reads all bytes \
+                if None or negative. Defaults to -1.
+
+        Raises:
+            FileTooLargeError: If file size exceeds limit.
+
+        Returns:
+            bytes: Read bytes.
+        """
+        chunk = self._file_object.read(-1 if size is None else size)
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            raise FileTooLargeError()
+
+        self._hash.update(chunk)
+        return chunk
+
+    def readable(self) -> Literal[True]:
+        """Define that stream is readable.
+
+        Returns:
+            bool: Always True
+        """
+        return True
+
+
+def get_file_size(file_data: FileData) -> int:
+    """Get size of file data or seekable file.
+
+    File is rewound to start position.
+
+    Args:
+        file_data (FileData): File data or file at start position.
+
+    Returns:
+        int: File size in bytes.
+    """
+    if isinstance(file_data, bytes):
+        return len(file_data)
+
+    file_size = file_data.seek(0, os.SEEK_END)
+    file_data.seek(0)
+    return file_size
+
+
+async def iterate_file(
+    file_object: Any,
+    chunk_size: int = CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """Read file or Drive stream body by chunks.
+
+    File is read in threads to not block event loop
+    and closed when iteration is finished.
+
+    Args:
+        file_object (Any): Readable file object or Drive streaming body.
+        chunk_size (int): Max chunk size. Defaults to CHUNK_SIZE.
+
+    Yields:
+        bytes: File data chunk.
+    """
+    with closing(file_object):
+        chunk = await asyncio.to_thread(file_object.read, chunk_size)
+        while chunk:
+            yield chunk
+            chunk = await asyncio.to_thread(file_object.read, chunk_size)
+
+
+class WriteBuffer(RawIOBase):
+    """Unseekable writer, that keeps written bytes until they are taken.
+
+    Used to stream files, which are written by libraries expecting file.
+    """
+
+    def __init__(self) -> None:
+        """Initialize buffer."""
+        self._chunks: list[bytes] = []
+
+    def write(self, chunk: Any) -> int:
+        """Write bytes to buffer.
+
+        Args:
+            chunk (Any): Bytes-like object.
+
+        Returns:
+            int: Number of written bytes.
+        """
+        self._chunks.append(bytes(chunk))
+        return len(self._chunks[-1])
+
+    def writable(self) -> Literal[True]:
+        """Define that stream is writable.
+
+        Returns:
+            bool: Always True
+        """
+        return True
+
+    def take(self) -> bytes:
+        """Take bytes written since previous call.
+
+        Returns:
+            bytes: Written bytes.
+        """
+        written = b''.join(self._chunks)
+        self._chunks.clear()
+        return written
+
+
+async def iterate_archive(
+    files: AsyncIterator[tuple[str, bytes]],
+) -> AsyncIterator[bytes]:
+    """Write files to ZIP archive as they are produced.
+
+    Archive is written without seeking, so it is streamed to client
+    while files are produced. Files are stored without compression,
+    because docx and PDF files are compressed already.
+
+    Args:
+        files (AsyncIterator[tuple[str, bytes]]): Names and data of files.
+
+    Yields:
+        bytes: Archive data chunk.
+    """
+    write_buffer = WriteBuffer()
+    with ZipFile(write_buffer, 'w', ZIP_STORED) as archive:
+        async for file_name, file_data in files:
+            archive.writestr(file_name, file_data)
+            yield write_buffer.take()
+
+    yield write_buffer.take()
@@ -1,24 +1,27 @@
 """Utilities for users."""
 
+import asyncio
+import logging
 from secrets import choice
 from string import ascii_letters
-from typing import Optional
+from typing import Any, Optional
 
-from deta import Base
 from jose import JWTError
 
-from app.core.auth import (
-    generate_password,
-    get_access_token_payload,
-    get_password_hash,
-)
-from app.core.deta import serialize_model
+from app.core.auth import generate_password, get_access_token_payload
+from app.core.deta import AsyncBase, Storage, serialize_model
 from app.core.pagination import (
     PaginationParams,
     PaginationResponse,
     default_pagination,
 )
-from app.models.user import User, UserRole
+from app.core.passwords import PasswordHasher
+from app.models.user import AuthorizedUser, User, UserRole
+
+logger = logging.getLogger(__name__)
+
+# User fields carried in access token claims
+TOKEN_CLAIMS = ('login', 'name', 'role')
 
 
 def generate_uid() -> str:
@@ -30,17 +33,26 @@ def generate_uid() -> str:
     return ''.join(choice(ascii_letters) for _ in range(8))
 
 
-async def get_authorized_user(token: str) -> Optional[User]:
+async def get_authorized_user(
+    token: str,
+    users_service: 'UsersService',
+) -> Optional[AuthorizedUser]:
     """Get current user from JWT token.
 
+    User data is taken from token claims. Token version is checked against
+    table of actual versions, so storage is requested only for users
+    missing in the table.
+
     Args:
         token (str): JWT token from oauth2 scheme.
+        users_service (UsersService): Users service.
 
     Raises:
         JWTError: If token is invalid
 
     Returns:
-        Optional[User]: User instance if found, None otherwise.
+        Optional[AuthorizedUser]: User instance if token is valid \
+            and not revoked, None otherwise.
     """
     try:
         payload = get_access_token_payload(token)
@@ -49,24 +61,32 @@ async def get_authorized_user(token: str) -> Optional[User]:
         raise exc
 
     uid: Optional[str] = payload.get('sub')
-    if uid is None:
+    token_version: Optional[int] = payload.get('ver')
+    # Tokens issued without claims are not accepted
+    if uid is None or token_version is None:
         return None
 
-    db_user = Base('users').get(uid)
-    if db_user is None:
+    if token_version != await users_service.get_token_version(uid):
         return None
 
-    return User.parse_obj(db_user)
+    return AuthorizedUser(
+        uid=uid,
+        login=payload['login'],
+        name=payload['name'],
+        role=UserRole(payload['role']),
+    )
 
 
-async def get_verified_admin(user: User) -> Optional[User]:
+async def get_verified_admin(
+    user: AuthorizedUser,
+) -> Optional[AuthorizedUser]:
     """Return user, verified to be admin.
 
     Args:
-        user (User): Current user.
+        user (AuthorizedUser): Current user.
 
     Returns:
-        Optional[User]: Admin user if it is admin, None otherwise.
+        Optional[AuthorizedUser]: Admin user if it is admin, None otherwise.
     """
     if user.role not in {UserRole.admin, UserRole.superuser}:
         return None
@@ -82,15 +102,122 @@ class LoginAlreadyExistsError(Exception):
     """Login already exists."""
 
 
+class TokenVersions(object):
+    """In-memory table of actual access token versions of users.
+
+    Table is filled from storage by periodic refresh. Versions changed
+    by this application instance are applied immediately, changes made
+    by other instances are applied with next refresh.
+    """
+
+    def __init__(self, base: AsyncBase) -> None:
+        """Initialize empty table.
+
+        Args:
+            base (AsyncBase): Users base.
+        """
+        self.base = base
+        self._versions: dict[str, int] = {}
+        # Users changed since refresh start. Loaded versions may be outdated.
+        self._changed: set[str] = set()
+
+    def get(self, uid: str) -> Optional[int]:
+        """Get token version of user.
+
+        Args:
+            uid (str): User id.
+
+        Returns:
+            Optional[int]: Token version if user is in table, None otherwise.
+        """
+        return self._versions.get(uid)
+
+    def set(self, uid: str, token_version: int) -> None:
+        """Set token version of user.
+
+        Args:
+            uid (str): User id.
+            token_version (int): Token version.
+        """
+        self._versions[uid] = token_version
+        self._changed.add(uid)
+
+    def remove(self, uid: str) -> None:
+        """Remove user from table.
+
+        Args:
+            uid (str): User id.
+        """
+        self._versions.pop(uid, None)
+        self._changed.add(uid)
+
+    async def refresh(self) -> None:
+        """Load actual token versions of all users from storage."""
+        self._changed.clear()
+        versions = await self._fetch_versions()
+        # Versions changed during fetch are newer than loaded ones
+        for uid in self._changed:
+            token_version = self._versions.get(uid)
+            if token_version is None:
+                versions.pop(uid, None)
+            else:
+                versions[uid] = token_version
+
+        self._versions = versions
+
+    async def run_refresh(self, interval: float) -> None:
+        """Refresh table periodically until cancelled.
+
+        Args:
+            interval (float): Refresh interval in seconds.
+        """
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception('Token versions refresh failed')
+
+            await asyncio.sleep(interval)
+
+    async def _fetch_versions(self) -> dict[str, int]:
+        """Fetch token versions of all users.
+
+        Returns:
+            dict[str, int]: Token versions by user ids.
+        """
+        versions: dict[str, int] = {}
+        last: Optional[str] = None
+        while True:
+            response = await self.base.fetch(last=last)
+            for db_user in response.items:
+                user = User.parse_obj(db_user)
+                versions[user.uid] = user.token_version
+
+            last = response.last
+            if last is None:
+                return versions
+
+
 class UsersService(object):
     """Users service.
 
     Provides methods for users management.
     """
 
-    def __init__(self) -> None:
-        """Initialize users service."""
-        self.base = Base('users')
+    def __init__(
+        self,
+        storage: Storage,
+        password_hasher: PasswordHasher,
+    ) -> None:
+        """Initialize users service.
+
+        Args:
+            storage (Storage): Deta storage.
+            password_hasher (PasswordHasher): Password hasher.
+        """
+        self.base = storage.base('users')
+        self.password_hasher = password_hasher
+        self.token_versions = TokenVersions(self.base)
 
     async def get_users(
         self,
@@ -104,7 +231,7 @@ class UsersService(object):
         Returns:
             PaginationResponse[User]: Pagination response.
         """
-        response = self.base.fetch(
+        response = await self.base.fetch(
             limit=pagination.limit,
             last=pagination.last,
         )
@@ -126,7 +253,7 @@ class UsersService(object):
         Returns:
             User: User object if found, None otherwise.
         """
-        db_user = self.base.get(uid)
+        db_user = await self.base.get(uid)
         if db_user is None:
             raise UserNotFoundError()
 
@@ -147,7 +274,7 @@ class UsersService(object):
             tuple[User, str]: Created user and generated password.
         """
         password = generate_password()
-        password_hash = get_password_hash(password)
+        password_hash = await self.password_hasher.hash(password)
         uid = generate_uid()
 
         user = User(
@@ -157,7 +284,8 @@ class UsersService(object):
             password_hash=password_hash,
             role=role,
         )
-        self.base.put(serialize_model(user), uid)
+        await self.base.put(serialize_model(user), uid)
+        self.token_versions.set(uid, user.token_version)
 
         return user, password
 
@@ -170,6 +298,9 @@ class UsersService(object):
     ) -> User:
         """Update user.
 
+        Change of login, name or role revokes user access tokens, since they
+        are carried in token claims.
+
         Args:
             uid (str): User id.
             name (Optional[str], optional): User name. Defaults to None.
@@ -183,12 +314,14 @@ class UsersService(object):
         Returns:
             User: Updated user.
         """
-        db_user = self.base.get(uid)
+        db_user = await self.base.get(uid)
         if db_user is None:
             raise UserNotFoundError()
 
+        claims = [db_user[claim] for claim in TOKEN_CLAIMS]
         db_user['name'] = name or db_user['name']
-        db_user['role'] = role or db_user['role']
+        if role is not None:
+            db_user['role'] = role.value
 
         if login:
             if not await self._check_login(login):
@@ -196,13 +329,20 @@ class UsersService(object):
 
             db_user['login'] = login
 
-        self.base.put(db_user, uid)
+        if claims != [db_user[claim] for claim in TOKEN_CLAIMS]:
+            self._bump_token_version(db_user)
 
-        return User.parse_obj(db_user)
+        await self.base.put(db_user, uid)
+
+        user = User.parse_obj(db_user)
+        self.token_versions.set(uid, user.token_version)
+        return user
 
     async def update_user_password(self, uid: str) -> tuple[User, str]:
         """Update user password.
 
+        Revokes user access tokens.
+
         Args:
             uid (str): User id.
 
@@ -212,15 +352,18 @@ class UsersService(object):
         Returns:
             tuple[User, str]: Updated user and generated password.
         """
-        db_user = self.base.get(uid)
+        db_user = await self.base.get(uid)
         if db_user is None:
             raise UserNotFoundError()
 
         password = generate_password()
-        db_user['password_hash'] = get_password_hash(password)
-        self.base.put(db_user, uid)
+        db_user['password_hash'] = await self.password_hasher.hash(password)
+        self._bump_token_version(db_user)
+        await self.base.put(db_user, uid)
 
-        return User.parse_obj(db_user), password
+        user = User.parse_obj(db_user)
+        self.token_versions.set(uid, user.token_version)
+        return user, password
 
     async def delete_user(self, uid: str) -> User:
         """Delete user.
@@ -234,14 +377,39 @@ class UsersService(object):
         Returns:
             User: Deleted user.
         """
-        db_user = self.base.get(uid)
+        db_user = await self.base.get(uid)
         if db_user is None:
             raise UserNotFoundError()
 
-        self.base.delete(uid)
+        await self.base.delete(uid)
+        self.token_versions.remove(uid)
 
         return User.parse_obj(db_user)
 
+    async def get_token_version(self, uid: str) -> Optional[int]:
+        """Get actual access token version of user.
+
+        Storage is requested only if user is missing in token versions table,
+        e.g. if user is created by other application instance.
+
+        Args:
+            uid (str): User id.
+
+        Returns:
+            Optional[int]: Token version if user exists, None otherwise.
+        """
+        token_version = self.token_versions.get(uid)
+        if token_version is not None:
+            return token_version
+
+        try:
+            user = await self.get_user(uid)
+        except UserNotFoundError:
+            return None
+
+        self.token_versions.set(uid, user.token_version)
+        return user.token_version
+
     async def _check_login(self, login: str) -> bool:
         """Check if login is already taken.
 
@@ -252,5 +420,13 @@ class UsersService(object):
             bool: True if login is already taken, False otherwise.
         """
         # ODetaM queries are not typed properly, so we need to use ignore
-        users_with_same_login = self.base.fetch({'login': login}).items
-        return not bool(users_with_same_login)
+        response = await self.base.fetch({'login': login})
+        return not bool(response.items)
+
+    def _bump_token_version(self, db_user: dict[str, Any]) -> None:
+        """Increment token version of user to revoke its access tokens.
+
+        Args:
+            db_user (dict[str, Any]): User item.
+        """
+        db_user['token_version'] = db_user.get('token_version', 0) + 1
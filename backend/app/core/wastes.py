@@ -4,17 +4,19 @@
 import re
 from typing import Any, Optional
 
-from deta import Base
 from pydantic import BaseModel, validator
 
-from app.core.deta import serialize_model
+from app.core.deta import Storage, serialize_model
 from app.core.models import generate_id
+from app.core.normalization import normalize_fkko_code, normalize_name
 from app.core.pagination import (
     PaginationParams,
     PaginationResponse,
     default_pagination,
+    paginate,
 )
-from app.models.waste import Waste
+from app.core.wastes_index import WastesIndex
+from app.models.waste import FkkoGroup, Waste, WasteSuggestion
 
 FKKO_CODE_PATTERN = re.compile(r'^(\d| )+$')
 
@@ -27,6 +29,42 @@ class BadFKKOCodeError(Exception):
     """Raised when FKKO code is invalid."""
 
 
+def validate_fkko_code(fkko_code: str) -> bool:
+    """Validate FKKO code.
+
+    FKKO code should contain only digits and spaces.
+    See see http://kod-fkko.ru/ for more information.
+
+    Args:
+        fkko_code (str): FKKO code.
+
+    Returns:
+        bool: True if FKKO code is valid.
+    """
+    return FKKO_CODE_PATTERN.match(fkko_code) is not None
+
+
+def normalize_db_waste(db_waste: dict[str, Any]) -> bool:
+    """Recompute search fields of stored waste from its name and code.
+
+    Args:
+        db_waste (dict[str, Any]): Stored waste. Changed in place.
+
+    Returns:
+        bool: True if search fields were changed.
+    """
+    search_fields = {
+        'normalized_name': normalize_name(db_waste['name']),
+        'normalized_fkko_code': normalize_fkko_code(db_waste['fkko_code']),
+    }
+    is_changed = any(
+        db_waste.get(field_name) != field_value
+        for field_name, field_value in search_fields.items()
+    )
+    db_waste.update(search_fields)
+    return is_changed
+
+
 class WastesFilter(BaseModel):
     """Wastes filter."""
 
@@ -38,6 +76,10 @@ class WastesFilter(BaseModel):
 
     fkko_code_prefix: Optional[str] = None
 
+    # Match names similar to `name_contains`, tolerating typos.
+    # Works once wastes index is loaded, exact match is used before.
+    fuzzy: bool = False
+
     @validator('name', 'name_contains')
     @classmethod
     def validate_name(cls, name: Optional[str]) -> Optional[str]:
@@ -52,7 +94,7 @@ class WastesFilter(BaseModel):
         if name is None:
             return name
 
-        return Waste.normalize_name(name)
+        return normalize_name(name)
 
     @validator('fkko_code', 'fkko_code_prefix')
     @classmethod
@@ -68,7 +110,18 @@ class WastesFilter(BaseModel):
         if fkko_code is None:
             return fkko_code
 
-        return Waste.normalize_fkko_code(fkko_code)
+        return normalize_fkko_code(fkko_code)
+
+    @property
+    def is_search(self) -> bool:
+        """Check if filter has conditions, which Deta evaluates by scan.
+
+        Returns:
+            bool: True if filter has name substring or FKKO code prefix.
+        """
+        return self.name_contains is not None or (
+            self.fkko_code_prefix is not None
+        )
 
     def as_query(self) -> dict[str, Any]:
         """Transform filter to Deta query.
@@ -88,6 +141,26 @@ class WastesFilter(BaseModel):
             if value is not None
         }
 
+    def matches(self, waste: Waste) -> bool:
+        """Check waste against filter, as Deta query does.
+
+        Args:
+            waste (Waste): Waste.
+
+        Returns:
+            bool: True if waste matches all conditions of filter.
+        """
+        # Empty substring and prefix match any waste.
+        # Similar names are found by wastes index.
+        name_contains = '' if self.fuzzy else self.name_contains or ''
+        fkko_code_prefix = self.fkko_code_prefix or ''
+        return all((
+            self.name in {None, waste.normalized_name},
+            name_contains in waste.normalized_name,
+            self.fkko_code in {None, waste.normalized_fkko_code},
+            waste.normalized_fkko_code.startswith(fkko_code_prefix),
+        ))
+
 
 class WastesService(object):
     """Wastes service.
@@ -95,9 +168,16 @@ class WastesService(object):
     Provides CRUD operations for wastes.
     """
 
-    def __init__(self) -> None:
-        """Initialize service."""
-        self.base = Base('wastes')
+    def __init__(self, storage: Storage, suggestions_cache_size: int) -> None:
+        """Initialize service.
+
+        Args:
+            storage (Storage): Deta storage.
+            suggestions_cache_size (int): Max number of cached suggestions \
+                of recent queries. Cache is disabled if zero.
+        """
+        self.base = storage.base('wastes')
+        self.index = WastesIndex(self.base, suggestions_cache_size)
 
     async def get_wastes(
         self,
@@ -106,6 +186,11 @@ class WastesService(object):
     ) -> PaginationResponse[Waste]:
         """Get all wastes.
 
+        Search by name substring and FKKO code prefix is served
+        by wastes index once it is loaded, other queries are sent to Deta.
+        Fuzzy search results are ordered by similarity, so only first
+        page is returned.
+
         Args:
             pagination (PaginationParams): Pagination params.
             wastes_filter (Optional[WastesFilter]): Wastes filter.
@@ -113,8 +198,23 @@ class WastesService(object):
         Returns:
             PaginationResponse[Waste]: Pagination response.
         """
+        if wastes_filter and wastes_filter.is_search and self.index.loaded:
+            candidates = self.index.search(
+                name_contains=wastes_filter.name_contains,
+                fkko_code_prefix=wastes_filter.fkko_code_prefix,
+                fuzzy=wastes_filter.fuzzy,
+            )
+            wastes = [
+                waste for waste in candidates if wastes_filter.matches(waste)
+            ]
+            if wastes_filter.fuzzy:
+                return PaginationResponse(items=wastes[:pagination.limit])
+
+            waste_ids = [waste.waste_id for waste in wastes]
+            return paginate(wastes, waste_ids, pagination)
+
         query = wastes_filter.as_query() if wastes_filter else None
-        response = self.base.fetch(
+        response = await self.base.fetch(
             query=query,
             limit=pagination.limit,
             last=pagination.last,
@@ -125,6 +225,75 @@ class WastesService(object):
             last=response.last,
         )
 
+    async def get_fkko_groups(
+        self,
+        fkko_code_prefix: str = '',
+    ) -> list[FkkoGroup]:
+        """Get groups of next FKKO hierarchy level under code prefix.
+
+        Groups are counted by wastes index. Until index is loaded,
+        wastes under prefix are fetched from Deta.
+
+        Args:
+            fkko_code_prefix (str): FKKO code prefix. Empty for top level.
+
+        Raises:
+            BadFKKOCodeError: Raised when the FKKO code prefix is invalid.
+
+        Returns:
+            list[FkkoGroup]: Groups in order of codes.
+        """
+        if fkko_code_prefix and not validate_fkko_code(fkko_code_prefix):
+            raise BadFKKOCodeError()
+
+        prefix = normalize_fkko_code(fkko_code_prefix)
+        index = self.index
+        if not index.loaded:
+            index = await self._load_index(
+                WastesFilter(fkko_code_prefix=prefix),
+            )
+
+        return index.fkko_codes.get_groups(prefix)
+
+    async def suggest_wastes(
+        self,
+        query: str,
+        limit: int,
+    ) -> list[WasteSuggestion]:
+        """Suggest wastes for typed name or FKKO code.
+
+        Query of digits and spaces is treated as FKKO code prefix,
+        other queries are matched against names. Suggestions are ranked
+        by wastes index. Until index is loaded, wastes matching query
+        are fetched from Deta.
+
+        Args:
+            query (str): Typed name or FKKO code.
+            limit (int): Max number of suggestions.
+
+        Returns:
+            list[WasteSuggestion]: Suggested wastes, best first.
+        """
+        by_fkko_code = validate_fkko_code(query)
+        if by_fkko_code:
+            query = normalize_fkko_code(query)
+            wastes_filter = WastesFilter(fkko_code_prefix=query)
+        else:
+            query = normalize_name(query)
+            wastes_filter = WastesFilter(name_contains=query)
+
+        if not query:
+            return []
+
+        index = self.index
+        if not index.loaded:
+            index = await self._load_index(wastes_filter)
+
+        return [
+            WasteSuggestion.parse_obj(waste.dict())
+            for waste in index.suggest(query, limit, by_fkko_code)
+        ]
+
     async def get_waste(self, waste_id: str) -> Waste:
         """Get waste by id.
 
@@ -137,7 +306,7 @@ class WastesService(object):
         Returns:
             Waste: Waste object if found, None otherwise.
         """
-        db_waste = self.base.get(waste_id)
+        db_waste = await self.base.get(waste_id)
         if db_waste is None:
             raise WasteNotFoundError()
 
@@ -160,18 +329,19 @@ class WastesService(object):
         Returns:
             Waste: Created waste.
         """
-        if not self._validate_fkko_code(fkko_code):
+        if not validate_fkko_code(fkko_code):
             raise BadFKKOCodeError()
 
         waste_id = generate_id()
         waste = Waste(
             waste_id=waste_id,
             name=name,
-            normalized_name=Waste.normalize_name(name),
+            normalized_name=normalize_name(name),
             fkko_code=fkko_code,
-            normalized_fkko_code=Waste.normalize_fkko_code(fkko_code),
+            normalized_fkko_code=normalize_fkko_code(fkko_code),
         )
-        self.base.put(serialize_model(waste), waste_id)
+        await self.base.put(serialize_model(waste), waste_id)
+        self.index.add(waste)
 
         return waste
 
@@ -195,20 +365,23 @@ class WastesService(object):
         Returns:
             Waste: Updated waste.
         """
-        db_waste = self.base.get(waste_id)
+        db_waste = await self.base.get(waste_id)
         if db_waste is None:
             raise WasteNotFoundError()
 
         db_waste['name'] = name or db_waste['name']
 
         if fkko_code:
-            if not self._validate_fkko_code(fkko_code):
+            if not validate_fkko_code(fkko_code):
                 raise BadFKKOCodeError()
 
             db_waste['fkko_code'] = fkko_code
 
-        self.base.put(db_waste, waste_id)
-        return Waste.parse_obj(db_waste)
+        normalize_db_waste(db_waste)
+        await self.base.put(db_waste, waste_id)
+        waste = Waste.parse_obj(db_waste)
+        self.index.add(waste)
+        return waste
 
     async def delete_waste(self, waste_id: str) -> Waste:
         """Delete waste.
@@ -222,24 +395,47 @@ class WastesService(object):
         Returns:
             Waste: Deleted waste.
         """
-        db_waste = self.base.get(waste_id)
+        db_waste = await self.base.get(waste_id)
         if db_waste is None:
             raise WasteNotFoundError()
 
-        self.base.delete(waste_id)
+        await self.base.delete(waste_id)
+        self.index.remove(waste_id)
 
         return Waste.parse_obj(db_waste)
 
-    def _validate_fkko_code(self, fkko_code: str) -> bool:
-        """Validate FKKO code.
+    async def reindex_wastes(self) -> int:
+        """Recompute search fields of all stored wastes.
 
-        FKKO code should contain only digits and spaces.
-        See see http://kod-fkko.ru/ for more information.
+        Used after change of normalization rules. Wastes index is
+        rebuilt afterwards.
+
+        Returns:
+            int: Number of updated wastes.
+        """
+        updated_count = await self.base.update_all(normalize_db_waste)
+        await self.index.refresh()
+        return updated_count
+
+    async def _load_index(self, wastes_filter: WastesFilter) -> WastesIndex:
+        """Fetch wastes matching filter from Deta to temporary index.
 
         Args:
-            fkko_code (str): FKKO code.
+            wastes_filter (WastesFilter): Wastes filter.
 
         Returns:
-            bool: True if FKKO code is valid.
+            WastesIndex: Index of matching wastes.
         """
-        return FKKO_CODE_PATTERN.match(fkko_code) is not None
+        index = WastesIndex(self.base)
+        last: Optional[str] = None
+        while True:
+            response = await self.base.fetch(
+                query=wastes_filter.as_query(),
+                last=last,
+            )
+            for db_waste in response.items:
+                index.add(Waste.parse_obj(db_waste))
+
+            last = response.last
+            if last is None:
+                return index
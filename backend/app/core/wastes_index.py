@@ -0,0 +1,357 @@
+"""In-memory search index of wastes.
+
+Deta Base evaluates `contains` and `prefix` queries by scan of whole Base,
+so search of wastes by name substring and FKKO code prefix and typeahead
+suggestions are served by in-process index.
+
+Names are indexed by `app.core.names_index.NamesIndex`. FKKO codes are
+kept in sorted array, so codes with prefix are found by binary search
+as contiguous range.
+
+Index is rebuilt aside while current one serves requests, and arrays
+of all wastes are sorted once instead of insertion of wastes one by one.
+"""
+
+import asyncio
+import logging
+from bisect import bisect_left, insort
+from typing import Iterable, Optional
+
+from app.core.deta import AsyncBase
+from app.core.names_index import MAX_CHAR, NamesIndex, build_names_index
+from app.models.waste import FkkoGroup, Waste
+
+logger = logging.getLogger(__name__)
+
+# Prefix lengths of FKKO hierarchy levels, as code is printed:
+# block, type, subtype, group, aggregate state, hazard class.
+# For example, 4 05 122 02 60 5.
+FKKO_LEVELS = (1, 3, 6, 8, 10, 11)
+
+
+class FkkoCodesIndex(object):
+    """Sorted array of normalized FKKO codes."""
+
+    def __init__(self, wastes: Iterable[Waste] = ()) -> None:
+        """Initialize index.
+
+        Args:
+            wastes (Iterable[Waste]): Wastes to index. Defaults to none.
+        """
+        # Pairs of code and waste id in ascending order
+        self._entries: list[tuple[str, str]] = sorted(
+            (waste.normalized_fkko_code, waste.waste_id) for waste in wastes
+        )
+
+    def insert(self, waste: Waste) -> None:
+        """Insert FKKO code of waste.
+
+        Args:
+            waste (Waste): Waste.
+        """
+        insort(self._entries, (waste.normalized_fkko_code, waste.waste_id))
+
+    def discard(self, waste: Waste) -> None:
+        """Remove FKKO code of waste.
+
+        Args:
+            waste (Waste): Indexed waste.
+        """
+        entry = (waste.normalized_fkko_code, waste.waste_id)
+        self._entries.pop(bisect_left(self._entries, entry))
+
+    def find(self, prefix: str) -> set[str]:
+        """Find wastes, which codes start with prefix.
+
+        Args:
+            prefix (str): Normalized code prefix.
+
+        Returns:
+            set[str]: Ids of wastes.
+        """
+        first, end = self._get_range(prefix)
+        return {waste_id for _, waste_id in self._entries[first:end]}
+
+    def suggest(self, prefix: str, limit: int) -> list[str]:
+        """Get first wastes, which codes start with prefix.
+
+        Args:
+            prefix (str): Normalized code prefix.
+            limit (int): Max number of suggestions.
+
+        Returns:
+            list[str]: Ids of wastes in order of codes.
+        """
+        first, end = self._get_range(prefix)
+        end = min(end, first + limit)
+        return [waste_id for _, waste_id in self._entries[first:end]]
+
+    def get_groups(self, prefix: str) -> list[FkkoGroup]:
+        """Get groups of next hierarchy level under prefix.
+
+        Groups are found by binary search of their ends, so time
+        depends on number of groups, not number of codes.
+
+        Args:
+            prefix (str): Normalized code prefix. Empty for top level.
+
+        Returns:
+            list[FkkoGroup]: Groups in order of codes. Empty if prefix \
+                is full code.
+        """
+        group_length = next(
+            (length for length in FKKO_LEVELS if length > len(prefix)),
+            None,
+        )
+        if group_length is None:
+            return []
+
+        group_start, end = self._get_range(prefix)
+        groups = []
+        while group_start < end:
+            group = self._get_group(group_start, group_length)
+            groups.append(group)
+            group_start += group.wastes_count
+
+        return groups
+
+    def _get_range(self, prefix: str) -> tuple[int, int]:
+        """Get range of entries, which codes start with prefix.
+
+        Args:
+            prefix (str): Normalized code prefix.
+
+        Returns:
+            tuple[int, int]: Start and end of range.
+        """
+        return (
+            bisect_left(self._entries, (prefix,)),
+            bisect_left(self._entries, (prefix + MAX_CHAR,)),
+        )
+
+    def _get_group(self, group_start: int, group_length: int) -> FkkoGroup:
+        """Get group, which starts at entry.
+
+        Args:
+            group_start (int): Index of first entry of group.
+            group_length (int): Prefix length of group level.
+
+        Returns:
+            FkkoGroup: Group.
+        """
+        group_prefix = self._entries[group_start][0][:group_length]
+        group_end = self._get_range(group_prefix)[1]
+        return FkkoGroup(
+            fkko_code_prefix=group_prefix,
+            wastes_count=group_end - group_start,
+        )
+
+
+class WastesIndex(object):
+    """Search index of wastes by names and FKKO codes.
+
+    Index is filled from storage by periodic refresh. Wastes changed
+    by this application instance are applied immediately, changes made
+    by other instances are applied with next refresh, as in
+    `app.core.users.TokenVersions`.
+    """
+
+    def __init__(
+        self,
+        base: AsyncBase,
+        suggestions_cache_size: int = 0,
+    ) -> None:
+        """Initialize empty index.
+
+        Args:
+            base (AsyncBase): Wastes base.
+            suggestions_cache_size (int): Max number of cached suggestions \
+                of recent queries. Cache is disabled if zero.
+        """
+        self.base = base
+        self.suggestions_cache_size = suggestions_cache_size
+        # Index is used only after first refresh
+        self.loaded = False
+        self.names = NamesIndex(suggestions_cache_size)
+        self.fkko_codes = FkkoCodesIndex()
+        self._wastes: dict[str, Waste] = {}
+        # Wastes ids in order of Base keys
+        self._waste_ids: list[str] = []
+        # Wastes changed since refresh start. Loaded wastes may be outdated.
+        self._changed: set[str] = set()
+
+    def add(self, waste: Waste) -> None:
+        """Add created or updated waste to index.
+
+        Args:
+            waste (Waste): Waste.
+        """
+        self._discard(waste.waste_id)
+        self._insert(waste)
+        self._changed.add(waste.waste_id)
+
+    def remove(self, waste_id: str) -> None:
+        """Remove deleted waste from index.
+
+        Args:
+            waste_id (str): Waste id.
+        """
+        self._discard(waste_id)
+        self._changed.add(waste_id)
+
+    def search(
+        self,
+        name_contains: Optional[str] = None,
+        fkko_code_prefix: Optional[str] = None,
+        fuzzy: bool = False,
+    ) -> list[Waste]:
+        """Find candidates for name substring and FKKO code prefix.
+
+        Candidates must be checked against substring, see
+        `app.core.wastes.WastesFilter.matches`.
+
+        Args:
+            name_contains (Optional[str]): Normalized substring of name. \
+                Not used if None.
+            fkko_code_prefix (Optional[str]): Normalized code prefix. \
+                Not used if None.
+            fuzzy (bool): Whether to find names similar to substring \
+                instead of names containing it.
+
+        Returns:
+            list[Waste]: Candidates in order of Base keys. In order \
+                of similarity, most similar first, if search is fuzzy.
+        """
+        found: list[set[str]] = []
+        similar_ids: list[str] = []
+        if fuzzy and name_contains:
+            similar_ids = self.names.find_similar(name_contains)
+            found.append(set(similar_ids))
+        else:
+            name_candidates = self.names.find(name_contains or '')
+            if name_candidates is not None:
+                found.append(name_candidates)
+
+        if fkko_code_prefix:
+            found.append(self.fkko_codes.find(fkko_code_prefix))
+
+        if not found:
+            return [self._wastes[waste_id] for waste_id in self._waste_ids]
+
+        candidates = set.intersection(*found)
+        return [
+            self._wastes[waste_id]
+            for waste_id in similar_ids or sorted(candidates)
+            if waste_id in candidates
+        ]
+
+    def suggest(
+        self,
+        query: str,
+        limit: int,
+        by_fkko_code: bool = False,
+    ) -> list[Waste]:
+        """Get wastes, which match typed query best.
+
+        Args:
+            query (str): Normalized name or FKKO code prefix.
+            limit (int): Max number of suggestions.
+            by_fkko_code (bool): Whether query is FKKO code prefix. \
+                Wastes are suggested in order of codes then.
+
+        Returns:
+            list[Waste]: Suggested wastes, best first.
+        """
+        if by_fkko_code:
+            waste_ids = self.fkko_codes.suggest(query, limit)
+        else:
+            waste_ids = self.names.suggest(query, limit)
+
+        return [self._wastes[waste_id] for waste_id in waste_ids]
+
+    async def refresh(self) -> None:
+        """Load all wastes from storage and rebuild index.
+
+        New index replaces current one at once, after it is built.
+        Wastes changed during fetch and build are newer than loaded
+        ones, so they are taken from current index.
+        """
+        self._changed.clear()
+        wastes = await self._fetch_wastes()
+        names = await build_names_index(
+            {
+                waste_id: waste.normalized_name
+                for waste_id, waste in wastes.items()
+            },
+            self.suggestions_cache_size,
+        )
+        changed = {
+            waste_id: self._wastes.get(waste_id) for waste_id in self._changed
+        }
+        self.names = names
+        self.fkko_codes = FkkoCodesIndex(wastes.values())
+        self._wastes = wastes
+        self._waste_ids = sorted(wastes)
+        for waste_id, waste in changed.items():
+            self._discard(waste_id)
+            if waste is not None:
+                self._insert(waste)
+
+        self.loaded = True
+
+    async def run_refresh(self, interval: float) -> None:
+        """Refresh index periodically until cancelled.
+
+        Args:
+            interval (float): Refresh interval in seconds.
+        """
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception('Wastes index refresh failed')
+
+            await asyncio.sleep(interval)
+
+    async def _fetch_wastes(self) -> dict[str, Waste]:
+        """Fetch all wastes.
+
+        Returns:
+            dict[str, Waste]: Wastes by ids.
+        """
+        wastes: dict[str, Waste] = {}
+        last: Optional[str] = None
+        while True:
+            response = await self.base.fetch(last=last)
+            for db_waste in response.items:
+                waste = Waste.parse_obj(db_waste)
+                wastes[waste.waste_id] = waste
+
+            last = response.last
+            if last is None:
+                return wastes
+
+    def _insert(self, waste: Waste) -> None:
+        """Insert waste, which is not in index.
+
+        Args:
+            waste (Waste): Waste.
+        """
+        self._wastes[waste.waste_id] = waste
+        insort(self._waste_ids, waste.waste_id)
+        self.names.insert(waste.waste_id, waste.normalized_name)
+        self.fkko_codes.insert(waste)
+
+    def _discard(self, waste_id: str) -> None:
+        """Remove waste from index if it is there.
+
+        Args:
+            waste_id (str): Waste id.
+        """
+        waste = self._wastes.pop(waste_id, None)
+        if waste is None:
+            return
+
+        self._waste_ids.pop(bisect_left(self._waste_ids, waste_id))
+        self.names.discard(waste_id)
+        self.fkko_codes.discard(waste)
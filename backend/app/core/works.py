@@ -2,23 +2,39 @@
 
 from typing import Any, Optional
 
-from deta import Base
 from pydantic import BaseModel, validator
 
-from app.core.deta import serialize_model
+from app.core.deta import Storage, serialize_model
 from app.core.models import generate_id
+from app.core.normalization import normalize_name
 from app.core.pagination import (
     PaginationParams,
     PaginationResponse,
     default_pagination,
 )
-from app.models.work import Work
+from app.core.works_index import WorksIndex
+from app.models.work import Work, WorkSuggestion
 
 
 class WorkNotFoundError(Exception):
     """Raised when work not found."""
 
 
+def normalize_db_work(db_work: dict[str, Any]) -> bool:
+    """Recompute search fields of stored work from its name.
+
+    Args:
+        db_work (dict[str, Any]): Stored work. Changed in place.
+
+    Returns:
+        bool: True if search fields were changed.
+    """
+    normalized_name = normalize_name(db_work['name'])
+    is_changed = db_work.get('normalized_name') != normalized_name
+    db_work['normalized_name'] = normalized_name
+    return is_changed
+
+
 class WorksFilter(BaseModel):
     """Works filter."""
 
@@ -26,6 +42,10 @@ class WorksFilter(BaseModel):
 
     name_contains: Optional[str] = None
 
+    # Match names similar to `name_contains`, tolerating typos.
+    # Works once works index is loaded, exact match is used before.
+    fuzzy: bool = False
+
     @validator('name', 'name_contains')
     @classmethod
     def validate_name(cls, name: Optional[str]) -> Optional[str]:
@@ -40,7 +60,16 @@ class WorksFilter(BaseModel):
         if name is None:
             return name
 
-        return Work.normalize_name(name)
+        return normalize_name(name)
+
+    @property
+    def is_fuzzy(self) -> bool:
+        """Check if filter has name, which must be matched by similarity.
+
+        Returns:
+            bool: True if filter is fuzzy and has name substring.
+        """
+        return self.fuzzy and self.name_contains is not None
 
     def as_query(self) -> dict[str, Any]:
         """Transform filter to Deta query.
@@ -58,6 +87,23 @@ class WorksFilter(BaseModel):
             if value is not None
         }
 
+    def matches(self, work: Work) -> bool:
+        """Check work against filter, as Deta query does.
+
+        Args:
+            work (Work): Work.
+
+        Returns:
+            bool: True if work matches all conditions of filter.
+        """
+        # Empty substring matches any work.
+        # Similar names are found by works index.
+        name_contains = '' if self.fuzzy else self.name_contains or ''
+        return all((
+            self.name in {None, work.normalized_name},
+            name_contains in work.normalized_name,
+        ))
+
 
 class WorksService(object):
     """Works service.
@@ -65,9 +111,16 @@ class WorksService(object):
     Provides CRUD operations for works.
     """
 
-    def __init__(self) -> None:
-        """Initialize service."""
-        self.base = Base('works')
+    def __init__(self, storage: Storage, suggestions_cache_size: int) -> None:
+        """Initialize service.
+
+        Args:
+            storage (Storage): Deta storage.
+            suggestions_cache_size (int): Max number of cached suggestions \
+                of recent queries. Cache is disabled if zero.
+        """
+        self.base = storage.base('works')
+        self.index = WorksIndex(self.base, suggestions_cache_size)
 
     async def get_works(
         self,
@@ -76,6 +129,10 @@ class WorksService(object):
     ) -> PaginationResponse[Work]:
         """Get all works.
 
+        Fuzzy search is served by works index once it is loaded.
+        Its results are ordered by similarity, so only first page
+        is returned.
+
         Args:
             pagination (PaginationParams): Pagination params.
             works_filter (Optional[WorksFilter]): Works filter.
@@ -83,8 +140,17 @@ class WorksService(object):
         Returns:
             PaginationResponse[Work]: Pagination response.
         """
+        if works_filter and works_filter.is_fuzzy and self.index.loaded:
+            similar_works = self.index.find_similar(
+                works_filter.name_contains or '',
+            )
+            works = [
+                work for work in similar_works if works_filter.matches(work)
+            ]
+            return PaginationResponse(items=works[:pagination.limit])
+
         query = works_filter.as_query() if works_filter else None
-        response = self.base.fetch(
+        response = await self.base.fetch(
             query=query,
             limit=pagination.limit,
             last=pagination.last,
@@ -95,6 +161,36 @@ class WorksService(object):
             last=response.last,
         )
 
+    async def suggest_works(
+        self,
+        query: str,
+        limit: int,
+    ) -> list[WorkSuggestion]:
+        """Suggest works for typed name.
+
+        Suggestions are ranked by works index. Until index is loaded,
+        works matching query are fetched from Deta.
+
+        Args:
+            query (str): Typed name.
+            limit (int): Max number of suggestions.
+
+        Returns:
+            list[WorkSuggestion]: Suggested works, best first.
+        """
+        query = normalize_name(query)
+        if not query:
+            return []
+
+        index = self.index
+        if not index.loaded:
+            index = await self._load_index(WorksFilter(name_contains=query))
+
+        return [
+            WorkSuggestion.parse_obj(work.dict())
+            for work in index.suggest(query, limit)
+        ]
+
     async def get_work(self, work_id: str) -> Work:
         """Get work by id.
 
@@ -107,7 +203,7 @@ class WorksService(object):
         Returns:
             Work: Work object if found, None otherwise.
         """
-        db_work = self.base.get(work_id)
+        db_work = await self.base.get(work_id)
         if db_work is None:
             raise WorkNotFoundError()
 
@@ -126,9 +222,10 @@ class WorksService(object):
         work = Work(
             work_id=work_id,
             name=name,
-            normalized_name=Work.normalize_name(name),
+            normalized_name=normalize_name(name),
         )
-        self.base.put(serialize_model(work), work_id)
+        await self.base.put(serialize_model(work), work_id)
+        self.index.add(work)
         return work
 
     async def update_work(
@@ -148,14 +245,16 @@ class WorksService(object):
         Returns:
             Work: Updated work.
         """
-        db_work = self.base.get(work_id)
+        db_work = await self.base.get(work_id)
         if db_work is None:
             raise WorkNotFoundError()
 
         db_work['name'] = name or db_work['name']
-        self.base.put(db_work, work_id)
-
-        return Work.parse_obj(db_work)
+        normalize_db_work(db_work)
+        await self.base.put(db_work, work_id)
+        work = Work.parse_obj(db_work)
+        self.index.add(work)
+        return work
 
     async def delete_work(self, work_id: str) -> Work:
         """Delete work.
@@ -169,9 +268,46 @@ class WorksService(object):
         Returns:
             Work: Deleted work.
         """
-        db_work = self.base.get(work_id)
+        db_work = await self.base.get(work_id)
         if db_work is None:
             raise WorkNotFoundError()
 
-        self.base.delete(work_id)
+        await self.base.delete(work_id)
+        self.index.remove(work_id)
         return Work.parse_obj(db_work)
+
+    async def reindex_works(self) -> int:
+        """Recompute search fields of all stored works.
+
+        Used after change of normalization rules. Works index is
+        rebuilt afterwards.
+
+        Returns:
+            int: Number of updated works.
+        """
+        updated_count = await self.base.update_all(normalize_db_work)
+        await self.index.refresh()
+        return updated_count
+
+    async def _load_index(self, works_filter: WorksFilter) -> WorksIndex:
+        """Fetch works matching filter from Deta to temporary index.
+
+        Args:
+            works_filter (WorksFilter): Works filter.
+
+        Returns:
+            WorksIndex: Index of matching works.
+        """
+        index = WorksIndex(self.base)
+        last: Optional[str] = None
+        while True:
+            response = await self.base.fetch(
+                query=works_filter.as_query(),
+                last=last,
+            )
+            for db_work in response.items:
+                index.add(Work.parse_obj(db_work))
+
+            last = response.last
+            if last is None:
+                return index
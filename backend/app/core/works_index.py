@@ -0,0 +1,167 @@
+"""In-memory search index of works.
+
+Typeahead suggestions and fuzzy search of works are served by in-process
+index of names, see `app.core.names_index.NamesIndex`.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+from app.core.deta import AsyncBase
+from app.core.names_index import NamesIndex, build_names_index
+from app.models.work import Work
+
+logger = logging.getLogger(__name__)
+
+
+class WorksIndex(object):
+    """Search index of works by names.
+
+    Index is filled from storage by periodic refresh and applies changes
+    in the same way as `app.core.wastes_index.WastesIndex`.
+    """
+
+    def __init__(
+        self,
+        base: AsyncBase,
+        suggestions_cache_size: int = 0,
+    ) -> None:
+        """Initialize empty index.
+
+        Args:
+            base (AsyncBase): Works base.
+            suggestions_cache_size (int): Max number of cached suggestions \
+                of recent queries. Cache is disabled if zero.
+        """
+        self.base = base
+        self.suggestions_cache_size = suggestions_cache_size
+        # Index is used only after first refresh
+        self.loaded = False
+        self.names = NamesIndex(suggestions_cache_size)
+        self._works: dict[str, Work] = {}
+        # Works changed since refresh start. Loaded works may be outdated.
+        self._changed: set[str] = set()
+
+    def add(self, work: Work) -> None:
+        """Add created or updated work to index.
+
+        Args:
+            work (Work): Work.
+        """
+        self._discard(work.work_id)
+        self._insert(work)
+        self._changed.add(work.work_id)
+
+    def remove(self, work_id: str) -> None:
+        """Remove deleted work from index.
+
+        Args:
+            work_id (str): Work id.
+        """
+        self._discard(work_id)
+        self._changed.add(work_id)
+
+    def suggest(self, query: str, limit: int) -> list[Work]:
+        """Get works, which match typed query best.
+
+        Args:
+            query (str): Normalized name query.
+            limit (int): Max number of suggestions.
+
+        Returns:
+            list[Work]: Suggested works, best first.
+        """
+        return [
+            self._works[work_id]
+            for work_id in self.names.suggest(query, limit)
+        ]
+
+    def find_similar(self, name: str) -> list[Work]:
+        """Find works, which names are similar to name.
+
+        Args:
+            name (str): Normalized name, may be misspelled.
+
+        Returns:
+            list[Work]: Similar works, most similar first.
+        """
+        return [
+            self._works[work_id]
+            for work_id in self.names.find_similar(name)
+        ]
+
+    async def refresh(self) -> None:
+        """Load all works from storage and rebuild index.
+
+        New index replaces current one at once, after it is built.
+        Works changed during fetch and build are newer than loaded
+        ones, so they are taken from current index.
+        """
+        self._changed.clear()
+        works = await self._fetch_works()
+        names = await build_names_index(
+            {work_id: work.normalized_name for work_id, work in works.items()},
+            self.suggestions_cache_size,
+        )
+        changed = {
+            work_id: self._works.get(work_id) for work_id in self._changed
+        }
+        self.names = names
+        self._works = works
+        for work_id, work in changed.items():
+            self._discard(work_id)
+            if work is not None:
+                self._insert(work)
+
+        self.loaded = True
+
+    async def run_refresh(self, interval: float) -> None:
+        """Refresh index periodically until cancelled.
+
+        Args:
+            interval (float): Refresh interval in seconds.
+        """
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception('Works index refresh failed')
+
+            await asyncio.sleep(interval)
+
+    async def _fetch_works(self) -> dict[str, Work]:
+        """Fetch all works.
+
+        Returns:
+            dict[str, Work]: Works by ids.
+        """
+        works: dict[str, Work] = {}
+        last: Optional[str] = None
+        while True:
+            response = await self.base.fetch(last=last)
+            for db_work in response.items:
+                work = Work.parse_obj(db_work)
+                works[work.work_id] = work
+
+            last = response.last
+            if last is None:
+                return works
+
+    def _insert(self, work: Work) -> None:
+        """Insert work, which is not in index.
+
+        Args:
+            work (Work): Work.
+        """
+        self._works[work.work_id] = work
+        self.names.insert(work.work_id, work.normalized_name)
+
+    def _discard(self, work_id: str) -> None:
+        """Remove work from index if it is there.
+
+        Args:
+            work_id (str): Work id.
+        """
+        if self._works.pop(work_id, None) is not None:
+            self.names.discard(work_id)
@@ -0,0 +1,187 @@
+"""Application lifespan.
+
+Resources living during whole application lifetime are created on startup,
+shared by all requests through `app.state` and closed on shutdown.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator
+
+from fastapi import FastAPI
+
+from app.core import config
+from app.core.agents import AgentsService
+from app.core.auth import AuthService
+from app.core.companies import CompaniesService
+from app.core.deta import Storage
+from app.core.docx import PdfConverter, PSPDFKitConverter
+from app.core.libreoffice import LibreOfficeConverter
+from app.core.offer_tpls import OfferTemplatesService
+from app.core.offers import OffersService
+from app.core.passwords import PasswordHasher
+from app.core.pdf_cache import PdfCache
+from app.core.render import RenderEngine
+from app.core.users import UsersService
+from app.core.wastes import WastesService
+from app.core.works import WorksService
+
+
+def create_pdf_converter() -> PdfConverter:
+    """Create docx to PDF converter selected by `PDF_CONVERTER` setting.
+
+    Raises:
+        ValueError: If converter is unknown.
+
+    Returns:
+        PdfConverter: Converter. Must be started before use.
+    """
+    if config.PDF_CONVERTER == 'pspdfkit':
+        return PSPDFKitConverter(
+            config.PDF_API_KEY,
+            config.PDF_API_CONNECTIONS,
+        )
+
+    if config.PDF_CONVERTER == 'libreoffice':
+        return LibreOfficeConverter(
+            config.LIBREOFFICE_PATH,
+            config.LIBREOFFICE_WORKERS,
+            config.LIBREOFFICE_TIMEOUT,
+            config.LIBREOFFICE_MAX_JOBS,
+        )
+
+    raise ValueError(
+        'Unknown PDF converter: {converter}'.format(
+            converter=config.PDF_CONVERTER,
+        ),
+    )
+
+
+def setup_services(
+    app: FastAPI,
+    storage: Storage,
+    render_engine: RenderEngine,
+    password_hasher: PasswordHasher,
+    pdf_cache: PdfCache,
+) -> None:
+    """Create services shared by all requests.
+
+    Services are stored in `app.state` and provided by API dependencies.
+
+    Args:
+        app (FastAPI): FastAPI application.
+        storage (Storage): Deta storage.
+        render_engine (RenderEngine): Render engine.
+        password_hasher (PasswordHasher): Password hasher.
+        pdf_cache (PdfCache): Cache of converted PDF files.
+    """
+    app.state.storage = storage
+    app.state.render_engine = render_engine
+    app.state.password_hasher = password_hasher
+    app.state.agents_service = AgentsService()
+    app.state.auth_service = AuthService(storage, password_hasher)
+    app.state.companies_service = CompaniesService(storage)
+    app.state.offer_tpls_service = OfferTemplatesService(
+        storage,
+        pdf_cache,
+        render_engine,
+    )
+    app.state.offers_service = OffersService(
+        storage,
+        render_engine,
+        pdf_cache,
+    )
+    app.state.users_service = UsersService(storage, password_hasher)
+    app.state.wastes_service = WastesService(
+        storage,
+        config.SUGGESTIONS_CACHE_SIZE,
+    )
+    app.state.works_service = WorksService(
+        storage,
+        config.SUGGESTIONS_CACHE_SIZE,
+    )
+
+
+async def cancel_task(task: 'asyncio.Task[None]') -> None:
+    """Cancel background task and wait for its completion.
+
+    Args:
+        task (asyncio.Task[None]): Background task.
+    """
+    task.cancel()
+    with suppress(asyncio.CancelledError):
+        await task
+
+
+def start_background_tasks(app: FastAPI) -> list['asyncio.Task[None]']:
+    """Start periodic refreshes of in-memory tables of services.
+
+    Args:
+        app (FastAPI): FastAPI application with services.
+
+    Returns:
+        list[asyncio.Task[None]]: Background tasks. Run until cancelled.
+    """
+    return [
+        asyncio.create_task(
+            app.state.users_service.token_versions.run_refresh(
+                config.TOKEN_VERSIONS_REFRESH_INTERVAL,
+            ),
+        ),
+        asyncio.create_task(
+            app.state.wastes_service.index.run_refresh(
+                config.WASTES_INDEX_REFRESH_INTERVAL,
+            ),
+        ),
+        asyncio.create_task(
+            app.state.works_service.index.run_refresh(
+                config.WORKS_INDEX_REFRESH_INTERVAL,
+            ),
+        ),
+    ]
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Manage resources living during whole application lifetime.
+
+    Storage clients, render workers, password hashing threads and PDF
+    converter are created once on startup and closed on shutdown. Root user
+    is registered on startup. Access token versions and search indexes
+    of wastes and works are refreshed in background.
+
+    Args:
+        app (FastAPI): FastAPI application.
+
+    Yields:
+        None: Control to application until its shutdown.
+    """
+    storage = Storage(
+        cache_size=config.ENTITY_CACHE_SIZE,
+        cache_ttl=config.ENTITY_CACHE_TTL,
+        cache_negative_ttl=config.ENTITY_CACHE_NEGATIVE_TTL,
+    )
+    render_engine = RenderEngine(config.RENDER_WORKERS)
+    password_hasher = PasswordHasher(
+        config.PASSWORD_HASHER_WORKERS,
+        config.BCRYPT_ROUNDS,
+    )
+    pdf_cache = PdfCache(
+        storage,
+        create_pdf_converter(),
+        config.PDF_PRERENDER_JOBS,
+    )
+    await asyncio.gather(render_engine.start(), pdf_cache.start())
+    setup_services(app, storage, render_engine, password_hasher, pdf_cache)
+    await app.state.auth_service.bootstrap_root_user()
+    background_tasks = start_background_tasks(app)
+
+    yield
+
+    await asyncio.gather(*map(cancel_task, background_tasks))
+    await asyncio.gather(
+        render_engine.shutdown(),
+        password_hasher.shutdown(),
+        pdf_cache.close(),
+    )
+    await storage.close()
@@ -9,11 +9,13 @@ from fastapi.routing import APIRoute
 from app.api.routes.agents import router as agents_router
 from app.api.routes.auth import router as auth_router
 from app.api.routes.companies import router as companies_router
+from app.api.routes.metrics import router as metrics_router
 from app.api.routes.offer_tpls import router as offer_tpls_router
 from app.api.routes.offers import router as offers_router
 from app.api.routes.users import router as users_router
 from app.api.routes.wastes import router as wastes_router
 from app.api.routes.works import router as works_router
+from app.lifespan import lifespan
 
 
 def use_route_names_as_operation_ids(app: FastAPI) -> None:
@@ -33,7 +35,7 @@ def use_route_names_as_operation_ids(app: FastAPI) -> None:
             route.operation_id = route.name  # in this case, 'read_items'
 
 
-def setup_routers(app: FastAPI) -> None:
+def setup_routers(app: FastAPI) -> None:  # noqa: WPS213
     """Include application routers.
 
     Args:
@@ -47,6 +49,7 @@ def setup_routers(app: FastAPI) -> None:
     app.include_router(offers_router)
     app.include_router(offer_tpls_router)
     app.include_router(agents_router)
+    app.include_router(metrics_router)
 
 
 def create_app() -> FastAPI:
@@ -58,6 +61,7 @@ def create_app() -> FastAPI:
     app = FastAPI(
         title='Offer Builder',
         root_path='/api',
+        lifespan=lifespan,
     )
     setup_routers(app)
     return app
@@ -2,10 +2,25 @@
 
 
 from datetime import datetime
+from enum import Enum
+from typing import Optional
 
 from pydantic import BaseModel, Field
 
 
+class PdfStatus(Enum):
+    """Offer PDF conversion statuses."""
+
+    # Conversion is running
+    pending = 'pending'
+
+    # PDF is converted and ready for download
+    ready = 'ready'
+
+    # Conversion failed. PDF will be converted again on download.
+    failed = 'failed'
+
+
 class Offer(BaseModel):
     """Offer representation."""
 
@@ -23,3 +38,14 @@ class Offer(BaseModel):
 
     # Last modification time
     modified_at: datetime = Field(default_factory=datetime.now)
+
+    # SHA-256 of offer file. Used as key of converted PDF file.
+    file_hash: Optional[str] = None
+
+    # Size of offer file in bytes. None for offers created
+    # before sizes were stored.
+    file_size: Optional[int] = None
+
+    # Status of PDF conversion. None for offers created before
+    # PDF conversion was started on offer creation.
+    pdf_status: Optional[PdfStatus] = None
@@ -5,6 +5,8 @@ See https://docxtpl.readthedocs.io/en/stable/ for more details.
 """
 
 
+from typing import Optional
+
 from pydantic import BaseModel
 
 
@@ -16,3 +18,13 @@ class OfferTemplate(BaseModel):
 
     # Template name
     name: str
+
+    # SHA-256 of template file. Used as key of converted PDF file.
+    file_hash: Optional[str] = None
+
+    # Size of template file in bytes. None for templates created
+    # before sizes were stored.
+    file_size: Optional[int] = None
+
+    # Context variables required by template. Collected on template upload.
+    variables: Optional[list[str]] = None
@@ -23,8 +23,11 @@ class UserRole(Enum):
     superuser = 'superuser'
 
 
-class User(BaseModel):
-    """User representation in business logic."""
+class AuthorizedUser(BaseModel):
+    """User authorized by access token.
+
+    Contains only user data carried by token claims.
+    """
 
     # User id. Used as key in database
     uid: str
@@ -35,8 +38,16 @@ class User(BaseModel):
     # Full name
     name: str
 
-    # Hashed password. See `app.core.security.get_password_hash`
-    password_hash: str
-
     # User role
     role: UserRole
+
+
+class User(AuthorizedUser):
+    """User representation in business logic."""
+
+    # Hashed password. See `app.core.passwords.PasswordHasher`
+    password_hash: str
+
+    # Version of user access tokens.
+    # Incremented to revoke all tokens issued before.
+    token_version: int = 0
@@ -4,9 +4,6 @@ This model represent type of waste that company can recycle.
 WasteItems are passed into offer table.
 """
 
-import re
-import string
-
 from pydantic import BaseModel
 
 
@@ -28,36 +25,25 @@ class Waste(BaseModel):
     # Waste FKKO code normalized for search
     normalized_fkko_code: str
 
-    @classmethod
-    def normalize_name(cls, name: str) -> str:
-        """Get name normalized for search.
 
-        Remove punctuation and convert to lowercase.
+class FkkoGroup(BaseModel):
+    """Group of wastes at level of FKKO hierarchy."""
+
+    # Normalized FKKO code prefix of group
+    fkko_code_prefix: str
 
-        Args:
-            name (str): Name.
+    # Number of wastes in group
+    wastes_count: int
 
-        Returns:
-            str: Normalized name.
-        """
-        name = re.sub(
-            '[{punctuation}]'.format(punctuation=string.punctuation),
-            ' ',
-            name,
-        )
-        name = re.sub(r'\s+', ' ', name)
-        return name.lower()
 
-    @classmethod
-    def normalize_fkko_code(cls, fkko_code: str) -> str:
-        """Get FKKO code normalized for search.
+class WasteSuggestion(BaseModel):
+    """Waste suggested for typed name or FKKO code."""
 
-        Remove spaces.
+    # Waste id
+    waste_id: str
 
-        Args:
-            fkko_code (str): FKKO code.
+    # Waste name
+    name: str
 
-        Returns:
-            str: Normalized FKKO code.
-        """
-        return fkko_code.replace(' ', '')
+    # Waste FKKO code
+    fkko_code: str
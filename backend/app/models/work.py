@@ -4,9 +4,6 @@ Work represents a work that company provides.
 """
 
 
-import re
-import string
-
 from pydantic import BaseModel
 
 
@@ -22,22 +19,12 @@ class Work(BaseModel):
     # Work name normalized for search
     normalized_name: str
 
-    @classmethod
-    def normalize_name(cls, name: str) -> str:
-        """Get name normalized for search.
-
-        Remove punctuation and convert to lowercase.
-
-        Args:
-            name (str): Name.
-
-        Returns:
-            str: Normalized name.
-        """
-        name = re.sub(
-            '[{punctuation}]'.format(punctuation=string.punctuation),
-            ' ',
-            name,
-        )
-        name = re.sub(r'\s+', ' ', name)
-        return name.lower()
+
+class WorkSuggestion(BaseModel):
+    """Work suggested for typed name."""
+
+    # Work id
+    work_id: str
+
+    # Work name
+    name: str
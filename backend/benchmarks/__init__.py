@@ -0,0 +1 @@
+"""Benchmarks of performance critical code."""
@@ -0,0 +1,91 @@
+"""Benchmark of offers rendering throughput.
+
+Renders batch of offers by render engine with 1 to CPU count workers,
+so scaling of throughput with number of cores is seen.
+
+Run from backend directory with application environment variables set:
+`python -m benchmarks.render`.
+"""
+
+import asyncio
+import os
+from io import BytesIO
+from time import perf_counter
+
+from docx import Document
+
+from app.core.render import RenderEngine
+
+OFFERS_COUNT = 200
+
+ITEMS_COUNT = 50
+
+
+def make_offer_tpl_file() -> bytes:
+    """Make docx template with variables, loop and header.
+
+    Returns:
+        bytes: Offer template file data.
+    """
+    document = Document()
+    document.add_paragraph('Offer for {{ company }}')
+    table = document.add_table(rows=3, cols=2)
+    table.cell(0, 0).text = '{%tr for item in items %}'
+    table.cell(1, 0).text = '{{ item.name }}'
+    table.cell(1, 1).text = '{{ item.price }}'
+    table.cell(2, 0).text = '{%tr endfor %}'
+    header = document.sections[0].header
+    header.paragraphs[0].text = 'Offer {{ number }}'
+    offer_tpl_file = BytesIO()
+    document.save(offer_tpl_file)
+    return offer_tpl_file.getvalue()
+
+
+async def measure(offer_tpl_file: bytes, workers: int) -> float:
+    """Measure rendering throughput of engine.
+
+    Each worker compiles template at its start, before engine is ready,
+    so only rendering is measured.
+
+    Args:
+        offer_tpl_file (bytes): Offer template file data.
+        workers (int): Number of worker processes.
+
+    Returns:
+        float: Rendered offers per second.
+    """
+    contexts = [
+        {
+            'company': 'Company {number}'.format(number=number),
+            'number': number,
+            'items': [
+                {'name': 'Item {index}'.format(index=index), 'price': index}
+                for index in range(ITEMS_COUNT)
+            ],
+        }
+        for number in range(OFFERS_COUNT)
+    ]
+    engine = RenderEngine(workers)
+    await engine.start([offer_tpl_file])
+    started_at = perf_counter()
+    await engine.render_offers(offer_tpl_file, contexts)
+    elapsed = perf_counter() - started_at
+    await engine.shutdown()
+    return OFFERS_COUNT / elapsed
+
+
+async def main() -> None:
+    """Print throughput for each number of workers."""
+    offer_tpl_file = make_offer_tpl_file()
+    for workers in range(1, (os.cpu_count() or 1) + 1):
+        offers_per_second = await measure(offer_tpl_file, workers)
+        print(  # noqa: WPS421
+            '{workers} workers: {rate:.1f} offers/s'.format(
+                workers=workers,
+                rate=offers_per_second,
+            ),
+        )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,161 @@
+"""Benchmark of reading Drive stream bodies.
+
+Compares `ChunkedReader` with previous `BytesIterator` over iterators
+of small and large chunks. Previous reader returned the first block
+on every sized read, so it is measured by reading of whole file only.
+Time and peak memory are measured in separate runs, because tracing
+of allocations slows reading down.
+
+Run from backend directory: `python -m benchmarks.streams`.
+"""
+
+import timeit
+import tracemalloc
+from io import BytesIO
+from typing import Callable, Iterator, Optional
+
+from app.core.streams import CHUNK_SIZE, ChunkedReader
+
+FILE_SIZES_MB = (1, 10, 50)
+
+# Chunk sizes of Drive stream body iterator
+ITERATOR_CHUNK_SIZES = (1024, CHUNK_SIZE)
+
+ROUNDS = 5
+
+MEGABYTE = 1000000
+
+MILLISECONDS = 1000
+
+KILOBYTE = 1024
+
+
+class BytesIterator(BytesIO):
+    """Reader of bytes iterator as it was before `ChunkedReader`."""
+
+    def __init__(self, iterator: Iterator[bytes]) -> None:
+        """Initialize reader.
+
+        Args:
+            iterator (Iterator[bytes]): Bytes iterator
+        """
+        self._iterator = iterator
+        self._buffer = BytesIO()
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        """Read bytes from iterator.
+
+        Args:
+            size (Optional[int]): Bytes to read. Defaults to -1.
+
+        Returns:
+            bytes: Read bytes
+        """
+        if size is None or size < 0:
+            return b''.join(self._iterator)
+
+        while self._buffer.tell() < size:
+            try:
+                self._buffer.write(next(self._iterator))
+            except StopIteration:
+                break
+
+        self._buffer.seek(0)
+        return self._buffer.read(size)
+
+
+ReaderClass = Callable[[Iterator[bytes]], BytesIO]
+
+
+def read_whole(reader_class: ReaderClass, chunks: list[bytes]) -> None:
+    """Read whole file at once.
+
+    Args:
+        reader_class (ReaderClass): Reader class.
+        chunks (list[bytes]): Chunks of file data.
+    """
+    reader_class(iter(chunks)).read()
+
+
+def read_blocks(reader_class: ReaderClass, chunks: list[bytes]) -> None:
+    """Read file by blocks of `CHUNK_SIZE` bytes.
+
+    Args:
+        reader_class (ReaderClass): Reader class.
+        chunks (list[bytes]): Chunks of file data.
+    """
+    reader = reader_class(iter(chunks))
+    block = reader.read(CHUNK_SIZE)
+    while block:
+        block = reader.read(CHUNK_SIZE)
+
+
+CASES = (
+    ('BytesIterator.read()', BytesIterator, read_whole),
+    ('ChunkedReader.read()', ChunkedReader, read_whole),
+    ('ChunkedReader.read(CHUNK_SIZE)', ChunkedReader, read_blocks),
+)
+
+
+def measure(
+    read: Callable[[ReaderClass, list[bytes]], None],
+    reader_class: ReaderClass,
+    chunks: list[bytes],
+) -> tuple[float, float]:
+    """Measure time and peak memory of file reading.
+
+    Args:
+        read (Callable[[ReaderClass, list[bytes]], None]): Read function.
+        reader_class (ReaderClass): Reader class.
+        chunks (list[bytes]): Chunks of file data.
+
+    Returns:
+        tuple[float, float]: Best time in milliseconds and peak memory \
+            in KiB.
+    """
+    elapsed = timeit.repeat(
+        lambda: read(reader_class, chunks),
+        number=1,
+        repeat=ROUNDS,
+    )
+    tracemalloc.start()
+    read(reader_class, chunks)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(elapsed) * MILLISECONDS, peak_memory / KILOBYTE
+
+
+def split_file(file_size: int, chunk_size: int) -> list[bytes]:
+    """Split file data to chunks of Drive stream body.
+
+    Args:
+        file_size (int): File size in bytes.
+        chunk_size (int): Chunk size in bytes.
+
+    Returns:
+        list[bytes]: Chunks of file data.
+    """
+    file_data = bytes(file_size)
+    return [
+        file_data[start:start + chunk_size]
+        for start in range(0, file_size, chunk_size)
+    ]
+
+
+if __name__ == '__main__':
+    for chunk_size in ITERATOR_CHUNK_SIZES:
+        for file_size_mb in FILE_SIZES_MB:
+            chunks = split_file(file_size_mb * MEGABYTE, chunk_size)
+            for case_name, reader_class, read in CASES:
+                elapsed, peak_memory = measure(read, reader_class, chunks)
+                print(  # noqa: WPS421
+                    '{size} MB, {chunk} B chunks, {case}:'.format(
+                        size=file_size_mb,
+                        chunk=chunk_size,
+                        case=case_name,
+                    ),
+                    '{elapsed:.1f} ms, {peak:.0f} KiB peak'.format(
+                        elapsed=elapsed,
+                        peak=peak_memory,
+                    ),
+                )
@@ -0,0 +1,19 @@
+"""Tests configuration.
+
+Configuration of application requires environment variables, so
+placeholders are set before application modules are imported.
+"""
+
+from os import environ
+
+TEST_ENVIRONMENT = {
+    'JWT_SECRET_KEY': 'test',
+    'ACCESS_TOKEN_EXPIRE_MINUTES': '30',
+    'AGENTS_API_KEY': 'test',
+    'PDF_API_KEY': 'test',
+    'ROOT_LOGIN': 'admin',
+    'ROOT_PASSWORD': 'admin',
+}
+
+for env_name, env_value in TEST_ENVIRONMENT.items():
+    environ.setdefault(env_name, env_value)
@@ -0,0 +1,69 @@
+"""Tests of user authorization."""
+
+import asyncio
+
+import pytest
+
+from app.core.auth import AuthService, BadCredentialsError
+from app.core.config import ROOT_LOGIN, ROOT_PASSWORD
+from app.core.passwords import PasswordHasher
+from app.models.user import UserRole
+from tests.test_users import UsersBase, UsersStorage
+
+
+def make_auth_service() -> AuthService:
+    """Make auth service over empty base.
+
+    Returns:
+        AuthService: Auth service.
+    """
+    return AuthService(
+        UsersStorage(UsersBase()),  # type: ignore[arg-type]
+        PasswordHasher(workers=1, rounds=4),
+    )
+
+
+def test_root_login_skips_password_hashing(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Root password is compared with ROOT_PASSWORD without bcrypt."""
+    auth_service = make_auth_service()
+    asyncio.run(auth_service.bootstrap_root_user())
+
+    async def fail_verify(*args: object) -> None:
+        raise AssertionError('Root password is hashed')
+
+    monkeypatch.setattr(auth_service.password_hasher, 'verify', fail_verify)
+    monkeypatch.setattr(
+        auth_service.password_hasher,
+        'verify_and_update',
+        fail_verify,
+    )
+    user = asyncio.run(auth_service.authorize_user(ROOT_LOGIN, ROOT_PASSWORD))
+
+    assert user.uid == ROOT_LOGIN
+    assert user.role == UserRole.superuser
+
+
+@pytest.mark.parametrize('password', ['', 'wrong', ROOT_PASSWORD + 'x'])
+def test_root_login_with_wrong_password(password: str) -> None:
+    """Wrong root password is rejected."""
+    auth_service = make_auth_service()
+    asyncio.run(auth_service.bootstrap_root_user())
+
+    with pytest.raises(BadCredentialsError):
+        asyncio.run(auth_service.authorize_user(ROOT_LOGIN, password))
+
+
+def test_root_login_restores_demoted_root() -> None:
+    """Demoted root user is bootstrapped again with its token version."""
+    auth_service = make_auth_service()
+    asyncio.run(auth_service.bootstrap_root_user())
+    db_user = auth_service.base.users[ROOT_LOGIN]
+    db_user['role'] = UserRole.employee.value
+    db_user['token_version'] = 3
+
+    user = asyncio.run(auth_service.authorize_user(ROOT_LOGIN, ROOT_PASSWORD))
+
+    assert user.role == UserRole.superuser
+    assert user.token_version == 3
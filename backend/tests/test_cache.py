@@ -0,0 +1,134 @@
+"""Tests of in-memory caches."""
+
+import pytest
+
+from app.core import cache
+from app.core.cache import TTLCache
+
+TTL = 10
+
+NEGATIVE_TTL = 1
+
+
+class Clock(object):
+    """Monotonic clock controlled by test."""
+
+    def __init__(self) -> None:
+        """Initialize clock."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Get current time.
+
+        Returns:
+            float: Time in seconds.
+        """
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    """Replace monotonic clock of caches.
+
+    Args:
+        monkeypatch (pytest.MonkeyPatch): Monkeypatch fixture.
+
+    Returns:
+        Clock: Clock controlled by test.
+    """
+    test_clock = Clock()
+    monkeypatch.setattr(cache, 'monotonic', test_clock)
+    return test_clock
+
+
+def make_cache(max_size: int = 2) -> TTLCache[str]:
+    """Make cache with test TTLs.
+
+    Args:
+        max_size (int): Max number of entries. Defaults to 2.
+
+    Returns:
+        TTLCache[str]: Empty cache.
+    """
+    return TTLCache(max_size=max_size, ttl=TTL, negative_ttl=NEGATIVE_TTL)
+
+
+def test_entry_expires(clock: Clock) -> None:
+    """Entry is found until its TTL passes.
+
+    Args:
+        clock (Clock): Test clock.
+    """
+    ttl_cache = make_cache()
+    ttl_cache.set('key', 'value')
+
+    clock.now = TTL
+    assert ttl_cache.get('key') == (True, 'value')
+    clock.now = TTL + 1
+    assert ttl_cache.get('key') == (False, None)
+
+
+def test_none_expires_by_negative_ttl(clock: Clock) -> None:
+    """Missing entity is cached with its own TTL.
+
+    Args:
+        clock (Clock): Test clock.
+    """
+    ttl_cache = make_cache()
+    ttl_cache.set('key', None)
+
+    assert ttl_cache.get('key') == (True, None)
+    clock.now = NEGATIVE_TTL + 1
+    assert ttl_cache.get('key') == (False, None)
+
+
+def test_least_recently_used_is_evicted(clock: Clock) -> None:
+    """Entry, which was not read or written for longest time, is evicted.
+
+    Args:
+        clock (Clock): Test clock.
+    """
+    ttl_cache = make_cache()
+    ttl_cache.set('first', 'first value')
+    ttl_cache.set('second', 'second value')
+    ttl_cache.get('first')
+    ttl_cache.set('third', 'third value')
+
+    assert ttl_cache.get('first') == (True, 'first value')
+    assert ttl_cache.get('second') == (False, None)
+    assert ttl_cache.get('third') == (True, 'third value')
+    assert ttl_cache.get_stats().evictions == 1
+
+
+def test_set_refreshes_entry(clock: Clock) -> None:
+    """Overwritten entry gets new TTL and becomes most recently used.
+
+    Args:
+        clock (Clock): Test clock.
+    """
+    ttl_cache = make_cache()
+    ttl_cache.set('first', 'old value')
+    ttl_cache.set('second', 'second value')
+    clock.now = TTL
+    ttl_cache.set('first', 'new value')
+    ttl_cache.set('third', 'third value')
+
+    clock.now = TTL + 1
+    assert ttl_cache.get('first') == (True, 'new value')
+    assert ttl_cache.get('second') == (False, None)
+
+
+def test_invalidate_and_stats(clock: Clock) -> None:
+    """Invalidated entry is missed, and lookups are counted.
+
+    Args:
+        clock (Clock): Test clock.
+    """
+    ttl_cache = make_cache()
+    ttl_cache.set('key', 'value')
+    ttl_cache.get('key')
+    ttl_cache.invalidate('key')
+    ttl_cache.get('key')
+
+    stats = ttl_cache.get_stats()
+    assert (stats.size, stats.hits, stats.misses) == (0, 1, 1)
@@ -0,0 +1,155 @@
+"""Tests of conditional and partial downloads."""
+
+from typing import Optional
+from urllib.parse import unquote
+
+import pytest
+
+from app.core.docx import DocFormat
+from app.core.downloads import (
+    RangeNotSatisfiableError,
+    format_content_disposition,
+    format_etag,
+    iterate_range,
+    match_etag,
+    parse_range,
+)
+
+FILE_SIZE = 100
+
+FILE_HASH = 'abc'
+
+
+@pytest.mark.parametrize(('range_header', 'byte_range'), [
+    ('bytes=0-9', (0, 9)),
+    ('bytes=90-', (90, 99)),
+    ('bytes=90-1000', (90, 99)),
+    ('bytes=-10', (90, 99)),
+    ('bytes=-1000', (0, 99)),
+    (' bytes=5-5 ', (5, 5)),
+    ('bytes=9-0', None),
+    ('bytes=-', None),
+    ('bytes=0-1,5-6', None),
+    ('items=0-9', None),
+    ('bytes=a-b', None),
+])
+def test_parse_range(
+    range_header: str,
+    byte_range: Optional[tuple[int, int]],
+) -> None:
+    """Single satisfiable range is parsed, other ranges are ignored.
+
+    Args:
+        range_header (str): Range header value.
+        byte_range (Optional[tuple[int, int]]): Expected byte range.
+    """
+    assert parse_range(range_header, FILE_SIZE) == byte_range
+
+
+@pytest.mark.parametrize('range_header', ['bytes=100-', 'bytes=100-200'])
+def test_parse_range_after_end(range_header: str) -> None:
+    """Range starting after end of file is not satisfiable.
+
+    Args:
+        range_header (str): Range header value.
+    """
+    with pytest.raises(RangeNotSatisfiableError):
+        parse_range(range_header, FILE_SIZE)
+
+
+def test_format_etag() -> None:
+    """Docx tag is strong, PDF tag is weak and distinct from docx one."""
+    assert format_etag(FILE_HASH, DocFormat.docx) == '"abc"'
+    assert format_etag(FILE_HASH, DocFormat.pdf) == 'W/"abc-pdf"'
+    assert format_etag(None, DocFormat.docx) is None
+
+
+@pytest.mark.parametrize(('if_none_match', 'matches'), [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"other", "abc"', True),
+    ('*', True),
+    ('"other"', False),
+    ('"abc-pdf"', False),
+    ('', False),
+])
+def test_match_etag(if_none_match: str, matches: bool) -> None:
+    """Tags are compared weakly.
+
+    Args:
+        if_none_match (str): If-None-Match header value.
+        matches (bool): Whether client has file.
+    """
+    assert match_etag(if_none_match, '"abc"') is matches
+
+
+def test_match_weak_etag() -> None:
+    """Weak tag of PDF matches itself with or without weak prefix."""
+    assert match_etag('W/"abc-pdf"', 'W/"abc-pdf"')
+    assert match_etag('"abc-pdf"', 'W/"abc-pdf"')
+    assert not match_etag('"abc"', 'W/"abc-pdf"')
+
+
+@pytest.mark.parametrize(('first', 'last'), [
+    (0, 99),
+    (0, 0),
+    (9, 10),
+    (15, 44),
+    (99, 99),
+])
+def test_iterate_range(first: int, last: int) -> None:
+    """Range is cut from chunks of any boundaries.
+
+    Args:
+        first (int): First byte position.
+        last (int): Last byte position.
+    """
+    file_data = bytes(range(FILE_SIZE))
+    chunks = (file_data[start:start + 10] for start in range(0, 100, 10))
+
+    assert b''.join(iterate_range(chunks, first, last)) == (
+        file_data[first:last + 1]
+    )
+
+
+def test_iterate_range_stops_after_last_byte() -> None:
+    """Chunks after range are not read."""
+    chunks = iter([b'abc', b'def', b'ghi'])
+
+    assert list(iterate_range(chunks, 1, 4)) == [b'bc', b'de']
+    assert next(chunks) == b'ghi'
+
+
+@pytest.mark.parametrize('file_name', [
+    'offer.docx',
+    'Коммерческое предложение.pdf',
+    'a "quoted" name\\with/slashes.docx',
+])
+def test_format_content_disposition(file_name: str) -> None:
+    """Name is encoded as UTF-8 and ASCII fallback is safe.
+
+    Args:
+        file_name (str): File name.
+    """
+    header = format_content_disposition(file_name)
+    disposition, fallback, encoded_name = header.split('; ')
+    fallback_name = fallback.removeprefix('filename=')
+
+    assert disposition == 'attachment'
+    assert fallback_name.startswith('"') and fallback_name.endswith('"')
+    assert fallback_name[1:-1].isascii()
+    assert not set('"\\/') & set(fallback_name[1:-1])
+    assert len(fallback_name[1:-1]) == len(file_name)
+    assert encoded_name.isascii()
+    assert unquote(encoded_name.removeprefix("filename*=UTF-8''")) == (
+        file_name
+    )
+
+
+def test_content_disposition_fallback_keeps_ascii() -> None:
+    """Printable ASCII names are sent as is."""
+    header = "attachment; filename=\"offer 1.docx\"; filename*=UTF-8''{name}"
+
+    assert format_content_disposition('offer 1.docx') == header.format(
+        name='offer%201.docx',
+    )
@@ -0,0 +1,151 @@
+"""Tests of in-memory index of names."""
+
+import asyncio
+
+import pytest
+
+from app.core.names_index import NamesIndex, build_names_index, get_stem
+
+NAMES = {
+    'e1': 'отходы бумаги',
+    'e2': 'бумага',
+    'e3': 'мешки бумажные',
+    'e4': 'отходы бумаги и картона',
+    'e5': 'картон гофрированный',
+    'e6': 'лампы ртутные',
+}
+
+
+def make_index(names: dict[str, str] = NAMES) -> NamesIndex:
+    """Make index of names.
+
+    Args:
+        names (dict[str, str]): Normalized names by entity ids.
+
+    Returns:
+        NamesIndex: Index of names.
+    """
+    names_index = NamesIndex(suggestions_cache_size=10)
+    for entity_id, name in names.items():
+        names_index.insert(entity_id, name)
+
+    return names_index
+
+
+def test_find() -> None:
+    """Candidates have all trigrams of substring."""
+    names_index = make_index()
+
+    assert names_index.find('бумаг') == {'e1', 'e2', 'e4'}
+    assert names_index.find('картон') == {'e4', 'e5'}
+    assert names_index.find('стекло') == set()
+    assert names_index.find('бу') is None
+
+
+@pytest.mark.parametrize(('query', 'suggestions'), [
+    # Exact match, prefix, word prefix, then substring
+    ('бум', ['e2', 'e1', 'e3', 'e4']),
+    ('картон', ['e5', 'e4']),
+    ('ртут', ['e6']),
+    ('ходы', ['e1', 'e4']),
+    # Rest is filled with similar names
+    ('бумага', ['e2', 'e1', 'e4', 'e3']),
+    ('бумаг', ['e2', 'e1', 'e4', 'e3']),
+    # Short query is completed as word prefix
+    ('бу', ['e2', 'e1', 'e3', 'e4']),
+    ('м', ['e3']),
+])
+def test_suggest_ranking(query: str, suggestions: list[str]) -> None:
+    """Better matches and shorter names go first.
+
+    Args:
+        query (str): Normalized query.
+        suggestions (list[str]): Expected suggestions.
+    """
+    assert make_index().suggest(query, 10) == suggestions
+
+
+def test_suggest_limit() -> None:
+    """Only best suggestions are returned."""
+    assert make_index().suggest('бум', 2) == ['e2', 'e1']
+
+
+def test_suggestions_follow_changes() -> None:
+    """Cached suggestions are not returned after index changes."""
+    names_index = make_index()
+    names_index.suggest('бум', 10)
+    names_index.insert('e7', 'бумага офисная')
+    names_index.discard('e2')
+
+    assert names_index.suggest('бум', 10) == ['e7', 'e1', 'e3', 'e4']
+    assert names_index.suggest('бумага', 1) == ['e7']
+
+
+def test_word_prefix_after_changes() -> None:
+    """Words inserted and discarded after search are completed."""
+    names_index = make_index()
+    names_index.suggest('к', 10)
+    names_index.insert('e7', 'коробки')
+    names_index.insert('e8', 'алюминий')
+    names_index.discard('e6')
+
+    assert names_index.suggest('к', 10) == ['e7', 'e5', 'e4']
+    assert names_index.suggest('а', 10) == ['e8']
+    assert names_index.suggest('л', 10) == []
+
+
+def test_build_names_index() -> None:
+    """Index built in bulk suggests the same as filled one by one."""
+    names = {
+        'e{index}'.format(index=index): 'отходы {index}'.format(index=index)
+        for index in range(250)
+    }
+    names.update(NAMES)
+    names_index = asyncio.run(build_names_index(names))
+
+    for query in ('от', 'отходы 1', 'бум', 'картон'):
+        assert names_index.suggest(query, 5) == make_index(names).suggest(
+            query,
+            5,
+        )
+
+
+@pytest.mark.parametrize(('word', 'stem'), [
+    ('бумаги', 'бумаг'),
+    ('картона', 'картон'),
+    ('ртутные', 'ртутн'),
+    ('отходы', 'отход'),
+    ('дом', 'дом'),
+])
+def test_get_stem(word: str, stem: str) -> None:
+    """Longest ending is stripped, if stem keeps min length.
+
+    Args:
+        word (str): Normalized word.
+        stem (str): Expected stem.
+    """
+    assert get_stem(word) == stem
+
+
+@pytest.mark.parametrize(('query', 'similar'), [
+    # Other word forms
+    ('лампа', ['e6']),
+    ('картонный', ['e5', 'e4']),
+    ('отход бумаг', ['e1', 'e4', 'e2']),
+    # Typo
+    ('бумога', ['e2', 'e1', 'e3', 'e4']),
+    ('шлак', []),
+])
+def test_find_similar(query: str, similar: list[str]) -> None:
+    """Names sharing more stem trigrams and shorter ones go first.
+
+    Args:
+        query (str): Normalized query.
+        similar (list[str]): Expected similar entities.
+    """
+    assert make_index().find_similar(query) == similar
+
+
+def test_suggest_misspelled() -> None:
+    """Misspelled query is suggested similar names."""
+    assert make_index().suggest('лмпы ртутные', 5) == ['e6']
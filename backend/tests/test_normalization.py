@@ -0,0 +1,49 @@
+"""Tests of normalization for search."""
+
+import pytest
+
+from app.core.normalization import normalize_fkko_code, normalize_name
+
+
+@pytest.mark.parametrize(('name', 'normalized_name'), [
+    ('Отходы Бумаги', 'отходы бумаги'),
+    ('Ёмкости  из-под\tмасла', 'емкости из под масла'),
+    ('«Картон» — гофрированный', 'картон гофрированный'),
+    ('Шлак (сварочный), 1_класс', 'шлак сварочный 1 класс'),
+    ('  лампы…ртутные  ', 'лампы ртутные'),
+    ('Café №5', 'café 5'),
+    ('', ''),
+])
+def test_normalize_name(name: str, normalized_name: str) -> None:
+    """Name is lowercased with ё folded and punctuation removed.
+
+    Args:
+        name (str): Name.
+        normalized_name (str): Expected normalized name.
+    """
+    assert normalize_name(name) == normalized_name
+
+
+def test_normalize_name_is_idempotent() -> None:
+    """Normalized name is not changed by repeated normalization."""
+    normalized_name = normalize_name('Отходы: «Бумага», ёмкости!')
+
+    assert normalize_name(normalized_name) == normalized_name
+
+
+@pytest.mark.parametrize(('fkko_code', 'normalized_fkko_code'), [
+    ('4 05 122 02 60 5', '40512202605'),
+    (' 4 05\t122 ', '405122'),
+    ('40512202605', '40512202605'),
+])
+def test_normalize_fkko_code(
+    fkko_code: str,
+    normalized_fkko_code: str,
+) -> None:
+    """Whitespace is removed from code.
+
+    Args:
+        fkko_code (str): FKKO code.
+        normalized_fkko_code (str): Expected normalized code.
+    """
+    assert normalize_fkko_code(fkko_code) == normalized_fkko_code
@@ -0,0 +1,189 @@
+"""Tests of compiled offer templates cache."""
+
+from io import BytesIO
+from zipfile import ZipFile
+
+import pytest
+from docx import Document
+from docxtpl import DocxTemplate
+
+from app.core.offer_tpl_cache import (
+    CompiledOfferTemplate,
+    OfferTemplatesCache,
+    PrecompiledDocxTemplate,
+)
+
+CONTEXT = {
+    'company': 'Company',
+    'number': 7,
+    'items': [
+        {'name': 'First', 'price': 1},
+        {'name': 'Second', 'price': 2},
+    ],
+}
+
+
+def make_offer_tpl_file(title: str = 'Offer') -> bytes:
+    """Make docx template with variables, loop and header.
+
+    Args:
+        title (str): Text of first paragraph. Defaults to 'Offer'.
+
+    Returns:
+        bytes: Offer template file data.
+    """
+    document = Document()
+    document.add_paragraph(title + ' for {{ company }}')
+    table = document.add_table(rows=3, cols=2)
+    table.cell(0, 0).text = '{%tr for item in items %}'
+    table.cell(1, 0).text = '{{ item.name }}'
+    table.cell(1, 1).text = '{{ item.price }}'
+    table.cell(2, 0).text = '{%tr endfor %}'
+    header = document.sections[0].header
+    header.paragraphs[0].text = 'Offer {{ number }}'
+    offer_tpl_file = BytesIO()
+    document.save(offer_tpl_file)
+    return offer_tpl_file.getvalue()
+
+
+def read_parts(docx_file: bytes) -> dict[str, bytes]:
+    """Read XML parts of docx file.
+
+    Args:
+        docx_file (bytes): Docx file data.
+
+    Returns:
+        dict[str, bytes]: Parts data by names.
+    """
+    with ZipFile(BytesIO(docx_file)) as archive:
+        return {
+            name: archive.read(name)
+            for name in archive.namelist()
+            if name.endswith('.xml')
+        }
+
+
+def render_by_docxtpl(offer_tpl_file: bytes) -> bytes:
+    """Render template by plain docxtpl.
+
+    Args:
+        offer_tpl_file (bytes): Offer template file data.
+
+    Returns:
+        bytes: Filled offer file data.
+    """
+    docx = DocxTemplate(BytesIO(offer_tpl_file))
+    docx.render(CONTEXT)
+    filled_offer_stream = BytesIO()
+    docx.save(filled_offer_stream)
+    return filled_offer_stream.getvalue()
+
+
+def test_render_matches_docxtpl() -> None:
+    """Compiled template renders the same parts as plain docxtpl."""
+    offer_tpl_file = make_offer_tpl_file()
+    offer_tpl = CompiledOfferTemplate(offer_tpl_file)
+
+    assert read_parts(offer_tpl.render(CONTEXT)) == read_parts(
+        render_by_docxtpl(offer_tpl_file),
+    )
+
+
+def test_render_reuses_compiled_parts() -> None:
+    """Repeated renders with other contexts are not affected by previous."""
+    offer_tpl = CompiledOfferTemplate(make_offer_tpl_file())
+    offer_tpl.render({'company': 'Other', 'number': 1, 'items': []})
+
+    document = Document(BytesIO(offer_tpl.render(CONTEXT)))
+
+    assert document.paragraphs[0].text == 'Offer for Company'
+    assert document.sections[0].header.paragraphs[0].text == 'Offer 7'
+    assert [cell.text for cell in document.tables[0].rows[0].cells] == [
+        'First',
+        '1',
+    ]
+
+
+def test_render_skips_xml_of_compiled_parts(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Parts XML is not serialized again by renders of compiled template.
+
+    Args:
+        monkeypatch (pytest.MonkeyPatch): Monkeypatch fixture.
+    """
+    offer_tpl = CompiledOfferTemplate(make_offer_tpl_file())
+    serialized_parts: list[str] = []
+
+    def get_xml(docx: PrecompiledDocxTemplate) -> str:
+        serialized_parts.append('body')
+        return ''
+
+    def get_part_xml(docx: PrecompiledDocxTemplate, part: object) -> str:
+        serialized_parts.append('part')
+        return ''
+
+    monkeypatch.setattr(PrecompiledDocxTemplate, 'get_xml', get_xml)
+    monkeypatch.setattr(PrecompiledDocxTemplate, 'get_part_xml', get_part_xml)
+    offer_tpl.render(CONTEXT)
+
+    assert not serialized_parts
+
+
+def test_variables() -> None:
+    """Variables of body and headers are collected."""
+    offer_tpl = CompiledOfferTemplate(make_offer_tpl_file())
+
+    assert offer_tpl.variables == ['company', 'items', 'number']
+
+
+def test_guarded_variables_are_optional() -> None:
+    """Variables tested by `is defined` or with default are not required."""
+    offer_tpl = CompiledOfferTemplate(make_offer_tpl_file(
+        '{% if note is defined %}{{ note }}{% endif %}'
+        + '{% if extra is not undefined %}{{ extra.text }}{% endif %}'
+        + '{{ discount | default(0) }} {{ tax | d(20) }} {{ total }}',
+    ))
+
+    assert offer_tpl.variables == ['company', 'items', 'number', 'total']
+    assert offer_tpl.render(CONTEXT)
+
+
+def test_cache_returns_compiled_template_of_same_content() -> None:
+    """Templates are cached by content, not by identity of data."""
+    cache = OfferTemplatesCache(max_size=10 ** 8)
+    offer_tpl_file = make_offer_tpl_file()
+
+    offer_tpl = cache.get(offer_tpl_file)
+
+    assert cache.get(bytes(bytearray(offer_tpl_file))) is offer_tpl
+    assert cache.get(make_offer_tpl_file('Updated')) is not offer_tpl
+
+
+@pytest.mark.parametrize('templates_count', [1, 2])
+def test_cache_evicts_least_recently_used(templates_count: int) -> None:
+    """Least recently used templates are evicted to fit memory budget.
+
+    Args:
+        templates_count (int): Number of templates, which fit budget.
+    """
+    offer_tpl_files = [
+        make_offer_tpl_file('Offer {index}'.format(index=index))
+        for index in range(templates_count + 1)
+    ]
+    offer_tpl_size = CompiledOfferTemplate(offer_tpl_files[0]).size
+    cache = OfferTemplatesCache(max_size=offer_tpl_size * templates_count)
+    first = cache.get(offer_tpl_files[0])
+    for offer_tpl_file in offer_tpl_files[1:]:
+        cache.get(offer_tpl_file)
+
+    assert cache.get(offer_tpl_files[-1]) is cache.get(offer_tpl_files[-1])
+    assert cache.get(offer_tpl_files[0]) is not first
+
+
+def test_cache_skips_template_over_budget() -> None:
+    """Template larger than budget is compiled, but not cached."""
+    cache = OfferTemplatesCache(max_size=1)
+    offer_tpl_file = make_offer_tpl_file()
+
+    assert cache.get(offer_tpl_file) is not cache.get(offer_tpl_file)
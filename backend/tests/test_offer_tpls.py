@@ -0,0 +1,106 @@
+"""Tests of offer templates service."""
+
+import asyncio
+from typing import Optional
+
+import pytest
+
+from app.api.exceptions.offer_tpls import IncorrectOfferTemplateContext
+from app.api.routes.offer_tpls import read_offer_tpl_for_build
+from app.core.offer_tpl_cache import CompiledOfferTemplate
+from app.core.offer_tpls import (
+    IncorrectOfferTemplateContextError,
+    check_offer_context,
+)
+from app.models.offer_tpl import OfferTemplate
+from tests.test_offer_tpl_cache import CONTEXT, make_offer_tpl_file
+
+
+def make_offer_tpl(variables: Optional[list[str]]) -> OfferTemplate:
+    """Make offer template record.
+
+    Args:
+        variables (Optional[list[str]]): Required context variables.
+
+    Returns:
+        OfferTemplate: Offer template.
+    """
+    return OfferTemplate(
+        offer_tpl_id='tpl',
+        name='Offer',
+        variables=variables,
+    )
+
+
+def test_check_offer_context_skips_optional_variables() -> None:
+    """Context may miss variables, which template checks itself."""
+    compiled_offer_tpl = CompiledOfferTemplate(make_offer_tpl_file(
+        '{% if note is defined %}{{ note }}{% endif %}'
+        + '{{ discount | default(0) }}',
+    ))
+    offer_tpl = make_offer_tpl(compiled_offer_tpl.variables)
+
+    check_offer_context(offer_tpl, CONTEXT)
+
+    with pytest.raises(IncorrectOfferTemplateContextError, match='company'):
+        check_offer_context(offer_tpl, {'items': [], 'number': 1})
+
+
+def test_check_offer_context_without_variables() -> None:
+    """Templates uploaded before variables collection are not checked."""
+    check_offer_context(make_offer_tpl(None), {})
+
+
+class OfferTemplatesStub(object):
+    """Offer templates service stub, which records storage reads."""
+
+    def __init__(self, offer_tpl: OfferTemplate) -> None:
+        """Initialize service.
+
+        Args:
+            offer_tpl (OfferTemplate): Stored offer template.
+        """
+        self.offer_tpl = offer_tpl
+        self.file_reads = 0
+
+    async def get_offer_tpl(self, offer_tpl_id: str) -> OfferTemplate:
+        """Get offer template.
+
+        Args:
+            offer_tpl_id (str): Offer template id.
+
+        Returns:
+            OfferTemplate: Offer template.
+        """
+        return self.offer_tpl
+
+    async def read_offer_tpl_file(self, offer_tpl_id: str) -> bytes:
+        """Read offer template file.
+
+        Args:
+            offer_tpl_id (str): Offer template id.
+
+        Returns:
+            bytes: Offer template file data.
+        """
+        self.file_reads += 1
+        return b'docx'
+
+
+def test_build_contexts_are_checked_before_file_read() -> None:
+    """Incorrect contexts are rejected without template file download."""
+    service = OfferTemplatesStub(make_offer_tpl(['company']))
+
+    with pytest.raises(IncorrectOfferTemplateContext):
+        asyncio.run(read_offer_tpl_for_build(
+            service,  # type: ignore[arg-type]
+            'tpl',
+            [{'company': 'Company'}, {}],
+        ))
+
+    assert service.file_reads == 0
+    assert asyncio.run(read_offer_tpl_for_build(
+        service,  # type: ignore[arg-type]
+        'tpl',
+        [{'company': 'Company'}],
+    )) == (service.offer_tpl, b'docx')
@@ -0,0 +1,227 @@
+"""Tests of offers service."""
+
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
+from hashlib import sha256
+from io import BytesIO
+from typing import Any, Callable, Optional
+
+import pytest
+from jinja2 import TemplateError
+
+from app.core import offers
+from app.core.offers import (
+    BUILD_BATCH_SIZE,
+    BuiltOffer,
+    IncorrectOfferContextError,
+    OffersService,
+)
+from app.core.pdf_cache import PdfCache
+from app.core.streams import FileData, FileTooLargeError
+from app.models.offer import PdfStatus
+from tests.test_pdf_cache import FilesStorage, GatedConverter
+
+
+def make_offers_service(storage: FilesStorage) -> OffersService:
+    """Make offers service over storage.
+
+    Offer files are converted to PDF without waiting.
+
+    Args:
+        storage (FilesStorage): Storage stub.
+
+    Returns:
+        OffersService: Offers service.
+    """
+    converter = GatedConverter()
+    converter.gate.set()
+    return OffersService(
+        storage,  # type: ignore[arg-type]
+        None,  # type: ignore[arg-type]
+        PdfCache(storage, converter, 1),  # type: ignore[arg-type]
+    )
+
+
+@pytest.mark.parametrize('make_file', [bytes, BytesIO])
+def test_create_offer_stores_file_hash(
+    make_file: Callable[[bytes], FileData],
+) -> None:
+    """Hash and size of file data or uploaded file are stored with offer."""
+    storage = FilesStorage()
+
+    async def create_offer() -> None:
+        offers_service = make_offers_service(storage)
+        offer = await offers_service.create_offer(
+            'Offer',
+            'Admin',
+            make_file(b'docx'),
+        )
+        await offers_service.pdf_cache.close()
+
+        assert offer.file_hash == sha256(b'docx').hexdigest()
+        assert offer.file_size == len(b'docx')
+        assert storage.drive('offers').files == {offer.offer_id: b'docx'}
+        db_offer = storage.base('offers').items[offer.offer_id]
+        assert db_offer['file_hash'] == offer.file_hash
+        assert db_offer['pdf_status'] == PdfStatus.ready.value
+
+    asyncio.run(create_offer())
+
+
+@pytest.mark.parametrize('make_file', [bytes, BytesIO])
+def test_too_large_offer_is_not_uploaded(
+    monkeypatch: pytest.MonkeyPatch,
+    make_file: Callable[[bytes], FileData],
+) -> None:
+    """Files over upload size limit are rejected before any write."""
+    monkeypatch.setattr(offers, 'MAX_UPLOAD_SIZE', 4)
+    storage = FilesStorage()
+
+    async def fail_write(*args: object) -> None:
+        raise AssertionError('Storage is written')
+
+    monkeypatch.setattr(storage.drive('offers'), 'put', fail_write)
+    monkeypatch.setattr(storage.base('offers'), 'put', fail_write)
+    monkeypatch.setattr(storage.base('offers'), 'put_many', fail_write)
+
+    async def create_offer() -> None:
+        offers_service = make_offers_service(storage)
+        await offers_service.create_offer(
+            'Offer',
+            'Admin',
+            make_file(b'large docx'),
+        )
+
+    with pytest.raises(FileTooLargeError):
+        asyncio.run(create_offer())
+
+
+class BatchRenderEngine(object):
+    """Render engine stub, which renders contexts to their numbers."""
+
+    def __init__(self, error: Optional[Exception] = None) -> None:
+        """Initialize engine.
+
+        Args:
+            error (Optional[Exception]): Error raised by second batch.
+        """
+        self.error = error
+        self.batches: list[int] = []
+
+    async def render_offers(
+        self,
+        offer_tpl_file: bytes,
+        contexts: list[dict[str, Any]],
+    ) -> list[bytes]:
+        """Render batch of offers.
+
+        Args:
+            offer_tpl_file (bytes): Offer template file data.
+            contexts (list[dict[str, Any]]): Offers context data.
+
+        Raises:
+            Exception: Error of engine on second batch.
+
+        Returns:
+            list[bytes]: Offer files in order of contexts.
+        """
+        await asyncio.sleep(0)
+        self.batches.append(len(contexts))
+        if self.error is not None and len(self.batches) == 2:
+            raise self.error
+
+        return [str(context['number']).encode() for context in contexts]
+
+
+def make_build_service(
+    storage: FilesStorage,
+    render_engine: BatchRenderEngine,
+) -> OffersService:
+    """Make offers service, which builds offers by render engine stub.
+
+    Args:
+        storage (FilesStorage): Storage stub.
+        render_engine (BatchRenderEngine): Render engine stub.
+
+    Returns:
+        OffersService: Offers service.
+    """
+    offers_service = make_offers_service(storage)
+    offers_service.render_engine = render_engine  # type: ignore[assignment]
+    return offers_service
+
+
+async def collect_offers(
+    offers_service: OffersService,
+    contexts_count: int,
+    built_offers: list[BuiltOffer],
+) -> None:
+    """Build offers and collect them.
+
+    Args:
+        offers_service (OffersService): Offers service.
+        contexts_count (int): Number of built offers.
+        built_offers (list[BuiltOffer]): Collected offers.
+    """
+    async for built_offer in offers_service.build_offers(
+        'Offer',
+        'Admin',
+        [{'number': number} for number in range(contexts_count)],
+        b'template',
+    ):
+        built_offers.append(built_offer)
+
+
+def test_build_offers_by_batches() -> None:
+    """Offers are rendered and saved by batches in order of contexts."""
+    storage = FilesStorage()
+    render_engine = BatchRenderEngine()
+    offers_service = make_build_service(storage, render_engine)
+    contexts_count = BUILD_BATCH_SIZE * 2 + 1
+    built_offers: list[BuiltOffer] = []
+    asyncio.run(collect_offers(offers_service, contexts_count, built_offers))
+
+    assert render_engine.batches == [BUILD_BATCH_SIZE, BUILD_BATCH_SIZE, 1]
+    assert [built.offer_file for built in built_offers] == [
+        str(number).encode() for number in range(contexts_count)
+    ]
+    assert len(storage.base('offers').items) == contexts_count
+    assert storage.drive('offers').files == {
+        built.offer.offer_id: built.offer_file for built in built_offers
+    }
+    assert all(
+        built.offer.pdf_status == PdfStatus.pending for built in built_offers
+    )
+
+
+@pytest.mark.parametrize('error', [
+    RuntimeError('Bad loop'),
+    TypeError('Bad operand'),
+    TemplateError('Bad filter'),
+])
+def test_build_offers_rejects_incorrect_context(error: Exception) -> None:
+    """Render errors of context are reported after saved batches."""
+    storage = FilesStorage()
+    offers_service = make_build_service(storage, BatchRenderEngine(error))
+    built_offers: list[BuiltOffer] = []
+
+    with pytest.raises(IncorrectOfferContextError):
+        asyncio.run(collect_offers(
+            offers_service,
+            BUILD_BATCH_SIZE * 2,
+            built_offers,
+        ))
+
+    assert len(built_offers) == BUILD_BATCH_SIZE
+    assert len(storage.base('offers').items) == BUILD_BATCH_SIZE
+
+
+def test_build_offers_reraises_broken_pool() -> None:
+    """Death of render worker is not reported as incorrect context."""
+    offers_service = make_build_service(
+        FilesStorage(),
+        BatchRenderEngine(BrokenProcessPool('Worker died')),
+    )
+
+    with pytest.raises(BrokenProcessPool):
+        asyncio.run(collect_offers(offers_service, BUILD_BATCH_SIZE * 2, []))
@@ -0,0 +1,60 @@
+"""Tests of in-memory pagination."""
+
+from typing import Optional
+
+import pytest
+
+from app.core.pagination import PaginationParams, paginate
+
+KEYS = ['a', 'b', 'c', 'd', 'e']
+
+ENTITIES = [key.upper() for key in KEYS]
+
+
+@pytest.mark.parametrize(('limit', 'last', 'page', 'page_last'), [
+    (2, None, ['A', 'B'], 'b'),
+    (2, 'b', ['C', 'D'], 'd'),
+    (2, 'd', ['E'], None),
+    (5, None, ENTITIES, None),
+    (4, 'a', ['B', 'C', 'D', 'E'], None),
+    (2, 'bb', ['C', 'D'], 'd'),
+    (2, 'e', [], None),
+    (2, 'z', [], None),
+])
+def test_paginate(
+    limit: int,
+    last: Optional[str],
+    page: list[str],
+    page_last: Optional[str],
+) -> None:
+    """Page starts after last key and has next page key if not final.
+
+    Args:
+        limit (int): Page size.
+        last (Optional[str]): Last key of previous page.
+        page (list[str]): Expected page entities.
+        page_last (Optional[str]): Expected last key of page.
+    """
+    response = paginate(
+        ENTITIES,
+        KEYS,
+        PaginationParams(limit=limit, last=last),
+    )
+
+    assert response.items == page
+    assert response.last == page_last
+
+
+def test_pages_cover_all_entities() -> None:
+    """Pages fetched by last keys join to all entities."""
+    pagination = PaginationParams(limit=2)
+    fetched: list[str] = []
+    while True:
+        response = paginate(ENTITIES, KEYS, pagination)
+        fetched.extend(response.items)
+        if response.last is None:
+            break
+
+        pagination = PaginationParams(limit=2, last=response.last)
+
+    assert fetched == ENTITIES
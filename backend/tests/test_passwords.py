@@ -0,0 +1,97 @@
+"""Tests of password hashing."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from passlib.context import CryptContext
+
+from app.core.passwords import PasswordHasher
+
+
+def test_hash_runs_off_event_loop(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Passwords are hashed in hasher threads, not in event loop thread."""
+    hasher = PasswordHasher(workers=1, rounds=4)
+    threads: list[str] = []
+    context_hash = CryptContext.hash
+
+    def record_hash(context: CryptContext, secret: str) -> str:
+        threads.append(threading.current_thread().name)
+        return context_hash(context, secret)
+
+    monkeypatch.setattr(CryptContext, 'hash', record_hash)
+    password_hash = asyncio.run(hasher.hash('secret'))
+
+    assert threads[0].startswith('password-hasher')
+    assert threads[0] != threading.current_thread().name
+    assert asyncio.run(hasher.verify('secret', password_hash))
+    assert not asyncio.run(hasher.verify('wrong', password_hash))
+
+
+def test_verify_and_update_rehashes_on_rounds_change() -> None:
+    """Hash with outdated cost factor is replaced on verification."""
+    old_hasher = PasswordHasher(workers=1, rounds=4)
+    new_hasher = PasswordHasher(workers=1, rounds=5)
+    old_hash = asyncio.run(old_hasher.hash('secret'))
+
+    assert new_hasher.needs_update(old_hash)
+    assert asyncio.run(
+        new_hasher.verify_and_update('wrong', old_hash),
+    ) == (False, None)
+
+    is_verified, new_hash = asyncio.run(
+        new_hasher.verify_and_update('secret', old_hash),
+    )
+
+    assert is_verified
+    assert new_hash is not None
+    assert not new_hasher.needs_update(new_hash)
+    assert asyncio.run(
+        old_hasher.verify_and_update('secret', old_hash),
+    ) == (True, None)
+
+
+def test_concurrent_jobs_are_capped(monkeypatch: pytest.MonkeyPatch) -> None:
+    """No more than workers count jobs are hashed at once."""
+    workers = 2
+    jobs_count = 6
+    hasher = PasswordHasher(workers=workers, rounds=4)
+    lock = threading.Lock()
+    running = [0]
+    max_running = [0]
+
+    def slow_hash(context: CryptContext, secret: str) -> str:
+        with lock:
+            running[0] += 1
+            max_running[0] = max(max_running[0], running[0])
+
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+        return secret
+
+    monkeypatch.setattr(CryptContext, 'hash', slow_hash)
+
+    async def hash_passwords() -> None:
+        jobs = [
+            asyncio.create_task(hasher.hash(str(number)))
+            for number in range(jobs_count)
+        ]
+        await asyncio.sleep(0.01)
+        stats = hasher.get_stats()
+
+        assert stats.in_flight == jobs_count
+        assert stats.queued == jobs_count - workers
+        assert await asyncio.gather(*jobs) == [
+            str(number) for number in range(jobs_count)
+        ]
+
+    asyncio.run(hash_passwords())
+    stats = hasher.get_stats()
+
+    assert max_running[0] == workers
+    assert stats.in_flight == 0
+    assert stats.completed == jobs_count
+    assert stats.avg_queue_time > 0
@@ -0,0 +1,388 @@
+"""Tests of converted PDF files cache."""
+
+import asyncio
+from contextlib import suppress
+from io import BytesIO
+from typing import Any, AsyncIterator, BinaryIO, Iterator, Optional
+
+import pytest
+
+from app.api.exceptions.docx import FailConvertToPDF
+from app.core.docx import PdfConverter
+from app.core.offer_tpl_cache import get_file_hash
+from app.core.pdf_cache import PdfCache
+from app.models.offer import PdfStatus
+
+
+class StreamBody(BytesIO):
+    """Drive streaming body stub."""
+
+    def iter_chunks(self, chunk_size: int) -> Iterator[bytes]:
+        """Read body by chunks.
+
+        Args:
+            chunk_size (int): Max chunk size.
+
+        Yields:
+            bytes: Body data chunk.
+        """
+        chunk = self.read(chunk_size)
+        while chunk:
+            yield chunk
+            chunk = self.read(chunk_size)
+
+
+class FilesDrive(object):
+    """Drive stub, which keeps files in memory."""
+
+    def __init__(self) -> None:
+        """Initialize empty drive."""
+        self.files: dict[str, bytes] = {}
+
+    async def get(self, name: str) -> Optional[StreamBody]:
+        """Get file stream.
+
+        Args:
+            name (str): File name.
+
+        Returns:
+            Optional[StreamBody]: File stream if file found, None otherwise.
+        """
+        await asyncio.sleep(0)
+        file_data = self.files.get(name)
+        return None if file_data is None else StreamBody(file_data)
+
+    async def put(self, name: str, file_data: Any) -> None:
+        """Put file.
+
+        Args:
+            name (str): File name.
+            file_data (Any): File data or file object.
+        """
+        await asyncio.sleep(0)
+        if not isinstance(file_data, bytes):
+            file_data = file_data.read()
+
+        self.files[name] = file_data
+
+    async def delete(self, name: str) -> None:
+        """Delete file.
+
+        Args:
+            name (str): File name.
+        """
+        await asyncio.sleep(0)
+        self.files.pop(name, None)
+
+
+class ItemsBase(object):
+    """Base stub, which keeps items in memory."""
+
+    def __init__(self) -> None:
+        """Initialize empty base."""
+        self.items: dict[str, dict[str, Any]] = {}
+
+    async def get(self, key: str) -> Optional[dict[str, Any]]:
+        """Get item.
+
+        Args:
+            key (str): Item key.
+
+        Returns:
+            Optional[dict[str, Any]]: Item if found, None otherwise.
+        """
+        await asyncio.sleep(0)
+        db_item = self.items.get(key)
+        return None if db_item is None else dict(db_item)
+
+    async def put(self, record: dict[str, Any], key: str) -> None:
+        """Put item.
+
+        Args:
+            record (dict[str, Any]): Item.
+            key (str): Item key.
+        """
+        await asyncio.sleep(0)
+        self.items[key] = dict(record)
+
+    async def put_many(self, records: dict[str, dict[str, Any]]) -> None:
+        """Put items.
+
+        Args:
+            records (dict[str, dict[str, Any]]): Items by keys.
+        """
+        await asyncio.sleep(0)
+        for key, record in records.items():
+            self.items[key] = dict(record)
+
+    async def delete(self, key: str) -> None:
+        """Delete item.
+
+        Args:
+            key (str): Item key.
+        """
+        await asyncio.sleep(0)
+        self.items.pop(key, None)
+
+    async def update(self, updates: dict[str, Any], key: str) -> None:
+        """Update item fields.
+
+        Args:
+            updates (dict[str, Any]): New field values.
+            key (str): Item key.
+        """
+        await asyncio.sleep(0)
+        self.items[key].update(updates)
+
+
+class FilesStorage(object):
+    """Storage stub with in-memory Bases and Drives."""
+
+    def __init__(self) -> None:
+        """Initialize empty storage."""
+        self.bases: dict[str, ItemsBase] = {}
+        self.drives: dict[str, FilesDrive] = {}
+
+    def base(self, name: str) -> ItemsBase:
+        """Get base.
+
+        Args:
+            name (str): Base name.
+
+        Returns:
+            ItemsBase: Base.
+        """
+        return self.bases.setdefault(name, ItemsBase())
+
+    def drive(self, name: str) -> FilesDrive:
+        """Get drive.
+
+        Args:
+            name (str): Drive name.
+
+        Returns:
+            FilesDrive: Drive.
+        """
+        return self.drives.setdefault(name, FilesDrive())
+
+
+class GatedConverter(PdfConverter):
+    """Converter stub, which converts files only when gate is opened."""
+
+    def __init__(self) -> None:
+        """Initialize converter with closed gate."""
+        self.gate = asyncio.Event()
+        self.converted: list[bytes] = []
+        self.fails = False
+
+    async def start(self) -> None:
+        """Do nothing."""
+
+    async def convert(
+        self,
+        document: AsyncIterator[bytes],
+        pdf_file: BinaryIO,
+    ) -> None:
+        """Convert docx file to fake PDF after gate is opened.
+
+        Args:
+            document (AsyncIterator[bytes]): Docx file data chunks.
+            pdf_file (BinaryIO): File to write PDF data to.
+
+        Raises:
+            FailConvertToPDF: If converter is set to fail.
+        """
+        docx_data = b''.join([chunk async for chunk in document])
+        self.converted.append(docx_data)
+        await self.gate.wait()
+        if self.fails:
+            raise FailConvertToPDF('Conversion failed')
+
+        pdf_file.write(b'PDF ' + docx_data)
+
+    async def close(self) -> None:
+        """Do nothing."""
+
+
+class Documents(object):
+    """Docx files with items tracking conversion status."""
+
+    def __init__(self, storage: FilesStorage) -> None:
+        """Initialize documents.
+
+        Args:
+            storage (FilesStorage): Storage of documents.
+        """
+        self.base = storage.base('documents')
+        self.drive = storage.drive('documents')
+
+    def add(self, key: str, docx_data: bytes) -> str:
+        """Add document with pending conversion.
+
+        Args:
+            key (str): Item key and file name.
+            docx_data (bytes): Docx file data.
+
+        Returns:
+            str: SHA-256 of docx file data.
+        """
+        file_hash = get_file_hash(docx_data)
+        self.drive.files[key] = docx_data
+        self.base.items[key] = {
+            'file_hash': file_hash,
+            'pdf_status': PdfStatus.pending.value,
+        }
+        return file_hash
+
+    def get_status(self, key: str) -> str:
+        """Get conversion status of document.
+
+        Args:
+            key (str): Item key.
+
+        Returns:
+            str: PDF status.
+        """
+        return self.base.items[key]['pdf_status']
+
+
+def make_pdf_cache(
+    prerender_jobs: int = 2,
+) -> tuple[PdfCache, GatedConverter, Documents]:
+    """Make cache over empty storage.
+
+    Args:
+        prerender_jobs (int): Max number of background conversions.
+
+    Returns:
+        tuple[PdfCache, GatedConverter, Documents]: Cache, its converter \
+            and documents.
+    """
+    storage = FilesStorage()
+    converter = GatedConverter()
+    pdf_cache = PdfCache(
+        storage,  # type: ignore[arg-type]
+        converter,
+        prerender_jobs,
+    )
+    return pdf_cache, converter, Documents(storage)
+
+
+async def download(
+    pdf_cache: PdfCache,
+    documents: Documents,
+    key: str,
+) -> Optional[bytes]:
+    """Download converted PDF of document.
+
+    Args:
+        pdf_cache (PdfCache): PDF cache.
+        documents (Documents): Documents.
+        key (str): Document key.
+
+    Returns:
+        Optional[bytes]: PDF data if document is found, None otherwise.
+    """
+    pdf_file = await pdf_cache.get_converted_file(
+        documents.base,  # type: ignore[arg-type]
+        documents.drive,  # type: ignore[arg-type]
+        key,
+    )
+    return None if pdf_file is None else pdf_file.reader.read()
+
+
+def test_prerender_is_bounded() -> None:
+    """Files over background conversions limit are converted on download."""
+
+    async def prerender_and_download() -> None:
+        pdf_cache, converter, documents = make_pdf_cache(prerender_jobs=1)
+        for key in ('d1', 'd2'):
+            file_hash = documents.add(key, key.encode())
+            pdf_cache.prerender(
+                documents.base,  # type: ignore[arg-type]
+                documents.drive,  # type: ignore[arg-type]
+                key,
+                file_hash,
+            )
+
+        await asyncio.sleep(0.01)
+
+        assert converter.converted == [b'd1']
+
+        converter.gate.set()
+        await pdf_cache.close()
+
+        assert documents.get_status('d1') == PdfStatus.ready.value
+        assert documents.get_status('d2') == PdfStatus.pending.value
+        assert await download(pdf_cache, documents, 'd2') == b'PDF d2'
+        assert documents.get_status('d2') == PdfStatus.ready.value
+        assert converter.converted == [b'd1', b'd2']
+
+    asyncio.run(prerender_and_download())
+
+
+def test_concurrent_downloads_share_conversion() -> None:
+    """Downloads of file being converted wait for the same job."""
+
+    async def download_twice() -> None:
+        pdf_cache, converter, documents = make_pdf_cache()
+        documents.add('d1', b'same')
+        documents.add('d2', b'same')
+        downloads = [
+            asyncio.create_task(download(pdf_cache, documents, key))
+            for key in ('d1', 'd2', 'd1')
+        ]
+        await asyncio.sleep(0.01)
+        converter.gate.set()
+
+        assert await asyncio.gather(*downloads) == [b'PDF same'] * 3
+        assert converter.converted == [b'same']
+        assert documents.get_status('d1') == PdfStatus.ready.value
+        assert await download(pdf_cache, documents, 'd2') == b'PDF same'
+        assert converter.converted == [b'same']
+
+    asyncio.run(download_twice())
+
+
+def test_cancelled_download_keeps_conversion() -> None:
+    """Cancelled waiter does not cancel conversion shared with others."""
+
+    async def cancel_download() -> None:
+        pdf_cache, converter, documents = make_pdf_cache()
+        documents.add('d1', b'docx')
+        cancelled = asyncio.create_task(download(pdf_cache, documents, 'd1'))
+        waiting = asyncio.create_task(download(pdf_cache, documents, 'd1'))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        with suppress(asyncio.CancelledError):
+            await cancelled
+
+        converter.gate.set()
+
+        assert await waiting == b'PDF docx'
+        assert converter.converted == [b'docx']
+        assert documents.get_status('d1') == PdfStatus.ready.value
+
+    asyncio.run(cancel_download())
+
+
+def test_failed_conversion_is_retried() -> None:
+    """Failed conversion sets failed status and is not kept as running."""
+
+    async def fail_and_retry() -> None:
+        pdf_cache, converter, documents = make_pdf_cache()
+        documents.add('d1', b'docx')
+        converter.fails = True
+        converter.gate.set()
+        with pytest.raises(FailConvertToPDF):
+            await download(pdf_cache, documents, 'd1')
+
+        assert documents.get_status('d1') == PdfStatus.failed.value
+
+        converter.fails = False
+
+        assert await download(pdf_cache, documents, 'd1') == b'PDF docx'
+        assert documents.get_status('d1') == PdfStatus.ready.value
+        assert converter.converted == [b'docx', b'docx']
+
+    asyncio.run(fail_and_retry())
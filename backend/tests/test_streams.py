@@ -0,0 +1,165 @@
+"""Tests of file data streams."""
+
+import asyncio
+from io import BytesIO
+from typing import AsyncIterator
+from zipfile import BadZipFile, ZipFile
+
+import pytest
+
+from app.core.streams import ChunkedReader, iterate_archive
+
+FILE_DATA = bytes(range(256)) * 4
+
+
+def split_file(chunk_size: int) -> list[bytes]:
+    """Split test file data to chunks.
+
+    Args:
+        chunk_size (int): Chunk size in bytes.
+
+    Returns:
+        list[bytes]: Chunks of file data.
+    """
+    return [
+        FILE_DATA[start:start + chunk_size]
+        for start in range(0, len(FILE_DATA), chunk_size)
+    ]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 256, 1024, 4096])
+@pytest.mark.parametrize('read_size', [1, 5, 256, 300, 2048])
+def test_read_by_blocks(chunk_size: int, read_size: int) -> None:
+    """Blocks are full, except the last one, and join to file data.
+
+    Args:
+        chunk_size (int): Chunk size of iterator.
+        read_size (int): Size of read blocks.
+    """
+    reader = ChunkedReader(iter(split_file(chunk_size)))
+    blocks = iter(lambda: reader.read(read_size), b'')
+
+    read_blocks = list(blocks)
+
+    assert b''.join(read_blocks) == FILE_DATA
+    assert all(len(block) == read_size for block in read_blocks[:-1])
+    assert reader.read(read_size) == b''
+
+
+@pytest.mark.parametrize('read_size', [0, 3, 256, 257])
+def test_read_rest(read_size: int) -> None:
+    """Rest of partly read chunk is returned by whole read.
+
+    Args:
+        read_size (int): Size of first read.
+    """
+    reader = ChunkedReader(iter(split_file(256)))
+
+    first_block = reader.read(read_size)
+
+    assert first_block == FILE_DATA[:read_size]
+    assert reader.read() == FILE_DATA[read_size:]
+    assert reader.read(None) == b''
+
+
+def test_as_iterator_starts_at_position() -> None:
+    """Iterator yields buffered rest and then unread chunks."""
+    reader = ChunkedReader(iter(split_file(100)))
+    reader.read(150)
+
+    chunks = list(reader.as_iterator())
+
+    assert chunks[0] == FILE_DATA[150:200]
+    assert b''.join(chunks) == FILE_DATA[150:]
+
+
+def test_spool() -> None:
+    """Rest of stream is spooled to file at start position."""
+    reader = ChunkedReader(iter(split_file(100)))
+    reader.read(10)
+
+    with reader.spool(max_size=100) as spooled_file:
+        assert spooled_file.read() == FILE_DATA[10:]
+
+
+def test_empty_chunks() -> None:
+    """Empty chunks do not end stream."""
+    reader = ChunkedReader(iter([b'', b'ab', b'', b'cd']))
+
+    assert reader.read(3) == b'abc'
+    assert reader.read(3) == b'd'
+
+
+ARCHIVED_FILES = (
+    ('001.docx', FILE_DATA),
+    ('002.docx', FILE_DATA[:100]),
+    ('003.docx', b''),
+)
+
+
+class BuildFailedError(Exception):
+    """Build of later batch failed."""
+
+
+async def produce_files(
+    fail_after: int = -1,
+) -> AsyncIterator[tuple[str, bytes]]:
+    """Produce archived files.
+
+    Args:
+        fail_after (int): Number of files produced before failure. \
+            No failure if negative.
+
+    Raises:
+        BuildFailedError: If files number reached `fail_after`.
+
+    Yields:
+        tuple[str, bytes]: File name and data.
+    """
+    for file_number, archived_file in enumerate(ARCHIVED_FILES):
+        if file_number == fail_after:
+            raise BuildFailedError()
+
+        await asyncio.sleep(0)
+        yield archived_file
+
+
+async def collect_archive(
+    files: AsyncIterator[tuple[str, bytes]],
+    chunks: list[bytes],
+) -> None:
+    """Collect chunks of streamed archive.
+
+    Args:
+        files (AsyncIterator[tuple[str, bytes]]): Archived files.
+        chunks (list[bytes]): Collected chunks.
+    """
+    async for chunk in iterate_archive(files):
+        chunks.append(chunk)
+
+
+def test_iterate_archive() -> None:
+    """Streamed archive is valid and has files in order of production."""
+    chunks: list[bytes] = []
+    asyncio.run(collect_archive(produce_files(), chunks))
+
+    assert len(chunks) == len(ARCHIVED_FILES) + 1
+    assert ARCHIVED_FILES[0][1] in chunks[0]
+    with ZipFile(BytesIO(b''.join(chunks))) as archive:
+        assert archive.testzip() is None
+        assert [
+            (file_name, archive.read(file_name))
+            for file_name in archive.namelist()
+        ] == list(ARCHIVED_FILES)
+
+
+def test_iterate_archive_fails_mid_stream() -> None:
+    """Failure of later files aborts stream after files already sent."""
+    chunks: list[bytes] = []
+    with pytest.raises(BuildFailedError):
+        asyncio.run(collect_archive(produce_files(fail_after=2), chunks))
+
+    assert len(chunks) == 2
+    assert ARCHIVED_FILES[1][1] in chunks[1]
+    with pytest.raises(BadZipFile):
+        ZipFile(BytesIO(b''.join(chunks)))
@@ -0,0 +1,227 @@
+"""Tests of users service and access token revocation."""
+
+import asyncio
+from typing import Any, Optional
+
+from app.core.auth import create_user_access_token
+from app.core.deta import FetchResponse
+from app.core.passwords import PasswordHasher
+from app.core.users import TokenVersions, UsersService, get_authorized_user
+from app.models.user import User, UserRole
+
+
+class UsersBase(object):
+    """Base stub, which keeps users in memory and fetches them by pages."""
+
+    def __init__(self, page_size: int = 100) -> None:
+        """Initialize empty base.
+
+        Args:
+            page_size (int): Max number of users in fetched page.
+        """
+        self.page_size = page_size
+        self.users: dict[str, dict[str, Any]] = {}
+
+    async def get(self, key: str) -> Optional[dict[str, Any]]:
+        """Get user.
+
+        Args:
+            key (str): User id.
+
+        Returns:
+            Optional[dict[str, Any]]: User if found, None otherwise.
+        """
+        await asyncio.sleep(0)
+        db_user = self.users.get(key)
+        return dict(db_user) if db_user else None
+
+    async def put(self, record: dict[str, Any], key: str) -> None:
+        """Put user.
+
+        Args:
+            record (dict[str, Any]): User.
+            key (str): User id.
+        """
+        await asyncio.sleep(0)
+        self.users[key] = dict(record)
+
+    async def delete(self, key: str) -> None:
+        """Delete user.
+
+        Args:
+            key (str): User id.
+        """
+        await asyncio.sleep(0)
+        self.users.pop(key, None)
+
+    async def fetch(
+        self,
+        query: Optional[dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        last: Optional[str] = None,
+    ) -> FetchResponse:
+        """Fetch page of users matching query.
+
+        Args:
+            query (Optional[dict[str, Any]]): Field values to match.
+            limit (Optional[int]): Max number of users. Page size if None.
+            last (Optional[str]): Last user id from previous page.
+
+        Returns:
+            FetchResponse: Page of users.
+        """
+        await asyncio.sleep(0)
+        limit = limit or self.page_size
+        uids = [
+            uid for uid in sorted(self.users)
+            if (last is None or uid > last) and all(
+                self.users[uid].get(field) == field_value
+                for field, field_value in (query or {}).items()
+            )
+        ]
+        return FetchResponse(
+            items=[dict(self.users[uid]) for uid in uids[:limit]],
+            last=uids[limit - 1] if len(uids) > limit else None,
+        )
+
+
+class UsersStorage(object):
+    """Storage stub with single users base."""
+
+    def __init__(self, users_base: UsersBase) -> None:
+        """Initialize storage.
+
+        Args:
+            users_base (UsersBase): Users base.
+        """
+        self.users_base = users_base
+
+    def base(self, name: str) -> UsersBase:
+        """Get base.
+
+        Args:
+            name (str): Base name.
+
+        Returns:
+            UsersBase: Users base.
+        """
+        return self.users_base
+
+
+def make_users_service() -> UsersService:
+    """Make users service over empty base.
+
+    Returns:
+        UsersService: Users service.
+    """
+    return UsersService(
+        UsersStorage(UsersBase()),  # type: ignore[arg-type]
+        PasswordHasher(workers=1, rounds=4),
+    )
+
+
+def is_authorized(user: User, users_service: UsersService) -> bool:
+    """Check if access token of user is accepted.
+
+    Args:
+        user (User): User, which token is issued.
+        users_service (UsersService): Users service.
+
+    Returns:
+        bool: True if token is valid and not revoked, False otherwise.
+    """
+    token = create_user_access_token(user)
+    return asyncio.run(get_authorized_user(token, users_service)) is not None
+
+
+def test_token_is_revoked_by_claims_change() -> None:
+    """Tokens are revoked on change of claims, which they carry."""
+    users_service = make_users_service()
+    user, _ = asyncio.run(users_service.create_user('Ivan', UserRole.employee))
+    changes: list[dict[str, Any]] = [
+        {'name': 'Petr'},
+        {'login': 'petr'},
+        {'role': UserRole.admin},
+    ]
+    for change in changes:
+        updated_user = asyncio.run(
+            users_service.update_user(user.uid, **change),
+        )
+
+        assert updated_user.token_version == user.token_version + 1
+        assert not is_authorized(user, users_service)
+        assert is_authorized(updated_user, users_service)
+        user = updated_user
+
+
+def test_token_is_kept_without_claims_change() -> None:
+    """Update with same claims keeps tokens valid."""
+    users_service = make_users_service()
+    user, _ = asyncio.run(users_service.create_user('Ivan', UserRole.employee))
+    updated_user = asyncio.run(
+        users_service.update_user(user.uid, name='Ivan', role=user.role),
+    )
+
+    assert updated_user.token_version == user.token_version
+    assert is_authorized(user, users_service)
+
+
+def test_token_is_revoked_by_password_update_and_delete() -> None:
+    """Password update and user delete revoke tokens."""
+    users_service = make_users_service()
+    user, _ = asyncio.run(users_service.create_user('Ivan', UserRole.employee))
+    updated_user, _ = asyncio.run(
+        users_service.update_user_password(user.uid),
+    )
+
+    assert not is_authorized(user, users_service)
+    assert is_authorized(updated_user, users_service)
+
+    asyncio.run(users_service.delete_user(user.uid))
+
+    assert not is_authorized(updated_user, users_service)
+
+
+def test_token_version_is_loaded_for_unknown_user() -> None:
+    """User created by other instance is looked up in storage once."""
+    users_service = make_users_service()
+    other_service = make_users_service()
+    other_service.base = users_service.base
+    user, _ = asyncio.run(other_service.create_user('Ivan', UserRole.employee))
+
+    assert users_service.token_versions.get(user.uid) is None
+    assert is_authorized(user, users_service)
+    assert users_service.token_versions.get(user.uid) == user.token_version
+
+
+def test_token_versions_refresh_keeps_concurrent_changes() -> None:
+    """Versions changed during refresh are not replaced by loaded ones."""
+    users_base = UsersBase(page_size=1)
+    for uid, token_version in (('u1', 0), ('u2', 3), ('u3', 1)):
+        users_base.users[uid] = {
+            'uid': uid,
+            'login': uid,
+            'name': uid,
+            'role': UserRole.employee.value,
+            'password_hash': '',
+            'token_version': token_version,
+        }
+
+    token_versions = TokenVersions(users_base)  # type: ignore[arg-type]
+    token_versions.set('u3', 5)
+
+    async def change_versions() -> None:
+        await asyncio.sleep(0)
+        token_versions.set('u1', 2)
+        token_versions.set('u4', 0)
+        token_versions.remove('u2')
+
+    async def refresh() -> None:
+        await asyncio.gather(token_versions.refresh(), change_versions())
+
+    asyncio.run(refresh())
+
+    assert token_versions.get('u1') == 2
+    assert token_versions.get('u2') is None
+    assert token_versions.get('u3') == 1
+    assert token_versions.get('u4') == 0
@@ -0,0 +1,186 @@
+"""Tests of in-memory search index of wastes."""
+
+import asyncio
+from typing import Optional
+
+from app.core.deta import FetchResponse
+from app.core.normalization import normalize_fkko_code, normalize_name
+from app.core.wastes_index import FkkoCodesIndex, WastesIndex
+from app.models.waste import FkkoGroup, Waste
+
+WASTES = (
+    ('w1', 'Отходы бумаги', '4 05 122 02 60 5'),
+    ('w2', 'Отходы картона', '4 05 122 03 60 5'),
+    ('w3', 'Лампы ртутные', '4 71 101 01 52 1'),
+    ('w4', 'Отходы бумаги и картона', '4 05 810 01 29 5'),
+    ('w5', 'Шлак сварочный', '9 19 100 02 20 4'),
+)
+
+
+def make_waste(waste_id: str, name: str, fkko_code: str) -> Waste:
+    """Make waste with normalized fields.
+
+    Args:
+        waste_id (str): Waste id.
+        name (str): Waste name.
+        fkko_code (str): FKKO code.
+
+    Returns:
+        Waste: Waste.
+    """
+    return Waste(
+        waste_id=waste_id,
+        name=name,
+        normalized_name=normalize_name(name),
+        fkko_code=fkko_code,
+        normalized_fkko_code=normalize_fkko_code(fkko_code),
+    )
+
+
+class WastesBase(object):
+    """Base stub, which fetches wastes by pages."""
+
+    def __init__(self, wastes: list[Waste], page_size: int) -> None:
+        """Initialize base.
+
+        Args:
+            wastes (list[Waste]): Stored wastes.
+            page_size (int): Max number of wastes in page.
+        """
+        self.wastes = wastes
+        self.page_size = page_size
+
+    async def fetch(self, last: Optional[str] = None) -> FetchResponse:
+        """Fetch page of wastes.
+
+        Args:
+            last (Optional[str]): Last waste id from previous page.
+
+        Returns:
+            FetchResponse: Page of wastes.
+        """
+        await asyncio.sleep(0)
+        wastes = sorted(self.wastes, key=lambda waste: waste.waste_id)
+        page_start = 0
+        if last is not None:
+            page_start = [waste.waste_id for waste in wastes].index(last) + 1
+
+        page = wastes[page_start:page_start + self.page_size]
+        page_end = page_start + self.page_size
+        return FetchResponse(
+            items=[waste.dict() for waste in page],
+            last=page[-1].waste_id if page_end < len(wastes) else None,
+        )
+
+
+def make_index(page_size: int = 2) -> WastesIndex:
+    """Make index of test wastes and refresh it.
+
+    Args:
+        page_size (int): Max number of wastes in fetched page.
+
+    Returns:
+        WastesIndex: Loaded index.
+    """
+    wastes = [make_waste(*waste) for waste in WASTES]
+    index = WastesIndex(WastesBase(wastes, page_size), 10)
+    asyncio.run(index.refresh())
+    return index
+
+
+def get_ids(wastes: list[Waste]) -> list[str]:
+    """Get ids of wastes.
+
+    Args:
+        wastes (list[Waste]): Wastes.
+
+    Returns:
+        list[str]: Waste ids.
+    """
+    return [waste.waste_id for waste in wastes]
+
+
+def test_get_groups() -> None:
+    """Groups of next level are counted under prefix."""
+    fkko_codes = FkkoCodesIndex(make_waste(*waste) for waste in WASTES)
+
+    assert fkko_codes.get_groups('') == [
+        FkkoGroup(fkko_code_prefix='4', wastes_count=4),
+        FkkoGroup(fkko_code_prefix='9', wastes_count=1),
+    ]
+    assert fkko_codes.get_groups('4') == [
+        FkkoGroup(fkko_code_prefix='405', wastes_count=3),
+        FkkoGroup(fkko_code_prefix='471', wastes_count=1),
+    ]
+    assert fkko_codes.get_groups('405') == [
+        FkkoGroup(fkko_code_prefix='405122', wastes_count=2),
+        FkkoGroup(fkko_code_prefix='405810', wastes_count=1),
+    ]
+    assert fkko_codes.get_groups('4051220') == [
+        FkkoGroup(fkko_code_prefix='40512202', wastes_count=1),
+        FkkoGroup(fkko_code_prefix='40512203', wastes_count=1),
+    ]
+    assert fkko_codes.get_groups('40512202605') == []
+    assert fkko_codes.get_groups('8') == []
+
+
+def test_fkko_codes_insert_and_discard() -> None:
+    """Codes inserted one by one are kept in order."""
+    fkko_codes = FkkoCodesIndex()
+    wastes = [make_waste(*waste) for waste in reversed(WASTES)]
+    for waste in wastes:
+        fkko_codes.insert(waste)
+
+    fkko_codes.discard(wastes[-1])
+
+    assert fkko_codes.find('405') == {'w2', 'w4'}
+    assert fkko_codes.suggest('4', 2) == ['w2', 'w4']
+
+
+def test_search() -> None:
+    """Wastes are found by name substring and code prefix."""
+    index = make_index()
+
+    assert get_ids(index.search()) == ['w1', 'w2', 'w3', 'w4', 'w5']
+    assert get_ids(index.search(name_contains='бумаг')) == ['w1', 'w4']
+    assert get_ids(index.search(name_contains='от')) == get_ids(
+        index.search(),
+    )
+    assert get_ids(index.search(
+        name_contains='отходы',
+        fkko_code_prefix='405122',
+    )) == ['w1', 'w2']
+
+
+def test_changes_are_applied() -> None:
+    """Added, updated and removed wastes are found at once."""
+    index = make_index()
+    index.add(make_waste('w0', 'Бумага офисная', '4 05 122 01 60 5'))
+    index.add(make_waste('w3', 'Лампы люминесцентные', '4 71 101 01 52 1'))
+    index.remove('w1')
+
+    assert get_ids(index.search()) == ['w0', 'w2', 'w3', 'w4', 'w5']
+    assert get_ids(index.search(name_contains='ламп')) == ['w3']
+    assert get_ids(index.search(name_contains='ртут')) == []
+    assert get_ids(index.search(fkko_code_prefix='405122')) == ['w0', 'w2']
+
+
+def test_changes_during_refresh_are_kept() -> None:
+    """Wastes changed during refresh are not replaced by loaded ones."""
+    index = make_index(page_size=1)
+
+    async def change_wastes() -> None:
+        await asyncio.sleep(0)
+        index.add(make_waste('w2', 'Картон', '4 05 122 03 60 5'))
+        index.add(make_waste('w6', 'Стекло', '4 51 101 00 20 5'))
+        index.remove('w5')
+
+    async def refresh() -> None:
+        await asyncio.gather(index.refresh(), change_wastes())
+
+    asyncio.run(refresh())
+
+    assert get_ids(index.search()) == ['w1', 'w2', 'w3', 'w4', 'w6']
+    assert get_ids(index.search(name_contains='картон')) == ['w2', 'w4']
+    assert get_ids(index.suggest('карт', 5)) == ['w2', 'w4']
+    assert get_ids(index.suggest('45', 5, by_fkko_code=True)) == ['w6']
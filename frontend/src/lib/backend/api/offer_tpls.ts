@@ -18,10 +18,18 @@ interface OfferTplCreate {
 	offer_tpl_file: string;
 }
 
+export interface OfferTplSchema {
+	variables: string[] | null;
+}
+
 interface BuiltOfferResponse {
 	offer: Offer;
 }
 
+interface BuiltOffersResponse {
+	offers: Offer[];
+}
+
 export class OfferTplsAPI extends BaseAPI {
     async getOfferTpls(
         pagination: PaginationParams = defaultPaginationParams
@@ -53,6 +61,13 @@ export class OfferTplsAPI extends BaseAPI {
 		return result;
 	}
 
+	async getOfferTplSchema(offerTplId: string): Promise<Result<OfferTplSchema>> {
+		return (await this.fetchApi(
+			`/offer_tpls/${offerTplId}/schema`,
+			'GET'
+		)) as Result<OfferTplSchema>;
+	}
+
 	async buildOffer(offerTplId: string, context: object): Promise<Result<Offer>> {
 		const result = (await this.fetchApi(`/offer_tpls/${offerTplId}/build`, 'POST', {
 			context
@@ -63,6 +78,16 @@ export class OfferTplsAPI extends BaseAPI {
 		return result;
 	}
 
+	async buildOffers(offerTplId: string, contexts: object[]): Promise<Result<Offer[]>> {
+		const result = (await this.fetchApi(`/offer_tpls/${offerTplId}/build_batch`, 'POST', {
+			contexts
+		})) as Result<BuiltOffersResponse>;
+		if (result.ok) {
+			return { ok: true, value: result.value.offers };
+		}
+		return result;
+	}
+
 	getDownloadUrl(offerTplId: string, filFormat: FileFormat = FileFormat.docx): string {
 		return `${BaseAPI.baseUrl}/offer_tpls/${offerTplId}/download?format=${filFormat}`;
 	}
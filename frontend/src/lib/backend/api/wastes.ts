@@ -1,5 +1,5 @@
 import { BaseAPI, type Result } from '../base_api';
-import type { Waste } from '../models/wastes';
+import type { FkkoGroup, Waste } from '../models/wastes';
 import { asUrlParams, defaultPaginationParams, type PaginationParams } from '../pagination';
 
 interface WasteResponse {
@@ -11,6 +11,14 @@ export interface WastesResponse {
 	last: string | null;
 }
 
+interface FkkoGroupsResponse {
+	groups: FkkoGroup[];
+}
+
+interface WasteSuggestionsResponse {
+	suggestions: Waste[];
+}
+
 interface WasteCreate {
 	name: string;
 	fkko_code: string;
@@ -21,6 +29,7 @@ interface WastesFilter {
 	name_contains?: string;
 	fkko_code?: string;
 	fkko_code_prefix?: string;
+	fuzzy?: boolean;
 }
 
 function filterToURLParams(filter: WastesFilter): string {
@@ -37,6 +46,9 @@ function filterToURLParams(filter: WastesFilter): string {
 	if (filter.fkko_code_prefix) {
 		params.push(`fkko_code_prefix=${filter.fkko_code_prefix}`);
 	}
+	if (filter.fuzzy) {
+		params.push('fuzzy=true');
+	}
 	return params.join('&');
 }
 
@@ -52,6 +64,29 @@ export class WastesAPI extends BaseAPI {
 		return (await this.fetchApi(url, 'GET')) as Result<WastesResponse>;
 	}
 
+	async getFkkoGroups(fkkoCodePrefix = ''): Promise<Result<FkkoGroup[]>> {
+		const result = (await this.fetchApi(
+			`/wastes/fkko_groups?fkko_code_prefix=${fkkoCodePrefix}`,
+			'GET'
+		)) as Result<FkkoGroupsResponse>;
+		if (result.ok) {
+			return { ok: true, value: result.value.groups };
+		}
+		return result;
+	}
+
+	async suggestWastes(query: string, limit = 10): Promise<Result<Waste[]>> {
+		const params = new URLSearchParams({ query, limit: limit.toString() });
+		const result = (await this.fetchApi(
+			`/wastes/suggest?${params}`,
+			'GET'
+		)) as Result<WasteSuggestionsResponse>;
+		if (result.ok) {
+			return { ok: true, value: result.value.suggestions };
+		}
+		return result;
+	}
+
 	async createWaste(wasteData: WasteCreate): Promise<Result<Waste>> {
 		const result = (await this.fetchApi('/wastes', 'POST', wasteData)) as Result<WasteResponse>;
 		if (result.ok) {
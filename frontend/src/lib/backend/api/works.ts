@@ -11,6 +11,10 @@ interface WorksResponse {
 	last: string | null;
 }
 
+interface WorkSuggestionsResponse {
+	suggestions: Work[];
+}
+
 interface WorkCreate {
 	name: string;
 }
@@ -18,6 +22,7 @@ interface WorkCreate {
 interface WorksFilter {
 	name?: string;
 	name_contains?: string;
+	fuzzy?: boolean;
 }
 
 function filterToURLParams(filter: WorksFilter): string {
@@ -28,6 +33,9 @@ function filterToURLParams(filter: WorksFilter): string {
     if (filter.name_contains) {
         params.push(`name_contains=${filter.name_contains}`);
     }
+    if (filter.fuzzy) {
+        params.push('fuzzy=true');
+    }
     return params.join('&');
 }
 
@@ -43,6 +51,18 @@ export class WorksAPI extends BaseAPI {
 		return (await this.fetchApi(url, 'GET')) as Result<WorksResponse>;
 	}
 
+	async suggestWorks(query: string, limit = 10): Promise<Result<Work[]>> {
+		const params = new URLSearchParams({ query, limit: limit.toString() });
+		const result = (await this.fetchApi(
+			`/works/suggest?${params}`,
+			'GET'
+		)) as Result<WorkSuggestionsResponse>;
+		if (result.ok) {
+			return { ok: true, value: result.value.suggestions };
+		}
+		return result;
+	}
+
 	async createWork(workData: WorkCreate): Promise<Result<Work>> {
 		const result = (await this.fetchApi('/works', 'POST', workData)) as Result<WorkResponse>;
 		if (result.ok) {
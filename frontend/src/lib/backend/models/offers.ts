@@ -1,7 +1,15 @@
+export enum PdfStatus {
+    Pending = 'pending',
+    Ready = 'ready',
+    Failed = 'failed',
+}
+
+
 export interface Offer {
     offer_id: string;
     name: string;
     created_by: string;
     created_at: Date;
     modified_at: Date;
+    pdf_status: PdfStatus | null;
 }
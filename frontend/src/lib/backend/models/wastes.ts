@@ -4,6 +4,11 @@ export interface Waste {
 	fkko_code: string;
 }
 
+export interface FkkoGroup {
+	fkko_code_prefix: string;
+	wastes_count: number;
+}
+
 /**
  * FKKO code should be an any combination of numbers and spaces
  */
@@ -0,0 +1,10 @@
+cd backend
+SET JWT_SECRET_KEY=benchmark
+SET ACCESS_TOKEN_EXPIRE_MINUTES=30
+SET AGENTS_API_KEY=benchmark
+SET PDF_API_KEY=benchmark
+SET ROOT_LOGIN=admin
+SET ROOT_PASSWORD=admin
+poetry run python -m benchmarks.normalization
+poetry run python -m benchmarks.render
+poetry run python -m benchmarks.streams
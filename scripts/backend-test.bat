@@ -0,0 +1,2 @@
+cd backend
+poetry run pytest tests